@@ -7,6 +7,14 @@ if __name__ == "__main__":
 
     multiprocessing.set_start_method("spawn", force=True)
 
+    if len(sys.argv) > 1:  # execution en ligne de commande, sans interface graphique (python -m Pytre run ...)
+        from pathlib import Path
+
+        sys.path.insert(0, str(Path(__file__).parent))  # modules importés comme lors d'un lancement direct
+        from cli import cli_start
+
+        sys.exit(cli_start(sys.argv[1:]))
+
     from ui.app import app_start  # import after managing multiprocess for it to work when frozen
 
     app_start()
@@ -0,0 +1,264 @@
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from threading import Event as ThreadEvent
+
+import kee
+
+kee.INTERACTIVE = False  # avant l'import de settings qui ouvre la base des paramètres, aussi dans les processus
+
+import settings  # noqa: E402  # disable import-not-at-top warning, kee.INTERACTIVE doit être modifié avant
+import sql_query  # noqa: E402
+import servers  # noqa: E402
+import servers_probe  # noqa: E402
+import users  # noqa: E402
+
+CLI_JOBS: int = 2  # nombre de requêtes d'un manifeste executées simultanément par défaut
+EXIT_OK: int = 0
+EXIT_FAILED: int = 1  # au moins une requête en échec
+EXIT_USAGE: int = 2  # arguments, manifeste ou requête invalides (code aussi utilisé par argparse)
+
+
+class _MsgQueue:
+    """
+    Remplace la file de messages vers l'interface : les messages sont déjà affichés dans la console par la requête,
+    seul le dernier est conservé pour le rapport en cas d'échec
+    """
+
+    def __init__(self):
+        self.last_msg: str = ""
+
+    def put(self, item: tuple, *args, **kwargs):
+        msg_type, data = item
+        if msg_type == "msg_output":
+            self.last_msg = str(data).strip()
+
+
+def find_query_file(query: str, queries: list[sql_query.Query]) -> Path:
+    """fichier d'une requête à partir de son chemin, du nom de son fichier (avec ou sans extension) ou de son nom"""
+    if query.lower().endswith(".sql") and Path(query).is_file():
+        return Path(query)
+
+    for item in queries:
+        if query in (item.name, item.filename.name, item.filename.stem):
+            return item.filename
+
+    raise LookupError(f"requête non trouvée : {query}")
+
+
+def param_key(query: sql_query.Query, name: str) -> str:
+    for key in (name, "@" + name, "@!" + name):
+        if key in query.params_obj:
+            return key
+
+    raise KeyError(f"paramètre inconnu pour {query.name} : {name}")
+
+
+def run_job(job: dict, label: str = "") -> dict:
+    """
+    Execution d'une requête : job = {"file", "server", "params", "out", "format"}, seul file est obligatoire.
+    Renvoie le résultat avec les infos de débit, sans exception pour pouvoir être executée dans un autre processus
+    """
+    result = {"label": label, "ok": False, "rows": 0, "file": "", "size": 0, "seconds": 0.0, "error": ""}
+    start = time.perf_counter()
+    queue = _MsgQueue()
+    try:
+        user: users.CurrentUser = users.CurrentUser()
+        query = sql_query.Query(Path(job["file"]))
+        query.queue = queue
+        query.stop_requested, query.cannot_stop = ThreadEvent(), ThreadEvent()
+
+        server_id = job.get("server") or (query.servers_id[0] if query.servers_id else "")
+        if query not in sql_query.QueriesAccess([query], user).visible(server_id):
+            raise PermissionError(f"requête {query.name} non autorisée sur le serveur '{server_id}'")
+
+        for name, value in (job.get("params") or {}).items():
+            param = query.params_obj[param_key(query, name)]
+            if param.is_hidden and not user.admin:
+                raise PermissionError(f"paramètre {name} non modifiable")
+            param.display_value = str(value)
+
+        extract_format = job.get("format") or query.get_extract_format()
+        if extract_format not in sql_query.EXTRACT_FORMATS:
+            raise ValueError(f"format d'extraction inconnu : {extract_format}")
+        extract_file = Path(job["out"]) if job.get("out") else None
+        if extract_file is not None and extract_file.is_dir():
+            extract_file = query.default_extract_file(extract_format, extract_file)
+
+        exec_result = query.execute_cmd(True, server_id, extract_file, extract_format)
+        if isinstance(exec_result, tuple):
+            result["ok"] = True
+            result["rows"], result["file"] = exec_result[0], str(exec_result[1] or "")
+            result["size"] = Path(result["file"]).stat().st_size if result["file"] else 0
+        else:
+            result["error"] = queue.last_msg or "échec de l'execution"
+    except Exception as e:
+        result["error"] = f"{e.__class__.__name__}, {e}"
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def job_report(result: dict) -> str:
+    if not result["ok"]:
+        return f"ECHEC [{result['label']}] {result['seconds']:.1f}s : {result['error']}"
+
+    seconds = max(result["seconds"], 0.001)
+    rows_rate = "{:,}".format(round(result["rows"] / seconds)).replace(",", " ")
+    rows = "{:,}".format(result["rows"]).replace(",", " ")
+    return (
+        f"OK [{result['label']}] {rows} lignes en {result['seconds']:.1f}s"
+        + f" ({rows_rate} lignes/s, {result['size'] / seconds / 1024**2:.2f} Mo/s) : {result['file']}"
+    )
+
+
+def run_jobs(jobs: list[dict], workers: int = CLI_JOBS) -> list[dict]:
+    """execution des requêtes, en parallèle dans un pool de processus si plusieurs à la fois"""
+    labels = [f"{i}:{Path(job['file']).stem}" for i, job in enumerate(jobs, start=1)]
+    results: list[dict] = []
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job, label in zip(jobs, labels):
+            results.append(run_job(job, label))
+            print(job_report(results[-1]), flush=True)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(run_job, job, label) for job, label in zip(jobs, labels)]
+        for future in as_completed(futures):
+            results.append(future.result())
+            print(job_report(results[-1]), flush=True)
+
+    return results
+
+
+def read_manifest(file: Path) -> list[dict]:
+    """
+    Manifeste json : liste de requêtes à executer, par exemple
+    [{"query": "Ventes", "server": "PROD", "params": {"@debut": "01/01/2024"}, "out": "/data", "format": "csv"}]
+    """
+    jobs = json.loads(Path(file).read_text(encoding="utf-8"))
+    if not isinstance(jobs, list) or not all(isinstance(job, dict) and job.get("query") for job in jobs):
+        raise ValueError("le manifeste doit être une liste d'objets avec au moins l'attribut 'query'")
+
+    return jobs
+
+
+def parse_params(params: list[str]) -> dict[str, str]:
+    parsed: dict[str, str] = {}
+    for param in params:
+        name, sep, value = param.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"paramètre invalide, format attendu NOM=VALEUR : {param}")
+        parsed[name.strip()] = value
+
+    return parsed
+
+
+def run_probe(servers_id: list[str], user: users.CurrentUser, timeout: int, as_json: bool = False) -> int:
+    """test des serveurs accessibles à l'utilisateur, pour les scripts de supervision"""
+    access = sql_query.QueriesAccess([], user)
+    servers_lst = [
+        server for server in servers.Servers().servers_dict.values() if access.is_authorized(server.grp_authorized)
+    ]
+    if servers_id:
+        wanted = {server_id.lower() for server_id in servers_id}
+        servers_lst = [server for server in servers_lst if server.id.lower() in wanted]
+        if len(servers_lst) < len(wanted):
+            unknown = wanted - {server.id.lower() for server in servers_lst}
+            print(f"Erreur : serveur non trouvé ou non autorisé : {', '.join(sorted(unknown))}", file=sys.stderr)
+            return EXIT_USAGE
+
+    probes = servers_probe.probe_servers(servers_lst, timeout)
+    if as_json:
+        results = [
+            {
+                "server": probe.server,
+                "start": probe.start.isoformat(),
+                "ok": probe.ok,
+                "connect_ms": probe.connect_ms,
+                "query_ms": probe.query_ms,
+                "error": probe.error,
+            }
+            for probe in probes
+        ]
+        print(json.dumps(results, indent=4, ensure_ascii=False))
+    else:
+        for probe in probes:
+            print(servers_probe.probe_report(probe))
+
+    return EXIT_OK if all(probe.ok for probe in probes) else EXIT_FAILED
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="Pytre", description="Execution des requêtes sans interface graphique")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="execution d'une requête")
+    run.add_argument("query", help="nom de la requête, nom ou chemin de son fichier")
+    run.add_argument("--server", default="", help="id du serveur, par défaut le 1er de la requête")
+    run.add_argument("--param", action="append", default=[], metavar="NOM=VALEUR", help="valeur d'un paramètre")
+    run.add_argument("--out", default="", help="fichier ou dossier d'extraction")
+    run.add_argument("--format", default="", choices=list(sql_query.EXTRACT_FORMATS), help="format d'extraction")
+
+    batch = commands.add_parser("batch", help="execution des requêtes d'un manifeste json")
+    batch.add_argument("manifest", help="fichier json, liste de {query, server, params, out, format}")
+    batch.add_argument("--jobs", type=int, default=CLI_JOBS, help="nombre de requêtes executées simultanément")
+
+    probe = commands.add_parser("probe", help="test de connexion et latence des serveurs, code retour 1 si un échoue")
+    probe.add_argument("--server", action="append", default=[], help="id du serveur, par défaut tous")
+    probe.add_argument("--timeout", type=int, default=servers_probe.PROBE_TIMEOUT, help="timeout en secondes")
+    probe.add_argument("--json", action="store_true", help="résultats au format json")
+
+    return parser
+
+
+def cli_start(argv: list[str] = None) -> int:
+    args = get_parser().parse_args(argv)
+
+    try:
+        if args.command == "probe":
+            jobs = []
+        elif args.command == "run":
+            jobs = [{"query": args.query, "server": args.server, "out": args.out, "format": args.format}]
+            jobs[0]["params"] = parse_params(args.param)
+        else:
+            jobs = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if kee.Kee().is_ko:
+        print(f"Erreur : {kee.Kee().error_msg}", file=sys.stderr)
+        return EXIT_USAGE
+
+    user: users.CurrentUser = users.CurrentUser()
+    if not user.is_authorized:
+        print(f"Erreur : {user.username} n'est pas dans liste des utilisateurs autorisées", file=sys.stderr)
+        return EXIT_FAILED
+
+    if args.command == "probe":
+        return run_probe(args.server, user, args.timeout, args.json)
+
+    queries, _ = sql_query.get_queries(settings.Settings().queries_folder)
+    try:
+        for job in jobs:
+            job["file"] = str(find_query_file(job["query"], queries))
+    except LookupError as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    start = time.perf_counter()
+    results = run_jobs(jobs, args.jobs if args.command == "batch" else 1)
+    failed = sum(1 for result in results if not result["ok"])
+    rows = "{:,}".format(sum(result["rows"] for result in results)).replace(",", " ")
+    print(f"{len(results) - failed}/{len(results)} requêtes ok, {rows} lignes en {time.perf_counter() - start:.1f}s")
+
+    return EXIT_OK if failed == 0 else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(cli_start())
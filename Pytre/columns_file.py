@@ -0,0 +1,293 @@
+import sys
+import json
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+from decimal import Decimal
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from convert import shared_convert
+
+
+COLUMNS_SUFFIX: str = ".cols"  # extension du fichier colonnes ajoutée au nom du fichier extrait
+MAGIC: bytes = b"PYTRCOL1"  # signature en début et fin de fichier
+FOOTER_SIZE: struct.Struct = struct.Struct("<Q")  # taille de l'index écrit en fin de fichier
+ALIGN: int = 8  # alignement des tableaux dans le fichier
+
+_EPOCH: datetime = datetime(1970, 1, 1)
+
+# types de colonnes : q entiers 64 bits, d flottants 64 bits, b booléens, T dates en microsecondes depuis 1970,
+# n décimaux en texte (valeur exacte), t textes
+_KINDS: dict = {int: "q", bool: "b", float: "d", datetime: "T", Decimal: "n", str: "t"}
+_FORMATS: dict = {"q": "q", "d": "d", "b": "b", "T": "q"}  # format des tableaux selon le type de colonne
+
+
+def columns_path(extract_file: str | Path) -> Path:
+    """chemin du fichier colonnes associé à un fichier extrait"""
+    extract_file = Path(extract_file)
+    return extract_file.with_name(extract_file.name + COLUMNS_SUFFIX)
+
+
+class ColumnsWriter:
+    """
+    Ecriture en colonnes des enregistrements d'une extraction, à côté du fichier extrait.
+    Chaque bloc d'enregistrements est écrit en un groupe de lignes : un tableau typé par colonne
+    (+ masque des valeurs nulles si besoin). L'index des groupes est écrit en fin de fichier à la fermeture.
+    """
+
+    def __init__(self, file: str | Path, text_func=None):
+        self.file = Path(file)
+        self.text_func = text_func  # traitement optionnel des textes avant écriture (recodage...)
+        self.converter = shared_convert()
+
+        self.columns: list[str] = []
+        self.groups: list[dict] = []
+        self.rows_count: int = 0
+
+        self.f = open(self.file, mode="wb")
+        self.f.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:  # fichier incomplet qui sera supprimé, fermeture sans masquer l'erreur d'origine
+            try:
+                self.f.close()
+            except Exception:
+                pass
+
+    def set_header(self, columns: list[str]) -> None:
+        self.columns = [str(column) for column in columns]
+
+    def write(self, records: list) -> None:
+        if not records:
+            return
+
+        cols_infos = [self._write_column([record[i] for record in records]) for i in range(len(records[0]))]
+        self.groups.append({"rows": len(records), "cols": cols_infos})
+        self.rows_count += len(records)
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+
+        footer = {
+            "columns": self.columns,
+            "rows": self.rows_count,
+            "byteorder": sys.byteorder,
+            "groups": self.groups,
+        }
+        footer_data = json.dumps(footer).encode("utf-8")
+        self.f.write(footer_data + FOOTER_SIZE.pack(len(footer_data)) + MAGIC)
+        self.f.close()
+
+    def _write_column(self, values: list) -> list:
+        """écriture d'une colonne d'un groupe, renvoie [type, position, taille, position masque, taille masque]"""
+        kind = self._column_kind(values)
+        nulls = bytes(value is None for value in values) if None in values else b""
+
+        if kind == "q":
+            data = array("q", [0 if value is None else value for value in values]).tobytes()
+        elif kind == "d":
+            data = array("d", [0.0 if value is None else value for value in values]).tobytes()
+        elif kind == "b":
+            data = array("b", [0 if value is None else value for value in values]).tobytes()
+        elif kind == "T":
+            data = array("q", [0 if value is None else self._datetime_to_int(value) for value in values]).tobytes()
+        else:
+            if kind == "n":
+                texts = ["" if value is None else str(value) for value in values]
+            elif kind == "t" and self.text_func:
+                texts = ["" if value is None else self.text_func(value) for value in values]
+            elif kind == "t":
+                texts = ["" if value is None else value for value in values]
+            else:  # types mélangés ou non gérés : texte tel que converti pour le fichier extrait
+                kind = "t"
+                texts = ["" if value is None else self.converter.from_result(value) for value in values]
+            data = self._texts_to_bytes(texts)
+
+        data_pos = self._write_aligned(data)
+        nulls_pos = self._write_aligned(nulls) if nulls else 0
+
+        return [kind, data_pos, len(data), nulls_pos, len(nulls)]
+
+    def _column_kind(self, values: list) -> str:
+        kinds = {_KINDS.get(type(value), "") for value in values if value is not None}
+        if len(kinds) == 1:
+            kind = kinds.pop()
+            return kind if kind else "?"
+        elif kinds == {"q", "d"}:
+            return "d"
+        else:
+            return "t" if not kinds else "?"
+
+    def _texts_to_bytes(self, texts: list[str]) -> bytes:
+        blob = "".join(texts).encode("utf-8", errors="replace")
+        if blob.isascii():  # 1 caractère = 1 octet, positions calculées sans encoder chaque texte
+            sizes = map(len, texts)
+        else:
+            sizes = (len(text.encode("utf-8", errors="replace")) for text in texts)
+
+        offsets = array("q", [0])
+        position = 0
+        for size in sizes:
+            position += size
+            offsets.append(position)
+
+        return FOOTER_SIZE.pack(len(offsets)) + offsets.tobytes() + blob
+
+    def _write_aligned(self, data: bytes) -> int:
+        padding = -self.f.tell() % ALIGN
+        if padding:
+            self.f.write(b"\0" * padding)
+
+        position = self.f.tell()
+        self.f.write(data)
+        return position
+
+    def _datetime_to_int(self, value: datetime) -> int:
+        delta = value.replace(tzinfo=None) - _EPOCH
+        return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class ColumnsReader:
+    """
+    Lecture d'un fichier colonnes sans le charger en mémoire : le fichier est mappé en mémoire
+    et seules les lignes demandées sont décodées.
+    """
+
+    def __init__(self, file: str | Path):
+        self.file = Path(file)
+        self.converter = shared_convert()
+
+        self.f = open(self.file, mode="rb")
+        try:
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+            footer = self._read_footer()
+        except Exception:
+            self.close()
+            raise
+
+        self.columns: list[str] = footer["columns"]
+        self.rows_count: int = footer["rows"]
+        self.groups: list[dict] = footer["groups"]
+
+        # 1ère ligne de chaque groupe pour retrouver le groupe d'une ligne
+        self.groups_start: list[int] = []
+        start = 0
+        for group in self.groups:
+            self.groups_start.append(start)
+            start += group["rows"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        if getattr(self, "mm", None) is not None:
+            self.mm.close()
+            self.mm = None
+        self.f.close()
+
+    def rows(self, start: int, count: int) -> list[list]:
+        """lignes [start, start + count[ avec les valeurs typées"""
+        rows: list[list] = []
+        end = min(start + count, self.rows_count)
+
+        while start < end:
+            group_idx = bisect_right(self.groups_start, start) - 1
+            group_start = self.groups_start[group_idx]
+            group = self.groups[group_idx]
+
+            i = start - group_start
+            j = min(end - group_start, group["rows"])
+            columns = [self._read_column(col_infos, i, j) for col_infos in group["cols"]]
+            rows.extend(list(row) for row in zip(*columns))
+            start = group_start + j
+
+        return rows
+
+    def rows_text(self, start: int, count: int) -> list[list[str]]:
+        """lignes [start, start + count[ converties en texte comme pour le fichier extrait (textes déjà recodés)"""
+        from_result = self.converter.from_result
+        return [[from_result(value) for value in row] for row in self.rows(start, count)]
+
+    def _read_footer(self) -> dict:
+        tail_size = FOOTER_SIZE.size + len(MAGIC)
+        if self.mm[: len(MAGIC)] != MAGIC or self.mm[-len(MAGIC) :] != MAGIC:
+            raise ValueError(f"{self.file.name} n'est pas un fichier colonnes valide")
+
+        (footer_size,) = FOOTER_SIZE.unpack(self.mm[-tail_size : -len(MAGIC)])
+        footer = json.loads(self.mm[-tail_size - footer_size : -tail_size].decode("utf-8"))
+        if footer["byteorder"] != sys.byteorder:
+            raise ValueError(f"{self.file.name} a été écrit sur un système incompatible")
+
+        return footer
+
+    def _read_column(self, col_infos: list, i: int, j: int) -> list:
+        kind, data_pos, data_size, nulls_pos, nulls_size = col_infos
+
+        if kind in _FORMATS:
+            with memoryview(self.mm) as mm_view, mm_view[data_pos : data_pos + data_size].cast(_FORMATS[kind]) as mv:
+                column = mv[i:j].tolist()
+            if kind == "T":
+                column = [_EPOCH + timedelta(microseconds=value) for value in column]
+            elif kind == "b":
+                column = [bool(value) for value in column]
+        else:
+            (offsets_count,) = FOOTER_SIZE.unpack(self.mm[data_pos : data_pos + FOOTER_SIZE.size])
+            offsets_pos = data_pos + FOOTER_SIZE.size
+            blob_pos = offsets_pos + offsets_count * 8
+            with memoryview(self.mm) as mm_view, mm_view[offsets_pos:blob_pos].cast("q") as mv:
+                offsets = mv[i : j + 1].tolist()
+            blob = self.mm[blob_pos + offsets[0] : blob_pos + offsets[-1]].decode("utf-8", errors="replace")
+            if blob.isascii():
+                column = [blob[start - offsets[0] : end - offsets[0]] for start, end in zip(offsets, offsets[1:])]
+            else:
+                raw = self.mm[blob_pos + offsets[0] : blob_pos + offsets[-1]]
+                column = [
+                    raw[start - offsets[0] : end - offsets[0]].decode("utf-8", errors="replace")
+                    for start, end in zip(offsets, offsets[1:])
+                ]
+            if kind == "n":
+                column = [Decimal(value) if value else None for value in column]
+
+        if nulls_size:
+            nulls = self.mm[nulls_pos + i : nulls_pos + j]
+            column = [None if is_null else value for value, is_null in zip(column, nulls)]
+
+        return column
+
+
+if __name__ == "__main__":
+    import time
+
+    rows_count = 1_000_000
+    test_file = Path(__file__).parent / "columns_test.cols"
+    records = [
+        (i, f"Libellé n°{i}", Decimal(i) / 100, datetime(2024, 1, 1 + i % 28), i * 1.5 if i % 3 else None, i % 2 > 0)
+        for i in range(rows_count)
+    ]
+
+    start = time.perf_counter()
+    with ColumnsWriter(test_file) as writer:
+        writer.set_header(["id", "libelle", "montant", "date", "ratio", "pair"])
+        for i in range(0, rows_count, 10_000):
+            writer.write(records[i : i + 10_000])
+    print(f"Ecriture de {rows_count:,} lignes en {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    with ColumnsReader(test_file) as reader:
+        page = reader.rows_text(rows_count // 2, 500)
+        print(f"Lecture de 500 lignes sur {reader.rows_count:,} en {time.perf_counter() - start:.4f}s")
+        print(reader.columns, page[0])
+        assert reader.rows(0, rows_count) == [list(record) for record in records]
+
+    test_file.unlink()
@@ -0,0 +1,209 @@
+import re
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+import servers
+from singleton_metaclass import Singleton
+
+POOL_IDLE_TIMEOUT: float = 300.0  # secondes sans utilisation avant fermeture d'une connexion
+POOL_MAX_AGE: float = 1800.0  # secondes depuis l'ouverture avant renouvellement d'une connexion
+POOL_MAX_IDLE: int = 2  # connexions inutilisées conservées par serveur
+POOL_CHECK_INTERVAL: float = 60.0  # secondes entre deux fermetures des connexions expirées par le worker
+
+# commande qui modifie l'état de la session (objets temporaires, options SET hors variables, changement de base
+# ou de contexte de sécurité) : connexion non réutilisée
+_SESSION_STATE_REGEX = re.compile(
+    r"#|\bTEMP(?:ORARY)?\b|\bSET\b(?!\s*@)|\bUSE\s+[\w\[\"]|\bsp_setapprole\b|\bEXEC(?:UTE)?\s+AS\b|\bset_config\b",
+    re.IGNORECASE,
+)
+
+
+def is_reusable(cmd: str) -> bool:
+    """la connexion peut être réutilisée après execution de la commande, sans effet sur les suivantes"""
+    return not _SESSION_STATE_REGEX.search(cmd or "")
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "database", "created", "last_used", "reusable")
+
+    def __init__(self, conn, database: str = ""):
+        self.conn = conn
+        self.database: str = database.strip("[]\"").casefold()  # base du serveur, vérifiée avant réutilisation
+        self.created: float = time.monotonic()
+        self.last_used: float = self.created
+        self.reusable: bool = True
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.last_used > POOL_IDLE_TIMEOUT or now - self.created > POOL_MAX_AGE
+
+
+class ConnectionsPool(metaclass=Singleton):
+    """
+    Connexions ouvertes conservées par serveur pour le processus courant (worker d'execution des requêtes),
+    afin de ne pas refaire la connexion et l'initialisation de session à chaque requête. Une connexion est
+    vérifiée avant d'être réutilisée (toujours sur la base du serveur) et réinitialisée (rollback) après chaque
+    utilisation. Les paramètres de session
+    (lecture seule, timeout) définis à la connexion sont conservés.
+    """
+
+    def __init__(self):
+        self.idle: dict[tuple, list[_PooledConnection]] = {}  # clé du serveur : connexions disponibles
+        self.in_use: dict[int, _PooledConnection] = {}  # id de la connexion : connexion utilisée
+        self.lock: Lock = Lock()  # connexion ouverte à l'avance dans un thread pendant une execution
+
+    @contextmanager
+    def connection(self, server: servers.Server, reusable: bool = True):
+        """connexion au serveur, rendue au pool en fin d'utilisation si réutilisable et sans erreur"""
+        key = self.server_key(server)
+        pooled = self._acquire(server, key)
+        pooled.reusable = reusable
+        self.in_use[id(pooled.conn)] = pooled
+        ok = False
+        try:
+            yield pooled.conn
+            ok = True
+        finally:
+            del self.in_use[id(pooled.conn)]
+            if ok and pooled.reusable and self._reset(server, pooled.conn):
+                pooled.last_used = time.monotonic()
+                with self.lock:
+                    self.idle.setdefault(key, []).append(pooled)
+                    self._trim(key)
+            else:
+                self._close(pooled.conn)
+
+    def discard(self, conn) -> None:
+        """connexion fermée en fin d'utilisation (lignes non lues, erreur inattendue) au lieu d'être réutilisée"""
+        if id(conn) in self.in_use:
+            self.in_use[id(conn)].reusable = False
+
+    def close_expired(self) -> None:
+        now = time.monotonic()
+        expired: list[_PooledConnection] = []
+        with self.lock:
+            for pooled_list in self.idle.values():
+                expired += [pooled for pooled in pooled_list if pooled.is_expired(now)]
+                pooled_list[:] = [pooled for pooled in pooled_list if not pooled.is_expired(now)]
+
+        for pooled in expired:
+            self._close(pooled.conn)
+
+    def close_all(self) -> None:
+        with self.lock:
+            idle, self.idle = self.idle, {}
+
+        for pooled_list in idle.values():
+            for pooled in pooled_list:
+                self._close(pooled.conn)
+
+    def server_key(self, server: servers.Server) -> tuple:
+        """paramètres de connexion : une modification du serveur ne réutilise pas les anciennes connexions"""
+        infos = server.to_dict()
+        return tuple(str(infos[key]) for key in sorted(infos) if key not in ("description", "grp_authorized"))
+
+    def _acquire(self, server: servers.Server, key: tuple) -> _PooledConnection:
+        now = time.monotonic()
+        while True:
+            with self.lock:
+                pooled_list = self.idle.get(key, [])
+                pooled = pooled_list.pop() if pooled_list else None  # la plus récemment utilisée
+            if pooled is None:
+                break
+            if not pooled.is_expired(now) and self._is_healthy(server, pooled):
+                return pooled
+            self._close(pooled.conn)
+
+        return _PooledConnection(server.get_connection(), server.database or "")
+
+    def _trim(self, key: tuple) -> None:
+        pooled_list = self.idle[key]
+        while len(pooled_list) > POOL_MAX_IDLE:
+            self._close(pooled_list.pop(0).conn)
+
+    def _is_healthy(self, server: servers.Server, pooled: _PooledConnection) -> bool:
+        """connexion ouverte, en lecture seule (PostgreSQL) et sur la base du serveur (USE non détecté...)"""
+        conn = pooled.conn
+        try:
+            cursor = conn.cursor()
+            if server.type == servers.ServerType.postgre.name:
+                cursor.execute("SELECT current_setting('default_transaction_read_only'), current_database()")
+                read_only, database = cursor.fetchone()
+                healthy = read_only == "on"
+            else:
+                cursor.execute("SELECT DB_NAME()")
+                database = cursor.fetchone()[0]
+                healthy = database is not None
+            cursor.close()
+            if pooled.database and str(database).casefold() != pooled.database:
+                healthy = False
+            conn.rollback()
+            return healthy
+        except Exception:
+            return False
+
+    def _reset(self, server: servers.Server, conn) -> bool:
+        try:
+            conn.rollback()  # fin de la transaction en cours, sans annuler les paramètres de session déjà validés
+            return server.type != servers.ServerType.postgre.name or conn.closed == 0
+        except Exception:
+            return False
+
+    def _close(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    # démonstration sans serveur : connexions simulées, la base courante change avec USE
+    class DemoCursor:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def execute(self, cmd: str):
+            if cmd.upper().startswith("USE "):
+                self.conn.database = cmd[4:].strip(" ;")
+
+        def fetchone(self):
+            return (self.conn.database,)
+
+        def close(self):
+            pass
+
+    class DemoConnection:
+        count: int = 0
+
+        def __init__(self):
+            DemoConnection.count += 1
+            self.database = "ventes"
+
+        def cursor(self):
+            return DemoCursor(self)
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    class DemoServer:
+        type, database = servers.ServerType.mssql.name, "ventes"
+        get_connection = staticmethod(DemoConnection)
+
+        def to_dict(self) -> dict:
+            return {"id": "demo", "type": self.type, "database": self.database}
+
+    pool, server = ConnectionsPool(), DemoServer()
+    for cmd in ("SELECT * FROM t", "SELECT * FROM t", "USE compta; SELECT * FROM t", "SELECT * FROM t"):
+        with pool.connection(server, is_reusable(cmd)) as conn:
+            conn.cursor().execute(cmd)
+        print(f"{cmd} : réutilisable {is_reusable(cmd)}, {len(pool.idle[pool.server_key(server)])} connexion(s) en pool")
+
+    # USE non détecté (requête dynamique...) : connexion écartée à la réutilisation car sur une autre base
+    with pool.connection(server) as conn:
+        conn.cursor().execute("USE compta")
+    with pool.connection(server) as conn:
+        database = conn.database
+    print(f"Connexions ouvertes : {DemoConnection.count}, base de la dernière utilisée : {database}")
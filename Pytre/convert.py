@@ -1,8 +1,23 @@
-import re
+from decimal import Decimal
 from datetime import datetime
 
 
+_SHARED: dict = {}  # Convert partagés par combinaison (format date, séparateur champs, séparateur décimal)
+
+
+def shared_convert(date_txt_format="%d/%m/%Y", field_separator=";", decimal_separator=",") -> "Convert":
+    """Convert partagé pour une combinaison de formats, créé à la 1ère demande"""
+    key = (date_txt_format, field_separator, decimal_separator)
+    converter = _SHARED.get(key)
+    if converter is None:
+        converter = _SHARED.setdefault(key, Convert(*key))
+
+    return converter
+
+
 class Convert:
+    """Conversions des valeurs, non modifiable une fois créé pour pouvoir être partagé (voir shared_convert)"""
+
     def __init__(self, date_txt_format="%d/%m/%Y", field_separator=";", decimal_separator=","):
         self.date_txt_format = date_txt_format  # pour affichage utilisateurs ou extraction
         self.date_val_format = "%Y-%m-%d"  # pour commande SQL
@@ -17,6 +32,13 @@ class Convert:
         self.cls_to_display = _ToDisplay(self)
         self.cls_from_result = _FromResult(self)
 
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Convert non modifiable, impossible de changer {name}")
+        super().__setattr__(name, value)
+
     def to_cmd(self, type_name: str, string_to_convert: str, type_args=[]) -> str:
         return self.cls_to_cmd.transform(type_name, string_to_convert, type_args)
 
@@ -26,24 +48,33 @@ class Convert:
     def from_result(self, value) -> str:
         return self.cls_from_result.transform(value)
 
+    def from_result_plan(self, record) -> list:
+        """liste des fonctions de conversion par colonne, déterminées à partir d'un enregistrement type"""
+        return self.cls_from_result.plan(record)
+
 
 class _ToCmd:
     def __init__(self, parent):
         self.parent: Convert = parent
+        self.funcs: dict = self._init_func_dict()  # table de dispatch par type, construite une seule fois
 
     def transform(self, type_name: str, string_to_convert: str, type_args=[]) -> str:
         if string_to_convert == "":
             return self._convert_to_null_value(type_name)
 
-        if self.func_dict().get(type_name):
+        func = self.funcs.get(type_name)
+        if func:
             if type_args == []:
-                return self.func_dict()[type_name](string_to_convert)
+                return func(string_to_convert)
             else:
-                return self.func_dict()[type_name](string_to_convert, type_args)
+                return func(string_to_convert, type_args)
         else:
             return string_to_convert
 
     def func_dict(self) -> dict:
+        return self.funcs
+
+    def _init_func_dict(self) -> dict:
         my_dict = {
             "bit": self._str_to_bit,
             "int": self._str_to_int,
@@ -144,16 +175,21 @@ class _ToCmd:
 class _ToDisplay:
     def __init__(self, parent):
         self.parent: Convert = parent
+        self.funcs: dict = self._init_func_dict()  # table de dispatch par type, construite une seule fois
 
     def transform(self, type_name: str, value_to_convert: str) -> str:
+        func = self.funcs.get(type_name)
         if value_to_convert == "":
             return self._convert_to_null_value(type_name)
-        elif self.func_dict().get(type_name):
-            return self.func_dict()[type_name](value_to_convert)
+        elif func:
+            return func(value_to_convert)
         else:
             return value_to_convert
 
     def func_dict(self) -> dict:
+        return self.funcs
+
+    def _init_func_dict(self) -> dict:
         my_dict = {"date": self._date_to_str, "datetime": self._datetime_to_str}
 
         return my_dict
@@ -181,26 +217,43 @@ class _FromResult:
     def __init__(self, parent):
         self.parent: Convert = parent
 
+        # table de dispatch par type, construite une seule fois
+        self.types_dict: dict = {
+            str: self._from_string,
+            Decimal: self._from_number,
+            float: self._from_number,
+            int: self._from_int,
+            bool: self._from_bool,
+            datetime: self._from_datetime,
+            type(None): self._from_none,
+        }
+
     def transform(self, value) -> str:
-        type_name = str(type(value))
+        func = self.types_dict.get(type(value))
 
-        if self.func_dict().get(type_name):
-            return self.func_dict()[type_name](value)
+        if func:
+            return func(value)
         else:
             return str(value).replace(self.parent.field_separator, "")  # enlever txt identique au délim de champs
 
-    def func_dict(self) -> dict:
-        my_dict = {
-            "<class 'str'>": self._from_string,
-            "<class 'decimal.Decimal'>": self._from_number,
-            "<class 'float'>": self._from_number,
-            "<class 'int'>": self._from_number,
-            "<class 'bool'>": self._from_bool,
-            "<class 'datetime.datetime'>": self._from_datetime,
-            "<class 'NoneType'>": self._from_none,
-        }
+    def plan(self, record) -> list:
+        """
+        Fonctions de conversion spécialisées par colonne selon le type des valeurs de l'enregistrement.
+        Si une valeur d'une colonne n'a pas le type attendu, conversion générique via transform.
+        """
+        return [self._column_func(type(value)) for value in record]
 
-        return my_dict
+    def _column_func(self, value_type: type):
+        func = self.types_dict.get(value_type)
+        if func is None or value_type is type(None):
+            return self.transform
+
+        transform = self.transform
+
+        def convert(value) -> str:
+            return func(value) if type(value) is value_type else transform(value)
+
+        return convert
 
     def _from_string(self, value: str) -> str:
         if value == " ":
@@ -211,10 +264,15 @@ class _FromResult:
         return value_txt
 
     def _from_number(self, value) -> str:
-        if str(value)[0:3] == "0E-":
+        value_txt = str(value)
+
+        if value_txt[0:3] == "0E-":
             value_txt = ""
+        elif "." not in value_txt:
+            pass
         else:
-            value_txt = re.sub(r"(\.\d*?)(0*$)", r"\1", str(value))  # enleve trailing 0 des décimales
+            if "E" not in value_txt and "e" not in value_txt:
+                value_txt = value_txt.rstrip("0")  # enleve trailing 0 des décimales
             if value_txt[-1] == ".":  # si dernier caractère séparateur décimal alors l'enlever
                 value_txt = value_txt[:-1]
             else:  # sinon on le remplace par le séparateur décimal voulu
@@ -222,6 +280,9 @@ class _FromResult:
 
         return value_txt
 
+    def _from_int(self, value: int) -> str:
+        return str(value)
+
     def _from_bool(self, value: bool) -> str:
         if value:
             value_txt = "Vrai"
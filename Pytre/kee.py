@@ -9,6 +9,7 @@ from pykeepass.exceptions import CredentialsError
 from pykeepass.entry import Entry
 from pykeepass.group import Group
 
+import kee_snapshot
 from singleton_metaclass import Singleton
 from ui.InputDialog import InputDialog
 from credentials import crypted_file_pwd_get, crypted_file_pwd_history, crypted_file_pwd_change
@@ -17,6 +18,7 @@ from credentials import crypted_file_pwd_get, crypted_file_pwd_history, crypted_
 KEE_FILE: Path = Path().cwd() / "Pytre.db"
 BLANK_FILE: str = "res/blank.db"  # relative path for blank db
 BLANK_PWD: str = "password"  # password for blank db
+INTERACTIVE: bool = True  # False en ligne de commande : pas de boîte de dialogue, erreur dans Kee().error_msg
 
 
 def get_app_path() -> Path:
@@ -38,8 +40,13 @@ class Kee(metaclass=Singleton):
         self.db: PyKeePass = None
         self.is_open: bool = False
         self.is_ko: bool = False
+        self.error_msg: str = ""  # raison de l'accès ko, pour l'afficher hors interface graphique
         self.opening_count: int = 0
 
+        self.snapshot_mode: bool = False  # entrées lues dans le snapshot local, base keepass pas encore chargée
+        self.snapshot_groups: dict[str, kee_snapshot.SnapshotGroup] = {}
+        self.signature: dict = {}  # signature du fichier correspondant aux entrées chargées
+
         self.grp_name_settings: str = "Paramètres"
         self.grp_settings: Group = None
         self.grp_name_servers: str = "Serveurs"
@@ -52,42 +59,164 @@ class Kee(metaclass=Singleton):
         if not self.is_open and not self.is_ko:
             self._open_db()
 
-    def _open_db(self, reload: bool = False):
-        """A utiliser uniquement par la méthode open_db des classes User, Server et Settings"""
+    @property
+    def db(self) -> PyKeePass:
+        """base keepass, chargée entièrement à la première utilisation si les entrées viennent du snapshot"""
+        if self.snapshot_mode:
+            self._open_full()
+        return self._db
+
+    @db.setter
+    def db(self, value: PyKeePass):
+        self._db = value
+
+    def _open_db(self, reload: bool = False, writable: bool = False):
+        """
+        A utiliser uniquement par la méthode open_db des classes User, Server et Settings.
+        Les entrées sont lues dans le snapshot local tant que le fichier n'a pas changé, writable pour modifier
+        les entrées (base keepass chargée entièrement).
+        """
         if not self.is_open:
-            try:
-                self.db = PyKeePass(self.file, password=self.pwd)
-            except FileNotFoundError:
-                self.create_db()
-            except CredentialsError:  # si erreur mot de passe, tentative avec les précédents
-                self.pwd_try_old_ones()
-
+            if writable or not self._open_snapshot():
+                self._open_full()
             self.is_open = True
-            self.opening_count += 1
-            print(f"Opening count : {self.opening_count}")
-        elif reload:
+        elif self.snapshot_mode:
+            if writable or (reload and self._file_changed()):
+                self._open_full()
+        elif reload and self._file_changed():
+            self.signature = self._file_signature()
             self.db.reload()
             self.opening_count += 1
             print(f"Opening count : {self.opening_count}")
+            self._snapshot_save()
+
+        self._set_groups()
+
+    def _open_full(self):
+        self.snapshot_mode = False
+        self.snapshot_groups = {}
+        self.signature = self._file_signature()  # avant la lecture : un fichier modifié pendant sera relu
+        try:
+            self.db = PyKeePass(self.file, password=self.pwd)
+        except FileNotFoundError:
+            self.create_db()
+        except CredentialsError:  # si erreur mot de passe, tentative avec les précédents
+            self.pwd_try_old_ones()
+
+        self.opening_count += 1
+        print(f"Opening count : {self.opening_count}")
+
+        if not self.is_ko:
+            self._set_groups()
+            self._snapshot_save()
+
+    def _open_snapshot(self) -> bool:
+        self.signature = self._file_signature()
+        if not self.signature or not self.pwd:
+            return False
 
-        self.grp_settings = self.db.find_groups(name=self.grp_name_settings, first=True)
-        self.grp_servers = self.db.find_groups(name=self.grp_name_servers, first=True)
-        self.grp_users = self.db.find_groups(name=self.grp_name_users, first=True)
+        groups = kee_snapshot.load(self.file, self.pwd, self.signature)
+        if groups is None:
+            return False
+
+        self.snapshot_groups = groups
+        self.snapshot_mode = True
+        print("Opening from snapshot")
+        return True
+
+    def _snapshot_save(self):
+        if not self.signature:
+            return
+
+        groups = {
+            self.grp_name_settings: self.grp_settings,
+            self.grp_name_servers: self.grp_servers,
+            self.grp_name_users: self.grp_users,
+        }
+        kee_snapshot.save(self.file, self.pwd, self.signature, groups)
+
+    def _set_groups(self):
+        if self.snapshot_mode:
+            self.grp_settings = self.snapshot_groups.get(self.grp_name_settings)
+            self.grp_servers = self.snapshot_groups.get(self.grp_name_servers)
+            self.grp_users = self.snapshot_groups.get(self.grp_name_users)
+        elif self._db is None:  # accès ko
+            self.grp_settings, self.grp_servers, self.grp_users = None, None, None
+        else:
+            self.grp_settings = self._db.find_groups(name=self.grp_name_settings, first=True)
+            self.grp_servers = self._db.find_groups(name=self.grp_name_servers, first=True)
+            self.grp_users = self._db.find_groups(name=self.grp_name_users, first=True)
+
+    def _file_signature(self) -> dict:
+        try:
+            return kee_snapshot.file_signature(self.file)
+        except OSError:
+            return {}
+
+    def _file_changed(self, check_content: bool = False) -> bool:
+        """
+        Fichier modifié depuis sa lecture : date et taille comparées, puis contenu seulement si elles ont changé
+        ou si check_content (avant un enregistrement, pour une modification dans la même seconde)
+        """
+        try:
+            file_stat = os.stat(self.file)
+        except OSError:
+            return bool(self.signature)
+
+        stat_signature = {"mtime_ns": file_stat.st_mtime_ns, "size": file_stat.st_size}
+        if not check_content and all(self.signature.get(key) == val for key, val in stat_signature.items()):
+            return False
+
+        signature = self._file_signature()
+        if not signature or signature["sha256"] != self.signature.get("sha256"):
+            return True
+
+        if signature != self.signature:  # fichier seulement touché, contenu identique
+            self.signature = signature
+            self._snapshot_save()
+        return False
+
+    def save_db(self) -> bool:
+        if self._file_changed(check_content=True):
+            self.signature = {}  # rechargement forcé pour repartir des modifications de l'autre utilisateur
+            msg = (
+                "La base des paramètres a été modifiée par un autre utilisateur depuis sa lecture !\n"
+                + "Vos modifications n'ont pas été enregistrées pour ne pas écraser les siennes.\n\n"
+                + "Rechargez les informations puis recommencez."
+            )
+            self._alert("showerror", "Erreur enregistrement", msg)
+            return False
 
-    def save_db(self):
         try:
             self.db.save()
         except PermissionError:
+            self.signature = {}  # modifications non enregistrées, à annuler au prochain rechargement
             msg = (
                 "Vous n'avez les droits d'accès à la base des paramètres !\n"
                 + "Vos modifications n'ont pas pu être enregistées.\n\n"
                 + "Merci d'alerter les administateurs."
             )
-            messagebox.showerror(title="Erreur enregistrement", message=msg)
+            self._alert("showerror", "Erreur enregistrement", msg)
+            return False
+
+        self.signature = self._file_signature()
+        self._snapshot_save()
+        return True
+
+    def _alert(self, kind: str, title: str, msg: str):
+        """boîte de dialogue messagebox.<kind>, ou message dans la console en ligne de commande"""
+        if INTERACTIVE:
+            getattr(messagebox, kind)(title=title, message=msg)
+        else:
+            print(f"{title} : {msg}", file=sys.stderr)
 
     def create_db(self):
         self.is_ko = True
 
+        if not INTERACTIVE:  # création impossible sans saisie du mot de passe et du dossier des requêtes
+            self.error_msg = f"la base des paramètres n'a pas été trouvée : {self.file}"
+            return
+
         msg = "La base des paramètres n'a pas été trouvée !\n" + "Une nouvelle base va être créée."
         messagebox.showwarning(title="Base introuvable", message=msg)
 
@@ -125,7 +254,7 @@ class Kee(metaclass=Singleton):
         for k, v in params.items():
             self.db.add_entry(grps["Paramètres"], title=k, username=v, password="")
 
-        server_cfg = ["charset", "database", "host", "login_timeout", "port", "server", "timeout"]
+        server_cfg = ["charset", "database", "host", "login_timeout", "port", "server", "timeout", "fetch_size"]
         s_entry: Entry = self.db.add_entry(grps["Serveurs"], title="Default", username="", password="")
         for item in server_cfg:
             s_entry.set_custom_property(item, "")
@@ -154,11 +283,16 @@ class Kee(metaclass=Singleton):
                     + "une erreur d'enregistrement lorsque le programme à tenter de "
                     + "le mettre à jour."
                 )
-                messagebox.showwarning(title="Récupération mot de passe", message=msg)
+                self._alert("showwarning", "Récupération mot de passe", msg)
                 return True
             except CredentialsError:
                 pass
 
+        if not INTERACTIVE and _iter == 0:
+            self.is_ko = True
+            self.error_msg = "mot de passe d'accès aux paramètres non valide, même avec les anciens"
+            return False
+
         # si aucun des anciens mots de passe ne marche alors on demande à l'utilisateur le bon mot de passe
         pwd = InputDialog.ask("Mot de passe, accès paramètres ?", "Mot de passe :")
         if pwd and self.pwd_try_old_ones([pwd], _iter + 1):
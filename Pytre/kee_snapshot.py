@@ -0,0 +1,137 @@
+import os
+import json
+import base64
+import hashlib
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+
+import user_prefs
+from credentials_secrets import KEY
+
+SNAPSHOT_FILE: Path = user_prefs.USER_FOLDER / "Pytre_Settings.snapshot"
+SNAPSHOT_VERSION: int = 1  # à incrémenter si le contenu du snapshot change
+
+
+def file_signature(file: Path) -> dict:
+    """date de modification, taille et empreinte du contenu de la base keepass"""
+    file_stat = os.stat(file)
+    file_hash = hashlib.sha256(Path(file).read_bytes()).hexdigest()
+    return {"mtime_ns": file_stat.st_mtime_ns, "size": file_stat.st_size, "sha256": file_hash}
+
+
+def _cipher(pwd: str) -> Fernet:
+    """clé dérivée du mot de passe de la base : un changement de mot de passe invalide le snapshot"""
+    app_key = KEY.encode() if isinstance(KEY, str) else KEY
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(app_key + pwd.encode()).digest()))
+
+
+class SnapshotEntry:
+    """entrée en lecture seule, mêmes attributs que pykeepass.entry.Entry pour les classes qui la lisent"""
+
+    __slots__ = ("_infos",)
+
+    def __init__(self, infos: dict):
+        self._infos = infos
+
+    uuid = property(lambda self: self._infos["uuid"])
+    title = property(lambda self: self._infos["title"])
+    username = property(lambda self: self._infos["username"])
+    password = property(lambda self: self._infos["password"])
+    notes = property(lambda self: self._infos["notes"])
+    tags = property(lambda self: self._infos["tags"])
+    custom_properties = property(lambda self: dict(self._infos["custom_properties"]))
+
+    def get_custom_property(self, key: str) -> str | None:
+        return self._infos["custom_properties"].get(key)
+
+    @classmethod
+    def infos_from_entry(cls, entry) -> dict:
+        return {
+            "uuid": str(entry.uuid),
+            "title": entry.title,
+            "username": entry.username,
+            "password": entry.password,
+            "notes": entry.notes,
+            "tags": list(entry.tags) if entry.tags else None,
+            "custom_properties": dict(entry.custom_properties),
+        }
+
+
+class SnapshotGroup:
+    __slots__ = ("name", "entries")
+
+    def __init__(self, name: str, entries: list[SnapshotEntry]):
+        self.name: str = name
+        self.entries: list[SnapshotEntry] = entries
+
+
+def save(file: Path, pwd: str, signature: dict, groups: dict, snapshot_file: Path = SNAPSHOT_FILE) -> None:
+    """
+    Enregistrement chiffré des entrées des groupes (nom : pykeepass.group.Group) pour la signature de la base,
+    sans exception : sans snapshot la base est simplement lue entièrement au prochain démarrage
+    """
+    content = {
+        "version": SNAPSHOT_VERSION,
+        "file": str(Path(file).resolve()),
+        "signature": signature,
+        "groups": {
+            name: [SnapshotEntry.infos_from_entry(entry) for entry in group.entries] if group is not None else None
+            for name, group in groups.items()
+        },
+    }
+    tmp_file = snapshot_file.with_name(f"{snapshot_file.name}.{os.getpid()}.tmp")  # écriture par plusieurs processus
+    try:
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_bytes(_cipher(pwd).encrypt(json.dumps(content).encode()))
+        os.replace(tmp_file, snapshot_file)
+    except OSError as e:
+        print(f"Snapshot de la base des paramètres non enregistré : {e}")
+        tmp_file.unlink(missing_ok=True)
+
+
+def load(file: Path, pwd: str, signature: dict, snapshot_file: Path = SNAPSHOT_FILE) -> dict | None:
+    """groupes (nom : SnapshotGroup) si le snapshot correspond à la signature de la base, sinon None"""
+    try:
+        content = json.loads(_cipher(pwd).decrypt(snapshot_file.read_bytes()))
+    except (OSError, InvalidToken, ValueError):
+        return None
+
+    if (
+        content.get("version") != SNAPSHOT_VERSION
+        or content.get("file") != str(Path(file).resolve())
+        or content.get("signature") != signature
+    ):
+        return None
+
+    return {
+        name: SnapshotGroup(name, [SnapshotEntry(infos) for infos in entries]) if entries is not None else None
+        for name, entries in content["groups"].items()
+    }
+
+
+if __name__ == "__main__":
+    import time
+    from pykeepass import PyKeePass
+    from kee import KEE_FILE
+    from credentials import crypted_file_pwd_get
+
+    pwd = crypted_file_pwd_get()
+    names = ("Paramètres", "Serveurs", "Utilisateurs")
+
+    # démarrage à froid : lecture complète de la base keepass (KDF, déchiffrement, XML)
+    start = time.perf_counter()
+    signature = file_signature(KEE_FILE)
+    db = PyKeePass(KEE_FILE, password=pwd)
+    groups = {name: db.find_groups(name=name, first=True) for name in names}
+    cold = time.perf_counter() - start
+    save(KEE_FILE, pwd, signature, groups)
+
+    # démarrage à chaud : signature du fichier et lecture du snapshot
+    start = time.perf_counter()
+    snapshot = load(KEE_FILE, pwd, file_signature(KEE_FILE))
+    warm = time.perf_counter() - start
+
+    nb_entries = sum(len(group.entries) for group in snapshot.values() if group is not None)
+    print(f"Base keepass : {KEE_FILE}, {nb_entries} entrées")
+    print(f"Démarrage à froid : {cold * 1000:.1f}ms, à chaud : {warm * 1000:.1f}ms ({cold / warm:.0f}x)")
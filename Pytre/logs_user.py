@@ -7,8 +7,9 @@ import user_prefs
 from singleton_metaclass import Singleton
 
 USER_DB: Path = user_prefs.USER_FOLDER / "Pytre_Logs.db"
-LATEST_VERSION: int = 2  # latest version model of user database
+LATEST_VERSION: int = 4  # latest version model of user database
 LOG_MAX: int = 2500
+PROBE_MAX: int = 5000  # nb de mesures de latence des serveurs conservées
 
 
 class LogRecord:
@@ -22,6 +23,7 @@ class LogRecord:
         self.parameters: dict
         self.file: Path
         self.exported: int
+        self.cache_hit: int
 
     def __repr__(self):
         return str(
@@ -82,6 +84,63 @@ class LogStats:
         )
 
 
+class ProbeRecord:
+    def __init__(self):
+        self.server: str
+        self.start: datetime
+        self.ok: bool
+        self.connect_ms: int
+        self.query_ms: int
+        self.error: str
+
+    def __repr__(self):
+        return str(
+            {
+                "server": self.server,
+                "start": self.start,
+                "ok": self.ok,
+                "connect_ms": self.connect_ms,
+                "query_ms": self.query_ms,
+                "error": self.error,
+            }
+        )
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class ProbeStats:
+    def __init__(self):
+        self.server: str
+        self.nb_probes: int
+        self.nb_failed: int
+        self.avg_connect_ms: int
+        self.max_connect_ms: int
+        self.avg_query_ms: int
+        self.last_probe: datetime
+        self.last_ok: bool
+        self.last_connect_ms: int
+        self.last_error: str
+
+    def __repr__(self):
+        return str(
+            {
+                "server": self.server,
+                "nb_probes": self.nb_probes,
+                "nb_failed": self.nb_failed,
+                "avg_connect_ms": self.avg_connect_ms,
+                "max_connect_ms": self.max_connect_ms,
+                "avg_query_ms": self.avg_query_ms,
+                "last_probe": self.last_probe,
+                "last_ok": self.last_ok,
+                "last_connect_ms": self.last_connect_ms,
+            }
+        )
+
+    def __str__(self):
+        return self.__repr__()
+
+
 class UserDb(metaclass=Singleton):
     def __init__(self, user_db: Path = USER_DB, log_max: int = LOG_MAX):
         self.user_db: Path = Path(user_db)
@@ -132,13 +191,15 @@ class UserDb(metaclass=Singleton):
                             NB_ROWS          INTEGER,
                             PARAMETERS       TEXT,
                             FILE             TEXT,
-                            EXPORTED         INTEGER     NOT NULL DEFAULT 0
+                            EXPORTED         INTEGER     NOT NULL DEFAULT 0,
+                            CACHE_HIT        INTEGER     NOT NULL DEFAULT 0
                         );
                     """
                 )
                 conn.execute("CREATE INDEX IDX_QUERY ON QUERIES_EXEC (QUERY);")
                 conn.execute("CREATE INDEX IDX_START ON QUERIES_EXEC (START DESC);")
                 conn.execute("CREATE INDEX IDX_EXPORTED ON QUERIES_EXEC (EXPORTED ASC);")
+                self.create_table_probes(conn)
 
                 conn.commit()
                 self.user_version = self.latest_version
@@ -201,6 +262,51 @@ class UserDb(metaclass=Singleton):
             print(f"Unexpected error in schema update to version {new_version}: {e}")
             return False
 
+    def update_db_2_to_3(self) -> bool:
+        try:
+            new_version: int = 3
+
+            with sqlite3.connect(self.user_db) as conn:
+                conn.execute(f"PRAGMA user_version = {new_version};")
+                conn.execute("ALTER TABLE QUERIES_EXEC ADD COLUMN CACHE_HIT INTEGER NOT NULL DEFAULT 0;")
+                conn.commit()
+                print(f"User database updated to version {new_version}")
+                self.user_version = new_version
+                return True
+        except Exception as e:
+            print(f"Unexpected error in schema update to version {new_version}: {e}")
+            return False
+
+    def update_db_3_to_4(self) -> bool:
+        try:
+            new_version: int = 4
+
+            with sqlite3.connect(self.user_db) as conn:
+                conn.execute(f"PRAGMA user_version = {new_version};")
+                self.create_table_probes(conn)
+                conn.commit()
+                print(f"User database updated to version {new_version}")
+                self.user_version = new_version
+                return True
+        except Exception as e:
+            print(f"Unexpected error in schema update to version {new_version}: {e}")
+            return False
+
+    def create_table_probes(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """
+                CREATE TABLE IF NOT EXISTS SERVERS_PROBES (
+                    SERVER_ID        TEXT        NOT NULL,
+                    START            TEXT        NOT NULL,
+                    OK               INTEGER     NOT NULL,
+                    CONNECT_MS       INTEGER,
+                    QUERY_MS         INTEGER,
+                    ERROR            TEXT
+                );
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS IDX_PROBES_SERVER ON SERVERS_PROBES (SERVER_ID, START DESC);")
+
     # ------------------------------------------------------------------------------------------
     # insert methods
     # ------------------------------------------------------------------------------------------
@@ -213,6 +319,7 @@ class UserDb(metaclass=Singleton):
         nb_rows: float = None,
         params: dict = None,
         file: str = None,
+        cache_hit: bool = False,
     ) -> None:
         self.check_db()
 
@@ -225,9 +332,10 @@ class UserDb(metaclass=Singleton):
             with sqlite3.connect(f"file:{self.user_db}?mode=rw", uri=True) as conn:
                 # insertion infos
                 conn.execute(
-                    """INSERT INTO QUERIES_EXEC (SERVER_ID, QUERY, START, DURATION_SECS, NB_ROWS, PARAMETERS, FILE)
-                        VALUES (?, ?, ?, ?, ?, ?, ?);""",
-                    (server_id, query, log_start, log_duration, nb_rows, log_params, log_file),
+                    """INSERT INTO QUERIES_EXEC
+                        (SERVER_ID, QUERY, START, DURATION_SECS, NB_ROWS, PARAMETERS, FILE, CACHE_HIT)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?);""",
+                    (server_id, query, log_start, log_duration, nb_rows, log_params, log_file, int(cache_hit)),
                 )
 
                 # nettoyage pour ne garder que les requêtes les plus récentes
@@ -240,6 +348,30 @@ class UserDb(metaclass=Singleton):
         except sqlite3.OperationalError as e:
             print(f"SQLite operational error : {e}")
 
+    def insert_probes(self, probes: list[ProbeRecord]) -> None:
+        self.check_db()
+
+        try:
+            with sqlite3.connect(f"file:{self.user_db}?mode=rw", uri=True) as conn:
+                conn.executemany(
+                    """INSERT INTO SERVERS_PROBES (SERVER_ID, START, OK, CONNECT_MS, QUERY_MS, ERROR)
+                        VALUES (?, ?, ?, ?, ?, ?);""",
+                    [
+                        (p.server, p.start.isoformat(), int(p.ok), p.connect_ms, p.query_ms, p.error or None)
+                        for p in probes
+                    ],
+                )
+
+                # nettoyage pour ne garder que les mesures les plus récentes
+                conn.execute(
+                    f"""DELETE FROM SERVERS_PROBES WHERE ROWID IN
+                    (SELECT ROWID FROM SERVERS_PROBES ORDER BY START DESC LIMIT -1 OFFSET {PROBE_MAX})"""
+                )
+
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"SQLite operational error : {e}")
+
     # ------------------------------------------------------------------------------------------
     # select methods
     # ------------------------------------------------------------------------------------------
@@ -273,7 +405,8 @@ class UserDb(metaclass=Singleton):
                         SERVER_ID,
                         QUERY,
                         COUNT(*) as NB_RUN,
-                        MIN(DURATION_SECS) as MIN_RUN, MAX(DURATION_SECS) as MAX_RUN,
+                        MIN(CASE WHEN CACHE_HIT = 0 THEN DURATION_SECS END) as MIN_RUN,
+                        MAX(CASE WHEN CACHE_HIT = 0 THEN DURATION_SECS END) as MAX_RUN,
                         MAX(START) LAST_RUN
                 FROM QUERIES_EXEC
                 WHERE :query_name = "" OR QUERY = :query_name
@@ -305,6 +438,57 @@ class UserDb(metaclass=Singleton):
 
         return records_lst
 
+    def get_probes_stats(self, nb_last: int = 20) -> dict[str, ProbeStats]:
+        """statistiques par serveur sur ses nb_last dernières mesures"""
+        if not self.check_db(False):
+            return {}
+
+        with sqlite3.connect(f"file:{self.user_db}?mode=ro", uri=True) as conn:
+            conn.row_factory = sqlite3.Row
+
+            cursor: sqlite3.Cursor = conn.cursor()
+            cursor.execute(
+                """SELECT
+                        SERVER_ID,
+                        COUNT(*) as NB_PROBES,
+                        SUM(1 - OK) as NB_FAILED,
+                        AVG(CASE WHEN OK = 1 THEN CONNECT_MS END) as AVG_CONNECT_MS,
+                        MAX(CASE WHEN OK = 1 THEN CONNECT_MS END) as MAX_CONNECT_MS,
+                        AVG(CASE WHEN OK = 1 THEN QUERY_MS END) as AVG_QUERY_MS,
+                        MAX(START) as LAST_PROBE,
+                        MAX(CASE WHEN NUM = 1 THEN OK END) as LAST_OK,
+                        MAX(CASE WHEN NUM = 1 THEN CONNECT_MS END) as LAST_CONNECT_MS,
+                        MAX(CASE WHEN NUM = 1 THEN ERROR END) as LAST_ERROR
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY SERVER_ID ORDER BY START DESC) as NUM
+                    FROM SERVERS_PROBES
+                )
+                WHERE NUM <= :nb_last
+                GROUP BY SERVER_ID;""",
+                {"nb_last": nb_last},
+            )
+            stats = {row["SERVER_ID"]: self.row_to_probe_stats(row) for row in cursor.fetchall()}
+
+        return stats
+
+    def get_last_probes(self, server_id: str = "", nb_records: int = 100) -> list[ProbeRecord]:
+        if not self.check_db(False):
+            return []
+
+        with sqlite3.connect(f"file:{self.user_db}?mode=ro", uri=True) as conn:
+            conn.row_factory = sqlite3.Row
+
+            cursor: sqlite3.Cursor = conn.cursor()
+            cursor.execute(
+                """SELECT * FROM SERVERS_PROBES
+                WHERE :server_id = "" OR SERVER_ID = :server_id
+                ORDER BY START DESC LIMIT :nb_records;""",
+                {"server_id": server_id, "nb_records": nb_records},
+            )
+            records_lst = [self.row_to_probe(row) for row in cursor.fetchall()]
+
+        return records_lst
+
     # ------------------------------------------------------------------------------------------
     # helper methods to convert a row into an object
     # ------------------------------------------------------------------------------------------
@@ -332,9 +516,38 @@ class UserDb(metaclass=Singleton):
         record.parameters = row["PARAMETERS"]
         record.file = Path(row["FILE"]) if row["FILE"] else None
         record.exported = row["EXPORTED"]
+        record.cache_hit = row["CACHE_HIT"]
+
+        return record
+
+    def row_to_probe(self, row: dict) -> ProbeRecord:
+        record = ProbeRecord()
+
+        record.server = row["SERVER_ID"]
+        record.start = datetime.fromisoformat(row["START"])
+        record.ok = bool(row["OK"])
+        record.connect_ms = row["CONNECT_MS"]
+        record.query_ms = row["QUERY_MS"]
+        record.error = row["ERROR"] or ""
 
         return record
 
+    def row_to_probe_stats(self, row: dict) -> ProbeStats:
+        stat = ProbeStats()
+
+        stat.server = row["SERVER_ID"]
+        stat.nb_probes = row["NB_PROBES"]
+        stat.nb_failed = row["NB_FAILED"]
+        stat.avg_connect_ms = round(row["AVG_CONNECT_MS"]) if row["AVG_CONNECT_MS"] is not None else None
+        stat.max_connect_ms = row["MAX_CONNECT_MS"]
+        stat.avg_query_ms = round(row["AVG_QUERY_MS"]) if row["AVG_QUERY_MS"] is not None else None
+        stat.last_probe = datetime.fromisoformat(row["LAST_PROBE"]) if row["LAST_PROBE"] else None
+        stat.last_ok = bool(row["LAST_OK"])
+        stat.last_connect_ms = row["LAST_CONNECT_MS"]
+        stat.last_error = row["LAST_ERROR"] or ""
+
+        return stat
+
 
 if __name__ == "__main__":
     mydb = UserDb()
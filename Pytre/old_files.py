@@ -4,10 +4,13 @@ from dateutil.relativedelta import relativedelta
 
 from logs_user import USER_DB
 from user_prefs import USER_SETTING_FILE
+from result_cache import CACHE_FOLDER
+from queries_catalog import CATALOG_DB
+from kee_snapshot import SNAPSHOT_FILE
 
 
 def old_files_list(folder: Path) -> list[Path]:
-    white_list = (USER_DB, USER_SETTING_FILE)
+    white_list = (USER_DB, USER_SETTING_FILE, CACHE_FOLDER, CATALOG_DB, SNAPSHOT_FILE)
 
     if not folder.exists():
         return []
@@ -0,0 +1,71 @@
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+import settings
+import queries_catalog
+import sql_query
+
+BENCH_FILES_COUNTS: tuple = (50, 200, 800)  # nombres de fichiers requêtes chargés
+BENCH_PARSE_LOOPS: int = 20  # analyses de chaque fichier, temps moyen
+BENCH_PARSE_TOP: int = 10  # fichiers les plus longs à analyser affichés
+
+
+def bench_loading(source_files: list[Path], tmp_folder: Path) -> None:
+    """comparaison du chargement séquentiel / parallèle et depuis le catalogue selon le nombre de fichiers requêtes"""
+    for files_count in BENCH_FILES_COUNTS:
+        queries_folder = tmp_folder / f"Requetes_{files_count}"
+        queries_folder.mkdir()
+        for i in range(files_count):
+            shutil.copyfile(source_files[i % len(source_files)], queries_folder / f"Q{i:04}.sql")
+
+        files = list(queries_folder.glob("*.sql"))
+        for workers in (1, sql_query.LOAD_WORKERS):
+            start = time.perf_counter()
+            list(sql_query._load_files(files, workers))
+            duration = time.perf_counter() - start
+            print(f"{files_count} fichiers, {workers} lecture(s) simultanée(s) : {duration:.2f}s")
+
+        for step in ("1er chargement", "chargement depuis le catalogue"):
+            start = time.perf_counter()
+            sql_query.get_queries(queries_folder)
+            print(f"{files_count} fichiers, {step} : {time.perf_counter() - start:.2f}s")
+
+
+def bench_parsing(source_files: list[Path]) -> None:
+    """temps d'analyse par fichier requête, fichiers déjà lus pour ne mesurer que l'analyse"""
+    parse_times: dict[str, float] = {}
+    for file in source_files:
+        file_data = file.read_bytes()
+        try:
+            start = time.perf_counter()
+            for _ in range(BENCH_PARSE_LOOPS):
+                sql_query.Query(file, file_data=file_data)
+            parse_times[file.name] = (time.perf_counter() - start) / BENCH_PARSE_LOOPS
+        except Exception as e:
+            print(f"{file.name} : {e.__class__.__name__}, {e}")
+
+    for name, duration in sorted(parse_times.items(), key=lambda k: k[1], reverse=True)[:BENCH_PARSE_TOP]:
+        print(f"{name} : {duration * 1_000_000:.0f} µs")
+    if parse_times:
+        mean_time = sum(parse_times.values()) / len(parse_times)
+        print(f"Moyenne sur {len(parse_times)} fichiers : {mean_time * 1_000_000:.0f} µs")
+
+
+if __name__ == "__main__":
+    # copies des fichiers du dossier en argument, ou à défaut du dossier des requêtes (fichiers seulement lus)
+    source_folder = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(settings.Settings().queries_folder)
+    source_files = sorted(source_folder.glob("*.sql"))
+    if not source_files:
+        sys.exit(f"Aucun fichier requête dans {source_folder}")
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp_folder:
+        # catalogue temporaire créé avant tout chargement (singleton), Pytre_Queries.db de l'utilisateur non modifié
+        catalog = queries_catalog.QueriesCatalog(Path(tmp_folder) / queries_catalog.CATALOG_DB.name)
+        if catalog.db.parent != Path(tmp_folder):
+            sys.exit("Catalogue des requêtes déjà ouvert, mesure annulée")
+
+        bench_loading(source_files, Path(tmp_folder))
+        bench_parsing(source_files)
@@ -0,0 +1,142 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import user_prefs
+from singleton_metaclass import Singleton
+
+CATALOG_DB: Path = user_prefs.USER_FOLDER / "Pytre_Queries.db"
+CATALOG_VERSION: int = 2  # à incrémenter si l'analyse des fichiers requêtes change, le catalogue est alors recréé
+
+
+class CatalogEntry:
+    def __init__(self, name: str = "", mtime: int = 0, size: int = 0, hash: str = ""):
+        self.name: str = name  # nom du fichier requête
+        self.mtime: int = mtime  # date de modification en nanosecondes
+        self.size: int = size
+        self.hash: str = hash  # empreinte du contenu du fichier
+        self.data: dict | None = None  # requête analysée (Query.serialize)
+        self.error: str = ""  # erreur de chargement si la requête n'a pas pu être analysée
+
+    def __repr__(self):
+        return str({"name": self.name, "mtime": self.mtime, "size": self.size, "error": self.error})
+
+
+class QueriesCatalog(metaclass=Singleton):
+    """
+    Catalogue local des requêtes déjà analysées, par dossier de requêtes. Chaque fichier est associé
+    à sa date de modification, sa taille et l'empreinte de son contenu pour ne relire que ceux qui ont changé.
+    """
+
+    def __init__(self, db: Path = CATALOG_DB):
+        self.db: Path = Path(db)
+
+    def check_db(self) -> bool:
+        try:
+            self.db.parent.mkdir(parents=True, exist_ok=True)
+            with sqlite3.connect(self.db) as conn:
+                version = conn.execute("PRAGMA user_version;").fetchone()[0]
+                if version != CATALOG_VERSION:
+                    conn.execute("DROP TABLE IF EXISTS QUERIES;")
+                    conn.execute(f"PRAGMA user_version = {CATALOG_VERSION};")
+
+                conn.execute(
+                    """
+                        CREATE TABLE IF NOT EXISTS QUERIES (
+                            FOLDER           TEXT        NOT NULL,
+                            NAME             TEXT        NOT NULL,
+                            MTIME            INTEGER     NOT NULL,
+                            SIZE             INTEGER     NOT NULL,
+                            HASH             TEXT        NOT NULL,
+                            DATA             TEXT,
+                            ERROR            TEXT        NOT NULL DEFAULT '',
+                            PRIMARY KEY (FOLDER, NAME)
+                        );
+                    """
+                )
+                conn.commit()
+            return True
+        except (OSError, sqlite3.Error) as e:
+            print(f"Catalogue des requêtes indisponible : {e}")
+            return False
+
+    def load(self, folder: Path) -> dict[str, CatalogEntry]:
+        """entrées du catalogue pour un dossier de requêtes, par nom de fichier"""
+        if not self.db.exists() or not self.check_db():
+            return {}
+
+        entries: dict[str, CatalogEntry] = {}
+        try:
+            with sqlite3.connect(self.db) as conn:
+                conn.row_factory = sqlite3.Row
+                for row in conn.execute("SELECT * FROM QUERIES WHERE FOLDER = ?;", (self.folder_key(folder),)):
+                    entry = self.row_to_entry(row)
+                    entries[entry.name] = entry
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Lecture du catalogue des requêtes impossible : {e}")
+            return {}
+
+        return entries
+
+    def get_data(self, folder: Path, name: str) -> dict | None:
+        """requête analysée d'un fichier du catalogue (Query.serialize), None si absente"""
+        if not self.db.exists():
+            return None
+
+        try:
+            with sqlite3.connect(self.db) as conn:
+                row = conn.execute(
+                    "SELECT DATA FROM QUERIES WHERE FOLDER = ? AND NAME = ?;", (self.folder_key(folder), name)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Lecture du catalogue des requêtes impossible : {e}")
+            return None
+
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def save(self, folder: Path, entries: list[CatalogEntry]) -> None:
+        """remplacement des entrées du catalogue pour un dossier de requêtes"""
+        if not self.check_db():
+            return
+
+        folder_key = self.folder_key(folder)
+        try:
+            with sqlite3.connect(self.db) as conn:
+                conn.execute("DELETE FROM QUERIES WHERE FOLDER = ?;", (folder_key,))
+                conn.executemany(
+                    """INSERT INTO QUERIES (FOLDER, NAME, MTIME, SIZE, HASH, DATA, ERROR)
+                        VALUES (?, ?, ?, ?, ?, ?, ?);""",
+                    (
+                        (
+                            folder_key,
+                            entry.name,
+                            entry.mtime,
+                            entry.size,
+                            entry.hash,
+                            json.dumps(entry.data, ensure_ascii=False) if entry.data is not None else None,
+                            entry.error,
+                        )
+                        for entry in entries
+                    ),
+                )
+                conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Mise à jour du catalogue des requêtes impossible : {e}")
+
+    def folder_key(self, folder: Path) -> str:
+        return str(Path(folder).absolute())
+
+    def row_to_entry(self, row: dict) -> CatalogEntry:
+        entry = CatalogEntry(row["NAME"], row["MTIME"], row["SIZE"], row["HASH"])
+        entry.data = json.loads(row["DATA"]) if row["DATA"] is not None else None
+        entry.error = row["ERROR"]
+
+        return entry
+
+
+if __name__ == "__main__":
+    import settings
+
+    catalog = QueriesCatalog()
+    for entry in catalog.load(settings.Settings().queries_folder).values():
+        print(entry)
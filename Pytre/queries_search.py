@@ -0,0 +1,75 @@
+import unicodedata
+
+import sql_query
+
+NGRAM_SIZE: int = 3  # longueur des fragments indexés, recherche séquentielle en dessous
+
+
+def normalize(text: str) -> str:
+    """texte en minuscules et sans accents pour une recherche insensible à la casse et aux accents"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+class QueriesSearch:
+    """
+    Index de recherche des requêtes sur leur nom et leur description, créé à chaque chargement de la liste.
+    Chaque fragment de NGRAM_SIZE caractères est associé aux requêtes qui le contiennent : seules les requêtes
+    ayant tous les fragments du texte recherché sont comparées à celui-ci.
+    """
+
+    def __init__(self, queries: list[sql_query.Query] = None):
+        self.texts: dict[int, str] = {}  # id de la requête : nom et description normalisés
+        self.ngrams: dict[str, set[int]] = {}  # fragment : id des requêtes le contenant
+        self.previous: tuple[str, set[int]] = ("", set())  # dernière recherche, affinée si le texte est complété
+
+        for query in queries or []:
+            self.add(query)
+
+    def add(self, query: sql_query.Query) -> None:
+        query_id = id(query)
+        text = normalize(query.name) + "\0" + normalize(query.description)  # séparateur impossible à saisir
+        self.texts[query_id] = text
+        for i in range(len(text) - NGRAM_SIZE + 1):
+            self.ngrams.setdefault(text[i : i + NGRAM_SIZE], set()).add(query_id)
+
+        self.previous = ("", set())
+
+    def search(self, text_filter: str) -> set[int] | None:
+        """id des requêtes dont le nom ou la description contient le texte, None si pas de filtre"""
+        text = normalize(text_filter)
+        if text == "":
+            return None
+
+        previous_text, previous_ids = self.previous
+        if previous_text and previous_text in text:  # saisie complétée, seules les requêtes déjà trouvées
+            candidates = previous_ids
+        elif len(text) >= NGRAM_SIZE:
+            candidates = None
+            for i in range(len(text) - NGRAM_SIZE + 1):
+                ids = self.ngrams.get(text[i : i + NGRAM_SIZE], set())
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    break
+        else:
+            candidates = self.texts.keys()
+
+        found = {query_id for query_id in candidates if text in self.texts[query_id]}
+        self.previous = (text, found)
+
+        return found
+
+
+if __name__ == "__main__":
+    import time
+    import settings
+
+    queries, errors = sql_query.get_queries(settings.Settings().queries_folder)
+    start = time.perf_counter()
+    index = QueriesSearch(queries)
+    print(f"Index de {len(queries)} requêtes, {len(index.ngrams)} fragments : {time.perf_counter() - start:.3f}s")
+
+    for text_filter in ("a", "ve", "ven", "vent", "vente", "éché", "zzz"):
+        start = time.perf_counter()
+        found = index.search(text_filter)
+        print(f"{text_filter!r} : {len(found)} requêtes en {(time.perf_counter() - start) * 1000:.2f}ms")
@@ -0,0 +1,227 @@
+import re
+import json
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import user_prefs
+from columns_file import columns_path
+from singleton_metaclass import Singleton
+
+CACHE_FOLDER: Path = user_prefs.USER_FOLDER / "Pytre_Cache"
+CACHE_DB_NAME: str = "Pytre_Cache.db"
+CACHE_MAX_SIZE: int = 2 * 1024**3  # taille max en octets des fichiers en cache
+TTL_UNITS: dict[str, int] = {"s": 1, "m": 60, "h": 3600, "j": 86400, "d": 86400}  # unité : secondes
+
+
+def ttl_from_info(info: str) -> int:
+    """
+    Durée de validité en secondes à partir de l'info de l'entête de la requête (ex : "30m", "2h", "1j").
+    Sans unité la durée est en minutes, 0 si l'info est absente ou invalide.
+    """
+    regex_match = re.fullmatch(r"\s*(\d+)\s*([a-zA-Z]?)[a-zA-Z]*\s*", info or "")
+    if regex_match is None:
+        return 0
+
+    value, unit = int(regex_match.group(1)), regex_match.group(2).lower() or "m"
+    return value * TTL_UNITS.get(unit, 0)
+
+
+def cache_key(server_id: str, cmd_template: str, cmd_params: dict, extract_format: str) -> str:
+    key_infos = {"server": server_id, "cmd": cmd_template, "params": cmd_params, "format": extract_format}
+    key_json = json.dumps(key_infos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    def __init__(self):
+        self.key: str
+        self.query: str
+        self.server: str
+        self.file: Path
+        self.nb_rows: int
+        self.size: int
+        self.created: datetime
+        self.expires: datetime
+        self.last_used: datetime
+
+    def __repr__(self):
+        return str({"query": self.query, "server": self.server, "nb_rows": self.nb_rows, "expires": self.expires})
+
+
+class ResultCache(metaclass=Singleton):
+    """
+    Cache local des fichiers extraits : le résultat d'une requête déjà executée avec les mêmes paramètres
+    sur le même serveur est réutilisé tant qu'il n'a pas expiré. Les fichiers sont conservés dans le dossier
+    du cache et indexés dans une base SQLite, au-delà de la taille max les moins utilisés sont supprimés.
+    """
+
+    def __init__(self, folder: Path = CACHE_FOLDER, max_size: int = CACHE_MAX_SIZE):
+        self.folder: Path = Path(folder)
+        self.db: Path = self.folder / CACHE_DB_NAME
+        self.max_size: int = max_size
+
+    def check_db(self) -> bool:
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with sqlite3.connect(self.db) as conn:
+                conn.execute(
+                    """
+                        CREATE TABLE IF NOT EXISTS RESULTS (
+                            KEY              TEXT        PRIMARY KEY,
+                            QUERY            TEXT        NOT NULL,
+                            SERVER_ID        TEXT,
+                            FILE             TEXT        NOT NULL,
+                            NB_ROWS          INTEGER,
+                            SIZE             INTEGER     NOT NULL,
+                            CREATED          TEXT        NOT NULL,
+                            EXPIRES          TEXT        NOT NULL,
+                            LAST_USED        TEXT        NOT NULL
+                        );
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS IDX_LAST_USED ON RESULTS (LAST_USED ASC);")
+                conn.commit()
+            return True
+        except (OSError, sqlite3.Error) as e:
+            print(f"Cache des résultats indisponible : {e}")
+            return False
+
+    def get(self, key: str) -> CacheEntry | None:
+        """entrée du cache si elle existe et n'a pas expiré"""
+        if not self.db.exists() or not self.check_db():
+            return None
+
+        try:
+            with sqlite3.connect(self.db) as conn:
+                conn.row_factory = sqlite3.Row
+                row = conn.execute("SELECT * FROM RESULTS WHERE KEY = ?;", (key,)).fetchone()
+                if row is None:
+                    return None
+
+                entry = self.row_to_entry(row)
+                if entry.expires <= datetime.now() or not entry.file.exists():
+                    self._delete(conn, entry)
+                    conn.commit()
+                    return None
+
+                conn.execute("UPDATE RESULTS SET LAST_USED = ? WHERE KEY = ?;", (datetime.now().isoformat(), key))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Lecture du cache impossible : {e}")
+            return None
+
+        return entry
+
+    def restore(self, entry: CacheEntry, extract_file: Path) -> None:
+        """copie du fichier en cache (et de son fichier colonnes) vers le fichier d'extraction"""
+        extract_file = Path(extract_file)
+        try:
+            shutil.copyfile(entry.file, extract_file)
+            columns_path(extract_file).unlink(missing_ok=True)  # fichier colonnes d'une extraction précédente
+            if columns_path(entry.file).exists():
+                shutil.copyfile(columns_path(entry.file), columns_path(extract_file))
+        except OSError:
+            extract_file.unlink(missing_ok=True)
+            columns_path(extract_file).unlink(missing_ok=True)
+            raise
+
+    def put(self, key: str, query: str, server_id: str, extract_file: Path, nb_rows: int, ttl: int) -> None:
+        """mise en cache d'une copie du fichier extrait, puis suppression des entrées expirées ou en trop"""
+        if not self.check_db():
+            return
+
+        extract_file = Path(extract_file)
+        cache_file = self.folder / (key + extract_file.suffix)
+        try:
+            shutil.copyfile(extract_file, cache_file)
+            size = cache_file.stat().st_size
+            columns_path(cache_file).unlink(missing_ok=True)
+            if columns_path(extract_file).exists():
+                shutil.copyfile(columns_path(extract_file), columns_path(cache_file))
+                size += columns_path(cache_file).stat().st_size
+        except OSError as e:
+            print(f"Mise en cache impossible : {e}")
+            cache_file.unlink(missing_ok=True)
+            columns_path(cache_file).unlink(missing_ok=True)
+            return
+
+        now = datetime.now()
+        try:
+            with sqlite3.connect(self.db) as conn:
+                conn.execute(
+                    """INSERT OR REPLACE INTO RESULTS
+                        (KEY, QUERY, SERVER_ID, FILE, NB_ROWS, SIZE, CREATED, EXPIRES, LAST_USED)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);""",
+                    (
+                        key,
+                        query,
+                        server_id,
+                        cache_file.name,
+                        nb_rows,
+                        size,
+                        now.isoformat(),
+                        (now + timedelta(seconds=ttl)).isoformat(),
+                        now.isoformat(),
+                    ),
+                )
+                self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Mise en cache impossible : {e}")
+
+    def clear(self) -> None:
+        if not self.db.exists():
+            return
+
+        with sqlite3.connect(self.db) as conn:
+            conn.row_factory = sqlite3.Row
+            for row in conn.execute("SELECT * FROM RESULTS;").fetchall():
+                self._delete(conn, self.row_to_entry(row))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM RESULTS ORDER BY LAST_USED DESC;").fetchall()
+
+        now = datetime.now()
+        total_size = 0
+        for row in rows:
+            entry = self.row_to_entry(row)
+            total_size += entry.size
+            if entry.expires <= now or total_size > self.max_size:
+                self._delete(conn, entry)
+
+    def _delete(self, conn: sqlite3.Connection, entry: CacheEntry) -> None:
+        conn.execute("DELETE FROM RESULTS WHERE KEY = ?;", (entry.key,))
+        entry.file.unlink(missing_ok=True)
+        columns_path(entry.file).unlink(missing_ok=True)
+
+    def row_to_entry(self, row: dict) -> CacheEntry:
+        entry = CacheEntry()
+
+        entry.key = row["KEY"]
+        entry.query = row["QUERY"]
+        entry.server = row["SERVER_ID"]
+        entry.file = self.folder / row["FILE"]
+        entry.nb_rows = row["NB_ROWS"]
+        entry.size = row["SIZE"]
+        entry.created = datetime.fromisoformat(row["CREATED"])
+        entry.expires = datetime.fromisoformat(row["EXPIRES"])
+        entry.last_used = datetime.fromisoformat(row["LAST_USED"])
+
+        return entry
+
+
+if __name__ == "__main__":
+    for info in ("30m", "30", "2h", "1j", "45 s", "", "abc"):
+        print(f"{info!r} : {ttl_from_info(info)}s")
+
+    cache = ResultCache()
+    if cache.db.exists():
+        with sqlite3.connect(cache.db) as conn:
+            conn.row_factory = sqlite3.Row
+            for row in conn.execute("SELECT * FROM RESULTS ORDER BY LAST_USED DESC;").fetchall():
+                print(cache.row_to_entry(row))
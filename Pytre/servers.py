@@ -25,12 +25,13 @@ class Servers(metaclass=Singleton):
 
         self.cols_std = ["id", "description", "user", "password", "grp_authorized"]
         self.cols_cust = ["type", "charset", "database", "host", "port", "server", "login_timeout", "timeout"]
+        self.cols_opt = ["fetch_size"]  # propriétés facultatives lors d'un import
 
         self.get_all_servers()
         self.get_all_groups()
 
-    def open_db(self, reload: bool = False) -> bool:
-        self.kee._open_db(reload)
+    def open_db(self, reload: bool = False, writable: bool = False) -> bool:
+        self.kee._open_db(reload, writable)
         if self.kee.is_ko:
             return False
         self.kee_grp = self.kee.grp_servers
@@ -62,7 +63,7 @@ class Servers(metaclass=Singleton):
         if not Path(filename).exists():
             raise FileNotFoundError(f"File to import servers does not exist : {filename}")
 
-        self.open_db(True)
+        self.open_db(True, writable=True)
 
         cols_dict = {}
         for i, val in enumerate(self.cols_std + self.cols_cust):
@@ -94,6 +95,9 @@ class Servers(metaclass=Singleton):
 
                 for prop in self.cols_cust:
                     s_entry.set_custom_property(prop, csv_row[prop])
+                for prop in self.cols_opt:
+                    if csv_row.get(prop) is not None:
+                        s_entry.set_custom_property(prop, csv_row[prop])
 
                 # récup des groupes en utilisant csv.reader pour parser les cas de groupe entre guillemets
                 groups = csv_row["grp_authorized"].strip()
@@ -116,13 +120,13 @@ class Servers(metaclass=Singleton):
         if Path(filename).exists() and not overwrite:
             return False
 
-        rows = [self.cols_std[:-1] + self.cols_cust + [self.cols_std[-1]]]
+        rows = [self.cols_std[:-1] + self.cols_cust + self.cols_opt + [self.cols_std[-1]]]
         self.open_db(True)
         s_entry: Entry | None
         for s_entry in self.kee_grp.entries:
             row = [s_entry.title, s_entry.notes, s_entry.username, s_entry.password]
 
-            for item in self.cols_cust:
+            for item in self.cols_cust + self.cols_opt:
                 value = s_entry.get_custom_property(item)
                 value = value if value is not None else ""
                 row.append(value)
@@ -170,6 +174,7 @@ class Server:
         self.server: str = ""
         self.login_timeout: int = 60
         self.timeout: int = 300
+        self.fetch_size: int = 0  # nb de lignes récupérées par bloc lors d'une extraction, 0 pour automatique
         self.grp_authorized: list[str] = []
 
         if entry:
@@ -190,6 +195,7 @@ class Server:
             "server": self.server,
             "login_timeout": self.login_timeout,
             "timeout": self.timeout,
+            "fetch_size": self.fetch_size,
             "grp_authorized": self.grp_authorized,
         }
 
@@ -245,6 +251,7 @@ class Server:
             cursor.execute("SET statement_timeout = %s", (self.timeout * 1000,))  # needs to be milliseconds
             cursor.execute("SET default_transaction_read_only = on")
             cursor.close()
+            conn.commit()  # valider les paramètres de session pour qu'un rollback ne les annule pas
         except psycopg2.OperationalError as err:
             raise psycopg2.OperationalError(err.args)
         except UnicodeDecodeError as err:
@@ -268,6 +275,8 @@ class Server:
                 val = int(val) if val.isdigit() else self.login_timeout
             elif property == "timeout":
                 val = int(val) if val.isdigit() else self.timeout
+            elif property == "fetch_size":
+                val = int(val) if val.isdigit() else self.fetch_size
 
             setattr(self, property, val)
 
@@ -293,7 +302,12 @@ class Server:
         if not self.id or self.id == "":
             raise ValueError("Server must have an id")
 
-        self.servers.open_db(True)
+        # contrôle avant toute modification : une entrée modifiée mais non enregistrée resterait en mémoire
+        # et serait enregistrée avec la prochaine modification d'un autre serveur ou utilisateur
+        if not all(str(getattr(self, key)).isdigit() for key in ("timeout", "login_timeout", "fetch_size")):
+            return False
+
+        self.servers.open_db(True, writable=True)
 
         # contrôle
         if [s for s in self.servers.get_all_servers().values() if s.id == self.id and not s.uuid == self.uuid]:
@@ -314,32 +328,28 @@ class Server:
         for key, val in self.to_dict().items():
             if key in ["uuid", "id", "description", "user", "password", "grp_authorized"]:
                 continue  # attributs qui ne sont pas dans custom_property
-            elif key in ["timeout", "login_timeout"]:
-                if val.isdigit():
-                    entry.set_custom_property(key, val)
-                else:
-                    return False
+            elif key in ["timeout", "login_timeout", "fetch_size"]:
+                entry.set_custom_property(key, str(val))
             else:
                 entry.set_custom_property(key, val)
 
         # caractères interdits par keepass pour les tags : , et ;
         entry.tags = [grp.replace(",", "_").replace(";", "_") for grp in self.grp_authorized]
 
-        self.servers.kee.save_db()
+        if not self.servers.kee.save_db():
+            return False
         self.servers.get_all_groups(reload=False)
         return True
 
     def delete(self) -> bool:
-        self.servers.open_db()
+        self.servers.open_db(writable=True)
 
         s_entry: Entry = self.servers.kee.db.find_entries(uuid=UUID(self.uuid), first=True)
         if s_entry is None:
             raise LookupError("Server not found")
 
         s_entry.delete()
-        self.servers.kee.save_db()
-
-        return True
+        return self.servers.kee.save_db()
 
 
 if __name__ == "__main__":
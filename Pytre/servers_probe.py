@@ -0,0 +1,80 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import servers
+from logs_user import UserDb, ProbeRecord
+
+PROBE_TIMEOUT: int = 5  # secondes max pour la connexion et pour la requête de test
+PROBE_WORKERS: int = 8  # serveurs testés simultanément
+PROBE_HISTORY: int = 20  # dernières mesures de chaque serveur utilisées pour les statistiques
+
+
+def probe_server(server: servers.Server, timeout: int = PROBE_TIMEOUT) -> ProbeRecord:
+    """connexion puis SELECT 1 sur le serveur, avec des timeouts courts, sans exception"""
+    probe = ProbeRecord()
+    probe.server, probe.start, probe.ok = server.id, datetime.now(), False
+    probe.connect_ms, probe.query_ms, probe.error = None, None, ""
+
+    # copie pour ne pas modifier les timeouts du serveur utilisé par les requêtes
+    server_probe: servers.Server = copy.copy(server)
+    server_probe.login_timeout = min(server.login_timeout, timeout)
+    server_probe.timeout = min(server.timeout, timeout)
+
+    conn = None
+    try:
+        start = time.perf_counter()
+        conn = server_probe.get_connection()
+        if conn is None:
+            raise ValueError(f"type de serveur inconnu : {server.type}")
+        probe.connect_ms = round((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        probe.query_ms = round((time.perf_counter() - start) * 1000)
+        probe.ok = True
+    except Exception as e:
+        probe.error = f"{e.__class__.__name__}, {e}".replace("\n", " ").strip()
+    finally:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    return probe
+
+
+def probe_servers(
+    servers_lst: list[servers.Server], timeout: int = PROBE_TIMEOUT, save: bool = True
+) -> list[ProbeRecord]:
+    """test simultané des serveurs, la durée totale est celle du plus lent et non la somme"""
+    if not servers_lst:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(servers_lst))) as pool:
+        probes = list(pool.map(lambda server: probe_server(server, timeout), servers_lst))
+
+    if save:
+        UserDb().insert_probes(probes)
+
+    return probes
+
+
+def probe_report(probe: ProbeRecord) -> str:
+    if not probe.ok:
+        return f"KO {probe.server} : {probe.error}"
+
+    return f"OK {probe.server} : connexion {probe.connect_ms} ms, SELECT 1 {probe.query_ms} ms"
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    probes = probe_servers(list(servers.Servers().servers_dict.values()), save=False)
+    for probe in probes:
+        print(probe_report(probe))
+    print(f"{len(probes)} serveurs testés en {time.perf_counter() - start:.1f}s")
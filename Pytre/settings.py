@@ -15,8 +15,8 @@ class Settings(metaclass=Singleton):
     logs_folder: Path = Path("")  # répertoire où stocker les logs centraux
 
     @classmethod
-    def open_db(cls, reload: bool = False) -> bool:
-        cls.kee._open_db(reload)
+    def open_db(cls, reload: bool = False, writable: bool = False) -> bool:
+        cls.kee._open_db(reload, writable)
         if cls.kee.is_ko:
             return False
         cls.kee_grp = cls.kee.grp_settings
@@ -56,8 +56,9 @@ class Settings(metaclass=Singleton):
             "SETTINGS_VERSION": "settings_version",
         }
 
+        entries: dict[str, Entry] = {entry.title: entry for entry in self.kee_grp.entries}
         for kee_title, attr_name in self.params_dict.items():
-            info: Entry = self.kee.db.find_entries(title=kee_title, group=self.kee_grp, first=True)
+            info: Entry = entries.get(kee_title)
             if not info:
                 continue
 
@@ -83,7 +84,7 @@ class Settings(metaclass=Singleton):
         self.load()
 
     def save(self) -> bool:
-        self.open_db()
+        self.open_db(writable=True)
 
         for kee_title, attr_name in self.params_dict.items():
             info: Entry = self.kee.db.find_entries(title=kee_title, group=self.kee_grp, first=True)
@@ -98,7 +99,8 @@ class Settings(metaclass=Singleton):
 
             info.username = value
 
-        self.kee.save_db()
+        if not self.kee.save_db():
+            return False
         self.set_cls_logs_info(self.logs_are_on, self.logs_folder)
         return True
 
@@ -1,46 +1,131 @@
+import io
+import os
 import re
 import csv
+import gzip
+import codecs
+import hashlib
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from enum import Enum
 from dateutil.relativedelta import relativedelta
 from pathlib import Path
-from threading import Thread
-from queue import Empty as QueueIsEmpty
+from threading import Thread, Lock, Event as ThreadEvent
+from queue import Queue as ThreadQueue, Empty as QueueIsEmpty, Full as QueueIsFull
 from multiprocessing import Process, Queue, Event as proc_get_event
 from multiprocessing.synchronize import Event as ProcEvent
 
 import pymssql
 import psycopg2
+import zstandard
 
 import settings
 import user_prefs
 import users
 import servers
+import connections_pool
 import logs_user
-from convert import Convert
+import result_cache
+import queries_catalog
+from sql_lexer import SqlLexer, TokenType
+from convert import Convert, shared_convert
+from xlsx_writer import XlsxWriter
+from columns_file import ColumnsWriter, columns_path
 
 
 PRINT_DATE_FORMAT: str = "%d/%m/%Y à %H:%M:%S"  # pour le format de la date pour les logs / output
+PROGRESS_ROWS: int = 50_000  # nombre de lignes entre chaque message de progression
+FILE_BUFFER_SIZE: int = 1024**2  # taille du buffer d'écriture des fichiers extraits
+
+FETCH_BLOCK_BYTES: int = 2 * 1024**2  # taille visée en octets pour un bloc de lignes récupérées
+FETCH_COL_WIDTH: int = 16  # largeur estimée d'une colonne tant qu'aucune ligne n'a été récupérée
+FETCH_ROWS_MIN: int = 500  # nombre de lignes min par bloc
+FETCH_ROWS_MAX: int = 50_000  # nombre de lignes max par bloc
+SERVER_CURSOR_NAME: str = "pytre_extract"  # nom du curseur côté serveur (PostgreSQL)
+SERVER_CURSOR_FIRST: tuple = ("select", "with", "values", "table")  # début d'une requête possible dans un DECLARE
+SERVER_CURSOR_EXCLUDED: tuple = ("insert", "update", "delete", "merge", "into")  # modification ou SELECT INTO
+
+EXTRACT_ENCODING: str = "windows-1252"  # encodage des fichiers extraits
+EXTRACT_FORMATS: dict[str, str] = {  # format : extension
+    "csv": ".csv",
+    "gzip": ".csv.gz",
+    "zstd": ".csv.zst",
+    "xlsx": ".xlsx",
+}
+GZIP_LEVEL: int = 6  # niveau de compression gzip
+ZSTD_LEVEL: int = 3  # niveau de compression zstd
+PIPELINE_QUEUE_SIZE: int = 4  # nombre de blocs en attente entre deux étapes d'une extraction
+PIPELINE_WAIT: float = 0.1  # attente en secondes avant de revérifier si l'extraction doit être stoppée
+
+LOAD_WORKERS: int = 16  # nombre de lectures simultanées des fichiers requêtes (dossier souvent sur le réseau)
+LOAD_BATCH: int = 20  # nombre de fichiers requêtes lus par tâche
+WATCH_INTERVAL: float = 5.0  # intervalle en secondes entre deux relevés du dossier des requêtes
+WORKER_POOL_SIZE: int = 2  # sous processus d'execution démarrés à l'avance, celui utilisé compris
+WORKER_INIT_TIMEOUT: float = 90.0  # attente max de l'initialisation d'un sous processus (réseau, antivirus...)
+JOBS_WORKERS: int = 3  # nombre de requêtes executées simultanément en tâche de fond
+
+# expressions régulières pour l'analyse des fichiers requêtes, compilées une seule fois
+_HEADER_REGEX = re.compile(r"^\/\*[^\n]*?\n(.*?)\n^\*\/", re.MULTILINE | re.DOTALL)  # 1er bloc de commentaires
+_INFO_REGEX = re.compile(r"^([^:]*?)\s*:\s*(.*$)")  # info d'entête => clé : valeur
+_DECLARE_REGEX = re.compile(r"^(DECLARE[^;]*;)[\s]*(.*)", re.MULTILINE | re.DOTALL)  # section DECLARE + commande
+_VARIABLE_REGEX = re.compile(r"(?<![\d\w#_\$@])(@[\d\w#_\$@]+)")  # variables de la commande
+_VARIABLE_OR_VALUE_REGEX = re.compile(r"(?<![\d\w#_\$@])(@!?[\d\w#_\$@]+)")  # variables ou valeurs en dur (@!)
+_PARAM_NAME_REGEX = re.compile(r"^@!?[\d\w#_\$@]+")
+_PARAM_TYPE_REGEX = re.compile(r"^[^(=]+as\s+([^(\s=]+)", re.IGNORECASE)
+_PARAM_TYPE_ARGS_REGEX = re.compile(r"^[^(=]+\(([^)]+)\)")
+_PARAM_VALUE_REGEX = re.compile(r"^[^=]*=\s*('.*?'|[^,\s]*)")
+_PARAM_COMMENT_REGEX = re.compile(r"--\s*(.+)")
+_COMMENT_SEP_REGEX = re.compile(r"(\(.*?\))|(,)")  # séparateurs des infos : virgules hors parenthèses
+_COMMENT_SPLIT_REGEX = re.compile(r"\^{3,6}")
+_COMMENT_FUNC_REGEX = re.compile(r"^(.*?)(?=\(|$)\(?(.*?)\)?$")  # fonction(arguments)
 
 
 class Query:
-    def __init__(self, filename: Path = Path("dummy"), encoding_format: str = "utf-8"):
-        self.query_execute = _QueryExecute(self)
-
+    __slots__ = (
+        "_query_execute",
+        "last_extracted_file",
+        "_queue",
+        "_stop_requested",
+        "_cannot_stop",
+        "filename",
+        "encoding_format",
+        "_file_content",
+        "_raw_cmd",
+        "_cmd_template",
+        "infos",
+        "_declare",
+        "_cmd_params",
+        "_params_obj",
+        "name",
+        "hide",
+        "description",
+        "grp_authorized",
+        "servers_id",
+    )
+
+    def __init__(self, filename: Path = Path("dummy"), encoding_format: str = "utf-8", file_data: bytes = None):
         self.last_extracted_file = ""  # info du dernier fichier extrait
 
-        self.queue: Queue = Queue()  # pour transmettre les messages à l'UI
-        self.stop_requested: ProcEvent = proc_get_event()  # pour signaler que l'execution doit être stoppée
-        self.cannot_stop: ProcEvent = proc_get_event()  # pour savoir si l'execution ne peut pas stopper proprement
+        # créés seulement si utilisés, coûteux à créer pour chacune des requêtes chargées
+        self._query_execute: _QueryExecute = None
+        self._queue: Queue = None  # pour transmettre les messages à l'UI
+        self._stop_requested: ProcEvent = None  # pour signaler que l'execution doit être stoppée
+        self._cannot_stop: ProcEvent = None  # pour savoir si l'execution ne peut pas stopper proprement
 
         self.filename = filename
-        self.file_content = self._init_file_content(encoding_format)
+        self.encoding_format = encoding_format
+        self._file_content: str = self._init_file_content(encoding_format, file_data)
+
+        header, self._declare, self._raw_cmd = self._split_content(self._file_content)
+        self.infos: dict = self._init_infos(header)
 
-        self.infos: dict = self._init_infos()
-        self.cmd_params = {}
-        self.params_obj: dict[str, _Param] = self._init_params()
+        # paramètres créés à la 1ère utilisation (sélection, execution) à partir de la section DECLARE
+        self._cmd_params: dict = {}
+        self._params_obj: dict[str, _Param] = None
 
-        self.raw_cmd = self._init_raw_cmd()
-        self.cmd_template = self._init_template_cmd()
+        self._cmd_template: str = None
 
         self.name: str = self.infos.get("code", self.filename.stem)
 
@@ -57,7 +142,103 @@ class Query:
         all_servers_id = list(servers.Servers().servers_dict.keys())
         self.servers_id: list[str] = self.infos.get("servers", all_servers_id)
 
-    def _init_file_content(self, encoding_format: str = "utf-8") -> str:
+    @property
+    def query_execute(self) -> "_QueryExecute":
+        if self._query_execute is None:
+            self._query_execute = _QueryExecute(self)
+        return self._query_execute
+
+    @property
+    def params_obj(self) -> dict[str, "_Param"]:
+        if self._params_obj is None:
+            self._params_obj = self._init_params(self._declare)
+        return self._params_obj
+
+    @params_obj.setter
+    def params_obj(self, value: dict[str, "_Param"]) -> None:
+        self._params_obj = value
+
+    @property
+    def cmd_params(self) -> dict:
+        self.params_obj  # paramètres créés si besoin
+        return self._cmd_params
+
+    @property
+    def file_content(self) -> str:
+        if self._file_content is None:
+            self._file_content = self._load_content()
+        return self._file_content
+
+    @file_content.setter
+    def file_content(self, value: str) -> None:
+        self._file_content = value
+
+    @property
+    def raw_cmd(self) -> str:
+        if self._raw_cmd is None:
+            _, _, self._raw_cmd = self._split_content(self.file_content)
+        return self._raw_cmd
+
+    @raw_cmd.setter
+    def raw_cmd(self, value: str) -> None:
+        self._raw_cmd = value
+
+    @property
+    def cmd_template(self) -> str:
+        if self._cmd_template is None:
+            self._cmd_template = self._init_template_cmd()
+        return self._cmd_template
+
+    @cmd_template.setter
+    def cmd_template(self, value: str) -> None:
+        self._cmd_template = value
+
+    def release_content(self) -> None:
+        """libère le contenu du fichier et la commande, relus à la demande (sélection, execution, debug)"""
+        self._file_content = self._raw_cmd = self._cmd_template = None
+
+    def _load_content(self) -> str:
+        """contenu du fichier depuis le catalogue des requêtes, sinon relu depuis le fichier"""
+        if self.filename.name == "dummy":
+            return ""
+
+        data = queries_catalog.QueriesCatalog().get_data(self.filename.parent, self.filename.name)
+        if data is not None:
+            return data["file_content"]
+
+        return self._init_file_content(self.encoding_format)
+
+    @property
+    def queue(self) -> Queue:
+        if self._queue is None:
+            self._queue = Queue()
+        return self._queue
+
+    @queue.setter
+    def queue(self, value: Queue) -> None:
+        self._queue = value
+
+    @property
+    def stop_requested(self) -> ProcEvent:
+        if self._stop_requested is None:
+            self._stop_requested = proc_get_event()
+        return self._stop_requested
+
+    @stop_requested.setter
+    def stop_requested(self, value: ProcEvent) -> None:
+        self._stop_requested = value
+
+    @property
+    def cannot_stop(self) -> ProcEvent:
+        if self._cannot_stop is None:
+            self._cannot_stop = proc_get_event()
+        return self._cannot_stop
+
+    @cannot_stop.setter
+    def cannot_stop(self, value: ProcEvent) -> None:
+        self._cannot_stop = value
+
+    def _init_file_content(self, encoding_format: str = "utf-8", file_data: bytes = None) -> str:
         file_content = ""
 
         # if filename has not been set then immediatly return without error
@@ -73,8 +254,11 @@ class Query:
         decoded: bool = False
         for encoding in encodings:
             try:
-                with open(self.filename, mode="r", encoding=encoding) as f:
-                    file_content = f.read()
+                if file_data is None:
+                    with open(self.filename, mode="r", encoding=encoding) as f:
+                        file_content = f.read()
+                else:  # contenu déjà lu, fins de lignes converties comme à la lecture en mode texte
+                    file_content = file_data.decode(encoding).replace("\r\n", "\n").replace("\r", "\n")
                 decoded = True
                 break
             except (UnicodeDecodeError, LookupError):  # LookupError if format doesn't exist (eg : ansi on linux)
@@ -86,55 +270,61 @@ class Query:
 
         return file_content
 
-    def _init_infos(self) -> dict:
+    def _split_content(self, file_content: str) -> tuple[str, str, str]:
+        """découpage du fichier en une passe : entête d'infos, section DECLARE et commande sans le DECLARE"""
+        header_match = _HEADER_REGEX.search(file_content)
+        header = header_match.group(1) if header_match is not None else ""
+
+        declare_match = _DECLARE_REGEX.search(file_content)
+        if declare_match is not None:
+            declare, raw_cmd = declare_match.group(1, 2)
+        else:
+            declare, raw_cmd = "", file_content
+
+        return header, declare, raw_cmd
+
+    def _init_infos(self, header: str) -> dict:
         infos = {}
-        regex_match = re.search(
-            r"^\/\*[^\n]*?\n(.*?)\n^\*\/", self.file_content, re.MULTILINE | re.DOTALL
-        )  # récupération des infos d'entête de la requete (premier bloc de commentaires)
+        convert_to_list = ("grp_authorized", "servers")
 
-        if regex_match is not None:
-            for line in regex_match.group(1).splitlines():
-                regex_infos = re.search(r"^([^:]*?)\s*:\s*(.*$)", line)
-                if regex_infos is not None:
-                    info_key = regex_infos.group(1).lower()
+        for line in header.splitlines():
+            regex_infos = _INFO_REGEX.search(line)
+            if regex_infos is not None:
+                info_key = regex_infos.group(1).lower()
 
-                    convert_to_list = ["grp_authorized", "servers"]
-                    if info_key in convert_to_list:
-                        info_value = [item.lower().strip() for item in regex_infos.group(2).split(",")]
-                    else:
-                        info_value = regex_infos.group(2)
+                if info_key in convert_to_list:
+                    info_value = [item.lower().strip() for item in regex_infos.group(2).split(",")]
+                else:
+                    info_value = regex_infos.group(2)
 
-                    infos[info_key] = info_value  # rajout dans un dictionnaire de l'info
+                infos[info_key] = info_value  # rajout dans un dictionnaire de l'info
 
         return infos
 
-    def _init_params(self) -> dict:
-        regex_match = re.search(r"^(DECLARE[^;]*;)", self.file_content, re.MULTILINE | re.DOTALL)  # section DECLARE
+    def _init_params(self, declare: str = None) -> dict:
+        if declare is None:  # section DECLARE à retrouver dans le contenu du fichier
+            _, declare, _ = self._split_content(self.file_content)
 
         params = {}
-        params_txt = regex_match.group(1) if regex_match is not None else ""
-        for line in params_txt.splitlines():
+        cmd_params = {}
+        for line in declare.splitlines():
             if line[0:1] == "@":
                 my_param = _Param(line)
                 params[my_param.var_name] = my_param
-                self.cmd_params[my_param.var_name] = my_param.value_cmd
+                cmd_params[my_param.var_name] = my_param.value_cmd
 
+        self._cmd_params = cmd_params
         return params
 
-    def _init_raw_cmd(self) -> str:
-        regex_match = re.search(r"^DECLARE[^;]*;[\s]*(.*)", self.file_content, re.MULTILINE | re.DOTALL)
-        raw_cmd = regex_match.group(1) if regex_match is not None else self.file_content
-        return raw_cmd
-
     def _init_template_cmd(self) -> str:
         def replace_func(match: re.Match):
             # replace only variables which are parameters
-            if match.group(0) in self.cmd_params.keys():
+            if match.group(0) in self.cmd_params:
                 return f"%({match.group(0)})s"
             else:
                 return match.group(0)
 
-        cmd_template = re.sub(r"(?<![\d\w#_\$@])(@[\d\w#_\$@]+)", replace_func, self.raw_cmd)
+        cmd_template = _VARIABLE_REGEX.sub(replace_func, self.raw_cmd)
         return cmd_template
 
     def reset_values(self):
@@ -163,7 +353,13 @@ class Query:
 
         return True
 
-    def execute_cmd(self, file_output: bool = True, server_id: str = "") -> bool | tuple:
+    def execute_cmd(
+        self, file_output: bool = True, server_id: str = "", extract_file: Path = None, extract_format: str = ""
+    ) -> bool | tuple:
+        """
+        Execution de la requête, par défaut dans un fichier horodaté du dossier d'extraction des préférences
+        au format de la requête. extract_file et extract_format permettent d'imposer le fichier et le format.
+        """
         self.last_extracted_file = ""
         self.update_values()
 
@@ -171,15 +367,19 @@ class Query:
             server_id = server_id or (self.servers_id[0] if self.servers_id else "")
             cmd_exec, cmd_params = self.get_infos_for_exec()
 
-            if file_output:
-                file_stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                prefs: user_prefs.UserPrefs = user_prefs.UserPrefs()
-                extract_file = prefs.extract_folder / (f"{self.name}_{file_stamp}.csv")
+            extract_format = extract_format if extract_format in EXTRACT_FORMATS else self.get_extract_format()
+            cache_ttl = self.get_cache_ttl() if file_output else 0
+            if file_output and extract_file:
+                extract_file = Path(extract_file)
+            elif file_output:
+                extract_file = self.default_extract_file(extract_format)
             else:
                 extract_file = ""
 
             try:
-                result = self.query_execute.execute(server_id, cmd_exec, cmd_params, extract_file)
+                result = self.query_execute.execute(
+                    server_id, cmd_exec, cmd_params, extract_file, extract_format, cache_ttl
+                )
                 self.last_extracted_file = extract_file if file_output else ""
                 return result
             except KeyError:
@@ -208,6 +408,24 @@ class Query:
             self._broadcast(err_msg)
             return False
 
+    def default_extract_file(self, extract_format: str, folder: Path = None) -> Path:
+        """fichier d'extraction horodaté, dans le dossier d'extraction des préférences si pas de dossier"""
+        file_stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        folder = Path(folder) if folder is not None else user_prefs.UserPrefs().extract_folder
+        return folder / f"{self.name}_{file_stamp}{EXTRACT_FORMATS[extract_format]}"
+
+    def get_extract_format(self) -> str:
+        """format de l'entête de la requête, sinon celui des préférences utilisateur, csv par défaut"""
+        prefs: user_prefs.UserPrefs = user_prefs.UserPrefs()
+        extract_format = self.infos.get("format") or prefs.get(user_prefs.UserPrefsEnum.extract_format) or "csv"
+        extract_format = extract_format.lower().strip()
+
+        return extract_format if extract_format in EXTRACT_FORMATS else "csv"
+
+    def get_cache_ttl(self) -> int:
+        """durée de validité en secondes du résultat en cache selon l'entête de la requête, 0 si pas de cache"""
+        return result_cache.ttl_from_info(self.infos.get("cache", ""))
+
     def get_infos_for_exec(self):
         cmd_exec = self.cmd_template
         cmd_params = {}
@@ -239,7 +457,7 @@ class Query:
         offset: int = 0
         var_pos: dict[int, int] = {}
 
-        for match in re.finditer(r"(?<![\d\w#_\$@])(@!?[\d\w#_\$@]+)", self.raw_cmd):
+        for match in _VARIABLE_OR_VALUE_REGEX.finditer(self.raw_cmd):
             param = match.group(0)
             if param not in self.cmd_params.keys():
                 continue
@@ -282,6 +500,7 @@ class Query:
             "description": self.description,
             "grp_authorized": self.grp_authorized,
             "servers_id": self.servers_id,
+            "declare": self._declare,
         }
 
     @classmethod
@@ -298,7 +517,8 @@ class Query:
         query.grp_authorized = data["grp_authorized"]
         query.servers_id = data["servers_id"]
 
-        query.params_obj = query._init_params()
+        query._declare = data.get("declare")  # sinon retrouvée dans le contenu du fichier
+        query.params_obj = None  # paramètres créés à la 1ère utilisation
         for key, val in data["display_params"].items():
             param_obj: _Param = query.params_obj[key]
             param_obj.display_value = val
@@ -308,21 +528,39 @@ class Query:
 
 
 class _Param:
+    __slots__ = (
+        "converter",
+        "sql_declare",
+        "var_name",
+        "type_name",
+        "type_args",
+        "display_value",
+        "description",
+        "is_optional",
+        "is_hidden",
+        "value_cmd",
+        "value_is_ok",
+        "ui_control",
+        "authorized_values",
+        "ctrl_pattern",
+        "ctr_pattern_is_ok",
+    )
+
     def __init__(self, sql_declare: str):
         app_settings: settings.Settings = settings.Settings()
-        self.converter = Convert(
+        self.converter: Convert = shared_convert(
             date_txt_format=app_settings.date_format,
             field_separator=app_settings.field_separator,
             decimal_separator=app_settings.decimal_separator,
-        )  # objet pour conversions string en valeurs et l'inverse
+        )  # objet partagé pour conversions string en valeurs et l'inverse
         self.sql_declare = sql_declare
         self.set_default()
 
     def set_default(self) -> None:
-        self.var_name = re.search(r"^@!?[\d\w#_\$@]+", self.sql_declare)[0]
-        self.type_name = re.search(r"^[^(=]+as\s+([^(\s=]+)", self.sql_declare, re.IGNORECASE)[1].lower()
+        self.var_name = _PARAM_NAME_REGEX.search(self.sql_declare)[0]
+        self.type_name = _PARAM_TYPE_REGEX.search(self.sql_declare)[1].lower()
         self.type_args = self._get_type_args()
-        self.display_value = re.search(r"^[^=]*=\s*('.*?'|[^,\s]*)", self.sql_declare)[1].replace("'", "").strip()
+        self.display_value = _PARAM_VALUE_REGEX.search(self.sql_declare)[1].replace("'", "").strip()
 
         # infos additionnelles
         self.description = ""
@@ -345,12 +583,12 @@ class _Param:
         self.update_value_cmd()
 
     def _get_type_args(self) -> list:
-        str_type_args = re.search(r"^[^(=]+\(([^)]+)\)", self.sql_declare)
+        str_type_args = _PARAM_TYPE_ARGS_REGEX.search(self.sql_declare)
         str_type_args = str_type_args[1].lower().split(",") if str_type_args else []
         return [arg.strip() for arg in str_type_args]
 
     def _infos_from_comment(self) -> None:
-        comment = re.search(r"--\s*(.+)", self.sql_declare)
+        comment = _PARAM_COMMENT_REGEX.search(self.sql_declare)
         if not comment:
             return
 
@@ -362,14 +600,14 @@ class _Param:
 
         # infos optionnel ou UI contrôle
         if len(comment_infos) > 1 and comment_infos[1]:
-            infos = re.sub(r"(\(.*?\))|(,)", r"\1^^^", comment_infos[1])
-            infos = [m.strip() for m in re.split(r"\^{3,6}", infos) if m.strip()]
+            infos = _COMMENT_SEP_REGEX.sub(r"\1^^^", comment_infos[1])
+            infos = [m.strip() for m in _COMMENT_SPLIT_REGEX.split(infos) if m.strip()]
 
             ui_funcs = ("entry", "list", "check")
             calc_funcs = ("user_info", "fiscal_year", "month_end", "today")
 
             for info in infos:
-                info_lst = re.search(r"^(.*?)(?=\(|$)\(?(.*?)\)?$", info)
+                info_lst = _COMMENT_FUNC_REGEX.search(info)
                 info_func = info_lst[1].lower()
                 info_args = info_lst[2]
 
@@ -377,7 +615,7 @@ class _Param:
                     self.is_optional = True
                 elif info_func == "hide":
                     self.is_hidden = True
-                elif info_func in calc_funcs:  # self.func_dict:
+                elif info_func in calc_funcs:
                     self.display_value = self._calc_func(info_func, info_args)
                 elif info_func in ui_funcs or info_func == "":
                     self.ui_control = info_func
@@ -434,10 +672,10 @@ class _Param:
 
             return datetime.strftime(my_date, self.converter.date_val_format)
 
-        self.func_dict = {"user_info": user_info, "fiscal_year": fiscal_year, "month_end": month_end, "today": today}
+        func_dict = {"user_info": user_info, "fiscal_year": fiscal_year, "month_end": month_end, "today": today}
 
         my_args = func_args.lower().split(",") if func_args else None
-        my_str = self.func_dict.get(func)(*my_args) if func in self.func_dict else self.display_value
+        my_str = func_dict.get(func)(*my_args) if func in func_dict else self.display_value
 
         return my_str
 
@@ -489,13 +727,16 @@ class _Param:
 
 class _QueryExecute:
     def __init__(self, parent: Query):
-        self.converter = Convert()
+        self.converter: Convert = shared_convert()
         self.parent = parent  # pour retourner des messages pour l'interface graphique
 
         self.cmd_template = ""
         self.cmd_parameters = {}
         self.server: servers.Server = None
         self.extract_file = ""
+        self.extract_format = "csv"
+        self.row_converters: list = None  # fonctions de conversion par colonne, initialisées sur 1er enregistrement
+        self.fetch_size: int = FETCH_ROWS_MIN  # nombre de lignes du prochain bloc à récupérer
 
         self.app_settings: settings.Settings = settings.Settings()
         self.field_separator = self.app_settings.field_separator
@@ -511,7 +752,7 @@ class _QueryExecute:
 
         return self.server
 
-    def execute(self, server_id, cmd_template, cmd_parameters, extract_file):
+    def execute(self, server_id, cmd_template, cmd_parameters, extract_file, extract_format="csv", cache_ttl=0):
         # controles validité du fichier d'extraction
         if extract_file != "" and Path(extract_file).exists():
             raise FileExistsError(f"Le fichier {extract_file} existe déjà.")
@@ -523,20 +764,30 @@ class _QueryExecute:
         self.cmd_template = cmd_template
         self.cmd_parameters = cmd_parameters
         self.extract_file = extract_file
+        self.extract_format = extract_format
+        self.row_converters = None
 
         if self.cmd_template == "" or self.parent.stop_requested.is_set():
             return False
 
+        # si résultat en cache toujours valide, copie du fichier en cache sans interroger le serveur
+        cache_key = ""
+        if extract_file != "" and cache_ttl:
+            cache_key = result_cache.cache_key(server_id, cmd_template, cmd_parameters, extract_format)
+            if result := self._execute_from_cache(cache_key):
+                return result
+
         starting_date = datetime.now()
         self._broadcast(starting_date.strftime(self.print_date_format) + " - Connexion à la base de données...")
 
         self.parent.cannot_stop.set()
-        with self.server.get_connection() as conn, conn.cursor() as cursor:
+        pool: connections_pool.ConnectionsPool = connections_pool.ConnectionsPool()
+        with pool.connection(self.server, connections_pool.is_reusable(self.cmd_template)) as conn:
             # execution de la requête et gestion des erreurs liées
             self._broadcast(self._time_log() + " - Requête en cours d'execution...")
             self.parent.queue.put(("start_timer", ""))
             try:
-                cursor.execute(self.cmd_template, self.cmd_parameters)
+                cursor = self._cursor_execute(conn)
                 self.parent.cannot_stop.clear()
                 self.parent.queue.put(("stop_timer", ""))
             except (pymssql._pymssql.ProgrammingError, psycopg2.ProgrammingError) as err:
@@ -545,42 +796,113 @@ class _QueryExecute:
                 self._broadcast(self._time_log() + f" - Erreur {error_code} : {error_msg}")
                 return False
             except Exception as err:
+                pool.discard(conn)
                 self._broadcast(self._time_log() + f" - Erreur d'execution inattendue :\n{', '.join(err.args)}")
                 return False
 
-            # si pas de fichier d'extraction alors renvoi des données dans une liste
-            if extract_file == "":
-                rows_count, execute_output = self._extract_to_list(cursor)
-                return rows_count, execute_output
+            with cursor:
+                # si pas de fichier d'extraction alors renvoi des données dans une liste
+                if extract_file == "":
+                    rows_count, execute_output = self._extract_to_list(cursor)
+                    return rows_count, execute_output
 
-            # sinon extraction des données dans un fichier
-            try:
-                self._broadcast(self._time_log() + " - Début récupération des lignes...")
-                rows_count, execute_output = self._extract_to_file(cursor)
-                if execute_output == "" and self.parent.stop_requested.is_set():
-                    raise InterruptedError()
-                ending_date = datetime.now()
-                self._execute_end(starting_date, ending_date, rows_count)
-                return rows_count, execute_output
-            except InterruptedError:
-                self._broadcast(self._time_log() + " - Extraction interrompue")
-            except PermissionError:
-                self._broadcast(self._time_log() + f" - Ecriture refusée pour : {self.extract_file}")
-            except (FileNotFoundError, OSError) as e:
-                error_msg = str(e).split("]")[1].strip() if "]" in str(e) else str(e)
-                self._broadcast(
-                    self._time_log()
-                    + f" - Erreur ouverture de : {Path(self.extract_file).name}\n"
-                    + f"Détail : {error_msg}"
-                )
+                # sinon extraction des données dans un fichier
+                try:
+                    self._broadcast(self._time_log() + " - Début récupération des lignes...")
+                    rows_count, execute_output = self._extract_to_file(cursor)
+                    if execute_output == "" and self.parent.stop_requested.is_set():
+                        raise InterruptedError()
+                    ending_date = datetime.now()
+                    self._execute_end(starting_date, ending_date, rows_count)
+                    if cache_key:
+                        cache = result_cache.ResultCache()
+                        cache.put(cache_key, self.parent.name, self.server.id, extract_file, rows_count, cache_ttl)
+                    return rows_count, execute_output
+                except InterruptedError:
+                    pool.discard(conn)  # lignes restantes non lues
+                    self._broadcast(self._time_log() + " - Extraction interrompue")
+                except PermissionError:
+                    pool.discard(conn)
+                    self._broadcast(self._time_log() + f" - Ecriture refusée pour : {self.extract_file}")
+                except (FileNotFoundError, OSError) as e:
+                    pool.discard(conn)
+                    error_msg = str(e).split("]")[1].strip() if "]" in str(e) else str(e)
+                    self._broadcast(
+                        self._time_log()
+                        + f" - Erreur ouverture de : {Path(self.extract_file).name}\n"
+                        + f"Détail : {error_msg}"
+                    )
 
-        # si erreur lors de l'extraction dans un fichier alors suppression du fichier créé
+        # si erreur lors de l'extraction dans un fichier alors suppression des fichiers créés
         if extract_file:
             Path(self.extract_file).unlink(missing_ok=True)
+            columns_path(self.extract_file).unlink(missing_ok=True)
 
         return False
 
-    def _execute_end(self, starting_date: datetime, ending_date: datetime, rows_count: int):
+    def _cursor_execute(self, conn):
+        """
+        Execution de la requête et renvoi du curseur.
+        Pour une extraction PostgreSQL dans un fichier, utilisation d'un curseur nommé (côté serveur)
+        pour que les lignes soient récupérées par bloc au lieu d'être toutes chargées en mémoire.
+        """
+        if (
+            self.extract_file
+            and self.server.type == servers.ServerType.postgre.name
+            and self._server_cursor_compatible()
+        ):
+            cursor = conn.cursor(name=SERVER_CURSOR_NAME)
+            cursor.itersize = self.server.fetch_size or FETCH_ROWS_MIN
+        else:
+            cursor = conn.cursor()
+        cursor.execute(self.cmd_template, self.cmd_parameters)
+        return cursor
+
+    def _server_cursor_compatible(self) -> bool:
+        """
+        Requête utilisable dans un curseur nommé, décidé avant l'execution pour qu'une erreur SQL ne soit pas
+        executée une 2nde fois : une seule instruction de lecture (SELECT, WITH, VALUES ou TABLE)
+        """
+        tokens = SqlLexer(self.cmd_template).tokens_get()
+        tokens = [token for _, token in tokens if token.type is not TokenType.COMMENT]
+        if not tokens or tokens[0].value.casefold() not in SERVER_CURSOR_FIRST:
+            return False
+
+        for i, token in enumerate(tokens):
+            if token.type is TokenType.DELIMITER and i < len(tokens) - 1:
+                return False  # plusieurs instructions
+            if token.type is TokenType.KEYWORD and token.value.casefold() in SERVER_CURSOR_EXCLUDED:
+                return False
+
+        return True
+
+    def _execute_from_cache(self, cache_key: str) -> tuple | None:
+        cache: result_cache.ResultCache = result_cache.ResultCache()
+        entry: result_cache.CacheEntry = cache.get(cache_key)
+        if entry is None:
+            return None
+
+        # résultat mis en cache sans fichier colonnes alors qu'il est activé : execution pour le créer
+        prefs: user_prefs.UserPrefs = user_prefs.UserPrefs()
+        if prefs.get(user_prefs.UserPrefsEnum.columns_file) and not columns_path(entry.file).exists():
+            return None
+
+        starting_date = datetime.now()
+        try:
+            cache.restore(entry, self.extract_file)
+        except OSError as e:
+            self._broadcast(self._time_log() + f" - Résultat en cache illisible, execution de la requête ({e})")
+            return None
+
+        self._broadcast(
+            starting_date.strftime(self.print_date_format)
+            + f" - Résultat en cache du {entry.created.strftime(self.print_date_format)} réutilisé"
+        )
+        self._execute_end(starting_date, datetime.now(), entry.nb_rows, cache_hit=True)
+
+        return entry.nb_rows, self.extract_file
+
+    def _execute_end(self, starting_date: datetime, ending_date: datetime, rows_count: int, cache_hit: bool = False):
         # writing user log
         user_log: logs_user.UserDb = logs_user.UserDb()
         params_for_log = self._params_for_log()
@@ -592,6 +914,7 @@ class _QueryExecute:
             rows_count,
             params_for_log,
             self.extract_file,
+            cache_hit,
         )
 
         # if on, launch central log
@@ -633,58 +956,243 @@ class _QueryExecute:
         return row_number + 1, buffer
 
     def _extract_to_file(self, cursor):
-        buffer = []  # buffer pour stocker les lignes avant écriture dans le fichier
-        buffer_max_size = 50_000  # nombre de lignes pour déclencher écriture dans fichier
-        row_number = -1
+        """
+        Extraction dans un fichier en pipeline : un thread récupère les blocs de lignes, le thread courant
+        les convertit et les encode, un thread les écrit. Les étapes sont reliées par des queues bornées
+        pour que l'attente réseau et l'écriture disque se chevauchent sans accumuler les lignes en mémoire.
+        """
+        self.fetch_size = self._fetch_size(len(cursor.description or ()))  # description vide si curseur nommé
+
+        records_queue: ThreadQueue = ThreadQueue(maxsize=PIPELINE_QUEUE_SIZE)
+        data_queue: ThreadQueue = ThreadQueue(maxsize=PIPELINE_QUEUE_SIZE)
+        abort: ThreadEvent = ThreadEvent()  # pour arrêter toutes les étapes si erreur ou interruption
+        errors: list[Exception] = []
+
+        with (
+            open(self.extract_file, mode="wb", buffering=FILE_BUFFER_SIZE) as f,
+            self._file_writer(f) as f_out,
+            self._columns_writer() as cols_out,
+        ):
+            fetcher = Thread(target=self._pipeline_fetch, args=(cursor, records_queue, abort, errors), daemon=True)
+            writer = Thread(target=self._pipeline_write, args=(f_out, data_queue, abort, errors), daemon=True)
+            fetcher.start()
+            writer.start()
+
+            try:
+                encode_block = self._block_encoder(cursor, f_out, cols_out)
+                rows_count = self._pipeline_convert(cursor, encode_block, records_queue, data_queue, abort)
+                self._pipeline_put(data_queue, None, abort)  # signaler la fin au thread d'écriture
+            except Exception:
+                abort.set()
+                raise
+            finally:
+                writer.join()
+                fetcher.join()
+
+        if errors:
+            raise errors[0]
+        elif abort.is_set():  # arrêt demandé
+            return 0, ""
+
+        self._broadcast(self._time_log() + " - Ecriture finie")
+
+        return rows_count, self.extract_file
+
+    def _file_writer(self, f):
+        """flux d'écriture du fichier extrait, compressé à la volée pour les formats compressés"""
+        if self.extract_format == "xlsx":
+            return XlsxWriter(f, text_func=self._text_recoder())
+        elif self.extract_format == "gzip":
+            return gzip.GzipFile(fileobj=f, mode="wb", compresslevel=GZIP_LEVEL)
+        elif self.extract_format == "zstd":
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f, closefd=False)
+        else:
+            return nullcontext(f)
+
+    def _columns_writer(self):
+        """fichier colonnes pour visualiser l'extraction, écrit si activé dans les préférences utilisateur"""
+        prefs: user_prefs.UserPrefs = user_prefs.UserPrefs()
+        if not prefs.get(user_prefs.UserPrefsEnum.columns_file):
+            return nullcontext(None)
 
-        with open(self.extract_file, mode="w", encoding="windows-1252", errors="replace", newline="") as f:
-            csv_writer = csv.writer(f, delimiter=self.field_separator, quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        return ColumnsWriter(columns_path(self.extract_file), text_func=self._text_recoder())
 
-            for row_number, record in enumerate(cursor):
-                # si arrêt demandé, stopper l'extraction
+    def _pipeline_fetch(self, cursor, records_queue: ThreadQueue, abort: ThreadEvent, errors: list) -> None:
+        try:
+            while not abort.is_set():
+                # si arrêt demandé, stopper l'extraction (contrôle une fois par bloc)
                 if self.parent.stop_requested.is_set():
-                    return 0, ""
+                    abort.set()
+                    break
 
-                # ajout entête au buffer si première ligne
-                if row_number == 0:
-                    row_headers = [colname[0] for colname in cursor.description]
-                    buffer.append(row_headers)
+                records = cursor.fetchmany(self.fetch_size)
+                if not self._pipeline_put(records_queue, records or None, abort) or not records:
+                    break
+        except Exception as e:
+            errors.append(e)
+            abort.set()
 
-                # écriture enregistrement courant
-                row_content = self._sql_record_to_text(record)
-                buffer.append(row_content)
+    def _pipeline_convert(
+        self, cursor, encode_block, records_queue: ThreadQueue, data_queue: ThreadQueue, abort: ThreadEvent
+    ):
+        rows_count = 0
 
-                # écriture du buffer si plein
-                if (row_number + 1) % buffer_max_size == 0:
-                    self._broadcast(
-                        self._time_log() + " - Ecriture ligne : {:,}...".format(row_number + 1).replace(",", " ")
-                    )
-                    csv_writer.writerows(buffer)
-                    buffer.clear()
+        while (records := self._pipeline_get(records_queue, abort)) is not None:
+            # conversion et encodage du bloc courant
+            data, data_size = encode_block(records)
 
-            # écriture des lignes restantes du buffer
-            if buffer:
-                self._broadcast(self._time_log() + " - Ecriture des dernières lignes...")
-                csv_writer.writerows(buffer)
-                buffer.clear()
+            if not self._pipeline_put(data_queue, data, abort):
+                break
 
-        self._broadcast(self._time_log() + " - Ecriture finie")
+            # signalement de la progression
+            previous_count, rows_count = rows_count, rows_count + len(records)
+            self.parent.queue.put(("progress", rows_count))
+            if rows_count // PROGRESS_ROWS > previous_count // PROGRESS_ROWS:
+                self._broadcast(
+                    self._time_log() + " - Ecriture ligne : {:,}...".format(rows_count).replace(",", " ")
+                )
+
+            # taille du prochain bloc selon largeur des lignes
+            self.fetch_size = self._fetch_size(len(cursor.description), data_size / len(records))
+
+        return rows_count
+
+    def _block_encoder(self, cursor, f_out, cols_out: ColumnsWriter = None):
+        """
+        Fonction d'encodage d'un bloc d'enregistrements en données à écrire selon le format d'extraction,
+        renvoie les données et leur taille. L'entête est ajouté avec le premier bloc.
+        Si fichier colonnes, le bloc y est aussi écrit.
+        """
+        if cols_out is not None:
+            encode_data = self._block_encoder(cursor, f_out)
+
+            def encode_with_columns(records):
+                if not cols_out.columns:
+                    cols_out.set_header([colname[0] for colname in cursor.description])
+                cols_out.write(records)
+                return encode_data(records)
 
-        return row_number + 1, self.extract_file
+            return encode_with_columns
+
+        if self.extract_format == "xlsx":
+            xlsx: XlsxWriter = f_out
+
+            def encode_xlsx(records):
+                if not xlsx.header_xml:
+                    xlsx.set_header([colname[0] for colname in cursor.description])
+                rows = xlsx.rows_xml(records)
+                return rows, sum(map(len, rows))
+
+            return encode_xlsx
+
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer, delimiter=self.field_separator, quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+        def encode_csv(records):
+            if self.row_converters is None:
+                csv_writer.writerow([colname[0] for colname in cursor.description])
+            csv_writer.writerows([self._sql_record_to_text(record) for record in records])
+            data = buffer.getvalue().encode(EXTRACT_ENCODING, errors="replace")
+            buffer.seek(0)
+            buffer.truncate()
+            return data, len(data)
+
+        return encode_csv
+
+    def _pipeline_write(self, f, data_queue: ThreadQueue, abort: ThreadEvent, errors: list) -> None:
+        try:
+            while (data := self._pipeline_get(data_queue, abort)) is not None:
+                f.write(data)
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+
+    def _pipeline_put(self, queue: ThreadQueue, item, abort: ThreadEvent) -> bool:
+        """ajout dans la queue en attendant qu'elle ait de la place, False si l'extraction a été stoppée"""
+        while not abort.is_set():
+            try:
+                queue.put(item, timeout=PIPELINE_WAIT)
+                return True
+            except QueueIsFull:
+                pass
+
+        return False
+
+    def _pipeline_get(self, queue: ThreadQueue, abort: ThreadEvent):
+        """récupération dans la queue en attendant qu'elle soit alimentée, None si fin ou extraction stoppée"""
+        while not abort.is_set():
+            try:
+                return queue.get(timeout=PIPELINE_WAIT)
+            except QueueIsEmpty:
+                pass
+
+        return None
+
+    def _fetch_size(self, cols_count: int, row_width: float = 0) -> int:
+        """nombre de lignes à récupérer par bloc, fixé par serveur ou adapté à la largeur des lignes"""
+        if self.server.fetch_size:
+            return self.server.fetch_size
+
+        # sans bloc de référence, estimation de la largeur des lignes à partir du nombre de colonnes
+        if not row_width and not cols_count:
+            return FETCH_ROWS_MIN
+        elif not row_width:
+            row_width = cols_count * FETCH_COL_WIDTH
+
+        fetch_size = int(FETCH_BLOCK_BYTES / max(row_width, 1))
+        return max(FETCH_ROWS_MIN, min(fetch_size, FETCH_ROWS_MAX))
 
     def _sql_record_to_text(self, record) -> list:
-        row_buffer = []
+        # conversion valeur récupérée en texte pour export, type déterminé une seule fois par colonne
+        if self.row_converters is None:
+            self.row_converters = self._init_row_converters(record)
+
+        return [convert(value) for convert, value in zip(self.row_converters, record)]
+
+    def _init_row_converters(self, record) -> list:
+        converters = self.converter.from_result_plan(record)
+
+        recoder = self._text_recoder()
+        if recoder is None:
+            return converters
+
+        return [self._recode_func(convert, recoder) for convert in converters]
+
+    def _recode_func(self, convert, recoder):
+        def recode(value) -> str:
+            return recoder(convert(value))
+
+        return recode
+
+    def _text_recoder(self):
+        """fonction de recodage des textes selon le charset du serveur, None si recodage inutile"""
+        charset = self.server.charset if self.server else "utf-8"
+        try:
+            charset_is_utf8 = codecs.lookup(charset).name == "utf-8"
+        except LookupError:
+            charset_is_utf8 = False
 
-        for j in range(len(record)):  # récup champs et conversion valeur récupérée en texte pour export
-            value = record[j]
-            value_txt = self.converter.from_result(value)
+        # si charset utf-8, encode puis decode utf-8 sans effet : pas besoin de recodage
+        if charset_is_utf8:
+            return None
+
+        # si charset compatible ascii, recodage inutile pour les textes ascii
+        ascii_chars = "".join(chr(i) for i in range(128))
+        try:
+            ascii_compatible = ascii_chars.encode(charset) == ascii_chars.encode("utf-8")
+        except (LookupError, UnicodeEncodeError):
+            ascii_compatible = False
+
+        def recode(value_txt: str) -> str:
+            if ascii_compatible and value_txt.isascii():
+                return value_txt
             try:
-                value_txt = value_txt.encode(self.server.charset).decode("utf-8")
+                value_txt = value_txt.encode(charset).decode("utf-8")
             except UnicodeDecodeError:
                 pass
-            row_buffer.append(value_txt)
+            return value_txt
 
-        return row_buffer
+        return recode
 
     def _broadcast(self, msg_to_display: str, msg_type: str = "msg_output") -> None:
         self.parent._broadcast(msg_to_display, msg_type)
@@ -705,7 +1213,9 @@ class _QueryExecute:
         return params
 
 
-class QueryWorker:
+class _WorkerProcess:
+    """Sous processus d'execution des requêtes, avec ses files de messages et ses évènements"""
+
     def __init__(self):
         self.process: Process = None
         self.queue_task: Queue = Queue()
@@ -713,104 +1223,67 @@ class QueryWorker:
         self.stop_requested: ProcEvent = proc_get_event()
         self.cannot_stop: ProcEvent = proc_get_event()
 
-        self.creating_worker: bool = False
-        self.worker_ready: bool = False
-        self.task_killed: bool = False
+        self.starting: bool = False
+        self.ready: bool = False
 
-        self.create_worker()
-
-    def create_worker(self):
-        def create():
-            args = (self.queue_task, self.queue_result, self.stop_requested, self.cannot_stop)
-            self.process = Process(target=self._worker, args=args, daemon=True)
+    def start(self) -> bool:
+        """création du processus et attente de son initialisation, à lancer dans un thread"""
+        self.starting = True
+        try:
+            self.process = Process(target=self._worker, daemon=True)
             self.process.start()
 
-            try:
-                if self.queue_result.get(timeout=90.0):  # long timeout to allow for slow init (network, antivirus...)
-                    self.worker_ready = True
-                    print("Worker ready")
-            except QueueIsEmpty:
-                print("Worker failed to initialize")
-                if self.process and self.process.is_alive():
-                    print("Terminating stuck worker process...")
-                    self.process.terminate()
-                    self.process.join(timeout=2.0)
-                    if self.process.is_alive():
-                        self.process.kill()
-            finally:
-                self.creating_worker = False
+            if self.queue_result.get(timeout=WORKER_INIT_TIMEOUT):
+                self.ready = True
+                print("Worker ready")
+        except QueueIsEmpty:
+            print("Worker failed to initialize")
+            if self.process and self.process.is_alive():
+                print("Terminating stuck worker process...")
+                self.process.terminate()
+                self.process.join(timeout=2.0)
+                if self.process.is_alive():
+                    self.process.kill()
+        finally:
+            self.starting = False
 
-        if self.creating_worker:
-            print("Worker already being created")
-            return
-        elif self.process and self.process.is_alive():
-            print("Worker already exists and is alive")
-            return
-        else:
-            self.worker_ready = False
-            self.creating_worker = True
-            print("Worker initializing")
-            Thread(target=create, daemon=True).start()
+        return self.ready
 
-    def kill_and_restart(self):
-        print("Task has been asked to stop")
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
 
-        self.worker_ready = False
+    def stop(self):
+        self.ready = False
 
         if not self.process:
             print("Task, stopping error : worker process does not exist")
-        else:
-            if not self.cannot_stop.is_set():
-                print("Trying to stop task normally")
-                self.stop_requested.set()
-                self.queue_task.put(("stop", "", ""))
-                self.process.join(timeout=5.0)
-
-            if self.process.is_alive():
-                print("Trying to stop task by terminating process")
-                self.process.terminate()  # SIGTERM
-                self.process.join(timeout=2.0)
-
-            if self.process.is_alive():
-                print("Trying to stop task by killing process")
-                self.process.kill()  # SIGKILL
-                self.process.join()
-
-            print("Task stopped")
-
-        # flag task as killed
-        self.task_killed = True
-
-        # reset events and queues
-        self.cannot_stop.clear()
-        self.stop_requested.clear()
-        for queue in (self.queue_result, self.queue_task):
-            while not queue.empty():
-                try:
-                    queue.get_nowait()
-                except QueueIsEmpty:
-                    break
-
-        # recreate worker
-        self.create_worker()
-
-    def input_task(self, server_id: str, query_data):
-        if self.creating_worker:
-            raise RuntimeError("Can't run query task worker process being created...")
-        if not self.worker_ready:
-            raise RuntimeError("Can't run query task worker process not ready...")
-        if not self.process or not self.process.is_alive():
-            self.create_worker()
-            raise RuntimeError("Can't run query task worker process not alive, recreating...")
-
-        self.task_killed = False
-        self.queue_task.put(("start", server_id, query_data))
+            return
 
-    def _worker(self, queue_task: Queue, queue_result: Queue, stop_requested: ProcEvent, cannot_stop: ProcEvent):
-        self.queue_task: Queue = queue_task
-        self.queue_result: Queue = queue_result
-        self.stop_requested: ProcEvent = stop_requested
-        self.cannot_stop: ProcEvent = cannot_stop
+        if not self.cannot_stop.is_set():
+            print("Trying to stop task normally")
+            self.stop_requested.set()
+            self.queue_task.put(("stop", "", ""))
+            self.process.join(timeout=5.0)
+
+        if self.process.is_alive():
+            print("Trying to stop task by terminating process")
+            self.process.terminate()  # SIGTERM
+            self.process.join(timeout=2.0)
+
+        if self.process.is_alive():
+            print("Trying to stop task by killing process")
+            self.process.kill()  # SIGKILL
+            self.process.join()
+
+        print("Task stopped")
+
+    def _worker(self):
+        try:  # objets communs chargés dès le démarrage (Kee, serveurs...) pour ne pas retarder la 1ère requête
+            settings.Settings()
+            servers.Servers()
+            users.CurrentUser()
+        except Exception as e:
+            print(f"Worker warm up failed : {e}")
 
         try:
             self.queue_result.put(True)
@@ -818,30 +1291,56 @@ class QueryWorker:
             print(f"Worker failed to signal ready state : {e}")
             return
 
+        pool: connections_pool.ConnectionsPool = connections_pool.ConnectionsPool()
         try:
             while True:
-                msg_type, self.server_id, self.query_data = self.queue_task.get()
+                try:
+                    msg_type, server_id, query_data = self.queue_task.get(timeout=connections_pool.POOL_CHECK_INTERVAL)
+                except QueueIsEmpty:
+                    pool.close_expired()  # connexions inutilisées depuis longtemps fermées pendant l'attente
+                    continue
+
                 if msg_type == "stop":
                     break
                 elif msg_type == "start":
-                    self._task()
+                    self._task(server_id, query_data)
                     self.cannot_stop.clear()
                     self.stop_requested.clear()
+                elif msg_type == "warmup":  # dans un thread pour ne pas retarder une execution demandée entre temps
+                    Thread(target=self._warm_up, args=(server_id,), daemon=True).start()
         except Exception as e:
             print(f"Worker unexpected error : {e}")
         finally:
+            pool.close_all()
             print("Worker process ending")
 
-    def _task(self):
+    def _warm_up(self, server_id: str):
+        """connexion au serveur ouverte à l'avance et conservée pour la prochaine requête, état renvoyé à l'UI"""
+        status = {"server": server_id, "ok": False, "ms": 0, "error": ""}
+        starting_date = datetime.now()
+        try:
+            server: servers.Server = servers.Servers().servers_dict[server_id]
+            with connections_pool.ConnectionsPool().connection(server):
+                pass
+            status["ok"] = True
+        except KeyError:
+            status["error"] = f"Infos du serveur non trouvé, id : {server_id}"
+        except Exception as e:
+            status["error"] = f"{e.__class__.__name__}, {e}"
+
+        status["ms"] = round((datetime.now() - starting_date).total_seconds() * 1000)
+        self.queue_result.put(("server_status", status))
+
+    def _task(self, server_id: str, query_data: dict):
         try:
             self.queue_result.put(("msg_print", "Query task starting"))
 
-            query: Query = Query.deserialize(self.query_data)
+            query: Query = Query.deserialize(query_data)
             query.queue = self.queue_result
             query.stop_requested = self.stop_requested
             query.cannot_stop = self.cannot_stop
 
-            result = query.execute_cmd(True, self.server_id)
+            result = query.execute_cmd(True, server_id)
             rows_number, output_file = result if isinstance(result, tuple) else (0, "")
             self.queue_result.put(("result", (rows_number, output_file)))
 
@@ -852,63 +1351,558 @@ class QueryWorker:
             self.queue_result.put(("done", None))
 
 
-def get_queries(folder: Path) -> tuple[list[Query], list[str]]:
+class QueryWorker:
+    """
+    Execution des requêtes dans un sous processus. D'autres sous processus sont démarrés à l'avance en réserve :
+    quand une execution est interrompue, celui arrêté est remplacé immédiatement par un sous processus prêt
+    et un nouveau est démarré en arrière plan pour compléter la réserve.
+    """
+
+    def __init__(self, pool_size: int = WORKER_POOL_SIZE):
+        self.pool_size: int = max(pool_size, 1)  # sous processus utilisé compris
+        self.worker: _WorkerProcess = _WorkerProcess()
+        self.spares: list[_WorkerProcess] = []  # sous processus prêts
+        self.spares_starting: int = 0
+        self.lock: Lock = Lock()
+
+        self.task_killed: bool = False
+        self.warmup_server_id: str = ""  # serveur auquel chaque nouveau sous processus se connecte à l'avance
+
+        self.create_worker()
+
+    @property
+    def process(self) -> Process:
+        return self.worker.process
+
+    @property
+    def queue_task(self) -> Queue:
+        return self.worker.queue_task
+
+    @property
+    def queue_result(self) -> Queue:
+        return self.worker.queue_result
+
+    @property
+    def stop_requested(self) -> ProcEvent:
+        return self.worker.stop_requested
+
+    @property
+    def cannot_stop(self) -> ProcEvent:
+        return self.worker.cannot_stop
+
+    @property
+    def creating_worker(self) -> bool:
+        return self.worker.starting
+
+    @property
+    def worker_ready(self) -> bool:
+        return self.worker.ready
+
+    def create_worker(self):
+        """démarrage en arrière plan des sous processus manquants, celui à utiliser puis ceux de réserve"""
+        with self.lock:
+            if self.worker.starting:
+                print("Worker already being created")
+            elif self.worker.is_alive():
+                print("Worker already exists and is alive")
+            else:
+                self.worker = self._take_spare() or _WorkerProcess()
+                if not self.worker.ready:
+                    print("Worker initializing")
+                    self.worker.starting = True  # avant le thread pour ne pas le démarrer deux fois
+                    Thread(target=self._start_worker, args=(self.worker,), daemon=True).start()
+
+            for _ in range(self.pool_size - 1 - len(self.spares) - self.spares_starting):
+                self.spares_starting += 1
+                Thread(target=self._start_spare, daemon=True).start()
+
+    def _start_worker(self, worker: _WorkerProcess):
+        if worker.start() and worker is self.worker:
+            self._send_warm_up()
+
+    def _send_warm_up(self):
+        if self.warmup_server_id and self.worker.ready:
+            self.worker.queue_task.put(("warmup", self.warmup_server_id, None))
+
+    def warm_up(self, server_id: str):
+        """connexion au serveur ouverte à l'avance par le sous processus, puis par ceux qui le remplaceront"""
+        self.warmup_server_id = server_id
+        self._send_warm_up()
+
+    def _take_spare(self) -> _WorkerProcess | None:
+        while self.spares:
+            spare = self.spares.pop(0)
+            if spare.is_alive():
+                print("Spare worker used")
+                return spare
+
+        return None
+
+    def _start_spare(self):
+        spare = _WorkerProcess()
+        try:
+            spare.start()
+        finally:
+            with self.lock:
+                self.spares_starting -= 1
+                if spare.ready:
+                    self.spares.append(spare)
+
+    def kill_and_restart(self):
+        print("Task has been asked to stop")
+
+        self.worker.stop()
+
+        # flag task as killed
+        self.task_killed = True
+
+        # nouveau sous processus, avec ses propres files et évènements : rien à réinitialiser
+        with self.lock:
+            self.worker = self._take_spare() or _WorkerProcess()
+        self.create_worker()
+        self._send_warm_up()  # sous processus de réserve déjà prêt
+
+    def input_task(self, server_id: str, query_data):
+        if self.creating_worker:
+            raise RuntimeError("Can't run query task worker process being created...")
+        if not self.worker_ready:
+            raise RuntimeError("Can't run query task worker process not ready...")
+        if not self.worker.is_alive():
+            self.create_worker()
+            raise RuntimeError("Can't run query task worker process not alive, recreating...")
+
+        self.task_killed = False
+        self.queue_task.put(("start", server_id, query_data))
+
+
+class JobStatus(Enum):
+    waiting = "En attente"
+    running = "En cours"
+    done = "Terminée"
+    stopped = "Interrompue"
+    error = "Erreur"
+
+
+class QueryJob:
+    def __init__(self, job_id: int, query_name: str, server_id: str, query_data: dict):
+        self.id: int = job_id
+        self.query_name: str = query_name
+        self.server_id: str = server_id
+        self.query_data: dict = query_data  # requête sérialisée, paramètres saisis compris
+
+        self.status: JobStatus = JobStatus.waiting
+        self.rows_number: int = 0  # lignes écrites, mis à jour pendant l'extraction
+        self.output_file: str = ""
+        self.messages: list[str] = []  # messages d'execution (msg_output)
+        self.start_time: datetime = None
+        self.end_time: datetime = None
+        self.worker: _WorkerProcess = None
+
+    def __repr__(self):
+        return str({"id": self.id, "query": self.query_name, "server": self.server_id, "status": self.status.value})
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (JobStatus.waiting, JobStatus.running)
+
+
+class QueryJobs:
+    """
+    File des requêtes executées en tâche de fond, jusqu'à `workers` à la fois chacune dans son sous processus.
+    Les messages de chaque sous processus sont relus par poll, à appeler régulièrement depuis l'interface.
+    """
+
+    def __init__(self, workers: int = JOBS_WORKERS):
+        self.workers_max: int = max(workers, 1)
+        self.workers: list[_WorkerProcess] = []  # sous processus créés à la demande puis réutilisés
+        self.jobs: list[QueryJob] = []
+        self.last_id: int = 0
+
+    def submit(self, query_name: str, server_id: str, query_data: dict) -> QueryJob:
+        self.last_id += 1
+        job = QueryJob(self.last_id, query_name, server_id, query_data)
+        self.jobs.append(job)
+        self._start_waiting()
+
+        return job
+
+    def cancel(self, job: QueryJob) -> None:
+        if not job.is_active:
+            return
+
+        if job.worker is not None:  # sous processus arrêté en arrière plan, un autre sera créé si besoin
+            self.workers.remove(job.worker)
+            Thread(target=job.worker.stop, daemon=True).start()
+            job.worker = None
+
+        job.status, job.end_time = JobStatus.stopped, datetime.now()
+        self._start_waiting()
+
+    def cancel_all(self) -> None:
+        for job in self.jobs:
+            self.cancel(job)
+
+    def clear_finished(self) -> None:
+        self.jobs = [job for job in self.jobs if job.is_active]
+
+    def is_active(self) -> bool:
+        return any(job.is_active for job in self.jobs)
+
+    def poll(self) -> list[tuple[QueryJob, str, object]]:
+        """
+        Lecture des messages des sous processus, mise à jour des tâches correspondantes et lancement de celles
+        en attente. Renvoie les messages lus (tâche, type, données) pour ceux à traiter par l'interface.
+        """
+        messages: list[tuple[QueryJob, str, object]] = []
+        for job in self.jobs:
+            if job.status != JobStatus.running:
+                continue
+
+            while job.worker is not None:
+                try:
+                    msg_type, data = job.worker.queue_result.get_nowait()
+                except QueueIsEmpty:
+                    break
+
+                messages.append((job, msg_type, data))
+                self._job_update(job, msg_type, data)
+
+            if job.worker is not None and not job.worker.is_alive():
+                job.messages.append("Sous processus arrêté de façon inattendue")
+                self.workers.remove(job.worker)
+                job.worker, job.status, job.end_time = None, JobStatus.error, datetime.now()
+
+        self._start_waiting()
+
+        return messages
+
+    def _job_update(self, job: QueryJob, msg_type: str, data) -> None:
+        if msg_type == "msg_output":
+            job.messages.append(data)
+        elif msg_type == "progress":
+            job.rows_number = data
+        elif msg_type == "result":
+            job.rows_number, job.output_file = data
+        elif msg_type == "error":
+            job.messages.append(f"Erreur non gérée :\n{data}")
+            job.status = JobStatus.error
+        elif msg_type == "done":
+            job.worker, job.end_time = None, datetime.now()
+            if job.status == JobStatus.running:
+                job.status = JobStatus.done
+
+    def _start_waiting(self) -> None:
+        """lancement des tâches en attente sur les sous processus libres, création des sous processus manquants"""
+        self.workers = [worker for worker in self.workers if worker.starting or worker.is_alive()]
+        busy = {id(job.worker) for job in self.jobs if job.worker is not None}
+        free = [worker for worker in self.workers if worker.ready and id(worker) not in busy]
+        starting = sum(1 for worker in self.workers if worker.starting)
+
+        for job in self.jobs:
+            if job.status != JobStatus.waiting:
+                continue
+
+            if free:
+                job.worker = free.pop(0)
+                job.status, job.start_time = JobStatus.running, datetime.now()
+                job.worker.queue_task.put(("start", job.server_id, job.query_data))
+            elif starting:  # tâche reprise par un sous processus en cours de création
+                starting -= 1
+            elif len(self.workers) < self.workers_max:
+                worker = _WorkerProcess()
+                worker.starting = True  # avant le thread pour qu'il soit conservé dans la liste
+                self.workers.append(worker)
+                Thread(target=worker.start, daemon=True).start()
+
+
+def _read_files(files: list[Path]) -> list[bytes | OSError]:
+    """lecture d'un lot de fichiers, l'erreur éventuelle est renvoyée à la place du contenu"""
+    files_data: list[bytes | OSError] = []
+    for file in files:
+        try:
+            files_data.append(Path(file).read_bytes())
+        except OSError as e:
+            files_data.append(e)
+
+    return files_data
+
+
+def _read_all(files: list[Path], workers: int = LOAD_WORKERS):
+    """
+    Lecture en parallèle par lots des fichiers, renvoie au fur et à mesure et dans l'ordre des fichiers
+    (fichier, contenu) ou (fichier, erreur)
+    """
+    batches = [files[i : i + LOAD_BATCH] for i in range(0, len(files), LOAD_BATCH)]
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for batch, files_data in zip(batches, pool.map(_read_files, batches)):
+            yield from zip(batch, files_data)
+
+
+def _load_files(files: list[Path], workers: int = LOAD_WORKERS):
+    """
+    Chargement des requêtes : les requêtes sont créées dans l'ordre des fichiers au fur et à mesure des lectures.
+    Renvoie pour chaque fichier (fichier, requête, None) ou (fichier, None, erreur)
+    """
+    for file, file_data in _read_all(files, workers):
+        try:
+            if isinstance(file_data, OSError):
+                raise file_data
+            yield file, Query(Path(file), file_data=file_data), None
+        except Exception as e:
+            yield file, None, e
+
+
+def _load_error(file: Path, e: Exception) -> str:
+    error_type = "ValueError" if isinstance(e, ValueError) else e.__class__.__name__
+    return f"Erreur chrgmt '{Path(file).name}' : {error_type}, {e}"
+
+
+def _scan_folder(folder: Path) -> dict[str, os.stat_result]:
+    """fichiers requêtes du dossier avec leurs infos (taille, date de modif...) en une seule lecture du dossier"""
+    with os.scandir(folder) as entries:
+        return {entry.name: entry.stat() for entry in entries if fnmatch(entry.name, "*.sql")}
+
+
+def _update_catalog(
+    folder: Path, known: dict[str, queries_catalog.CatalogEntry], workers: int = LOAD_WORKERS
+) -> tuple[dict[str, queries_catalog.CatalogEntry], dict[str, Query]]:
+    """
+    Mise à jour des entrées du catalogue avec le contenu actuel du dossier : seuls les fichiers nouveaux ou dont
+    la date de modif ou la taille a changé sont relus, et analysés de nouveau si leur contenu a changé.
+    Renvoie les entrées de tous les fichiers du dossier et les requêtes qui ont été analysées
+    """
+    entries: dict[str, queries_catalog.CatalogEntry] = {}
+    parsed: dict[str, Query] = {}
+
+    files_stat = _scan_folder(folder)
+    to_read: list[Path] = []
+    for name, stat in files_stat.items():
+        entry = known.get(name)
+        if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+            entries[name] = entry
+        else:
+            entries[name] = None  # pour garder l'ordre des fichiers
+            to_read.append(Path(folder) / name)
+
+    for file, file_data in _read_all(to_read, workers):
+        stat = files_stat[file.name]
+        entry = queries_catalog.CatalogEntry(file.name, stat.st_mtime_ns, stat.st_size)
+        entries[file.name] = entry
+
+        if isinstance(file_data, OSError):  # pas de date de modif pour relire le fichier la prochaine fois
+            entry.mtime, entry.error = 0, _load_error(file, file_data)
+            continue
+
+        entry.hash = hashlib.sha256(file_data).hexdigest()
+        previous = known.get(file.name)
+        if previous is not None and previous.hash == entry.hash:  # fichier modifié sans changement de contenu
+            entry.data, entry.error = previous.data, previous.error
+            continue
+
+        try:
+            query = Query(file, file_data=file_data)
+            entry.data = query.serialize()  # paramètres créés pour détecter leurs erreurs dès le chargement
+        except Exception as e:
+            entry.error = _load_error(file, e)
+            continue
+
+        query.params_obj = None  # recréés à la 1ère utilisation, avec les valeurs par défaut du moment
+        parsed[file.name] = query
+        del entry.data["cmd_params"], entry.data["display_params"]  # valeurs par défaut recalculées au chargement
+
+    return entries, parsed
+
+
+def _query_from_catalog(data: dict) -> Query:
+    data = dict(data, display_params={})
+    if "servers" not in data["infos"]:  # tous les serveurs, selon la liste actuelle
+        data["servers_id"] = list(servers.Servers().servers_dict.keys())
+
+    query = Query.deserialize(data)
+    query.release_content()  # relu depuis le catalogue si besoin
+
+    return query
+
+
+def _load_queries(
+    folder: Path, workers: int = LOAD_WORKERS
+) -> tuple[list[Query], list[str], dict[str, queries_catalog.CatalogEntry]]:
     if not Path(folder).is_dir():
         raise ValueError(f"Erreur : le répertoire {Path(folder)} n'a pas été trouvé ou n'est pas accessible !")
 
     queries: list[Query] = []
     errors: list[str] = []
 
-    files = list(Path(folder).glob("*.sql"))
-    for file in files:
+    catalog = queries_catalog.QueriesCatalog()
+    known = catalog.load(folder)
+    entries, parsed = _update_catalog(folder, known, workers)
+    if entries.keys() != known.keys() or any(entry is not known[name] for name, entry in entries.items()):
+        catalog.save(folder, list(entries.values()))
+
+    for name, entry in entries.items():
+        if entry.error:
+            errors.append(entry.error)
+            print(entry.error)
+            continue  # si erreur, ne pas bloquer et ignorer la requête
+
         try:
-            my_query = Query(Path(file))
-        except ValueError as e:
-            error = f"Erreur chrgmt '{Path(file).name}' : ValueError, {e}"
-            errors.append(error)
-            print(error)
-            continue
+            if name in parsed:
+                my_query = parsed[name]
+                my_query.release_content()  # relu depuis le catalogue si besoin
+            else:
+                my_query = _query_from_catalog(entry.data)
         except Exception as e:
-            error = f"Erreur chrgmt '{Path(file).name}' : {e.__class__.__name__}, {e}"
+            error = _load_error(Path(folder) / name, e)
             errors.append(error)
             print(error)
-            continue  # si erreur, ne pas bloquer et ignorer la requête
+            continue
 
         queries.append(my_query)
 
     queries.sort(key=lambda k: k.name)
 
+    return queries, errors, entries
+
+
+def get_queries(folder: Path, workers: int = LOAD_WORKERS) -> tuple[list[Query], list[str]]:
+    queries, errors, _ = _load_queries(folder, workers)
     return queries, errors
 
 
-def filter_queries(queries: list[Query], server_id: str, user: users.CurrentUser = users.CurrentUser()) -> list[Query]:
-    filtered: list[Query] = []
+class QueriesChanges:
+    def __init__(self):
+        self.added: list[Query] = []  # requêtes nouvelles ou modifiées
+        self.removed: list[str] = []  # noms des fichiers des requêtes supprimées ou modifiées
+        self.errors: list[str] = []
+
+    def __repr__(self):
+        return str({"added": [query.name for query in self.added], "removed": self.removed, "errors": self.errors})
+
+
+class QueriesWatcher:
+    """
+    Surveillance du dossier des requêtes par relevés périodiques (pas de notifications fiables sur un partage
+    réseau) : seuls les fichiers ajoutés, modifiés ou supprimés sont analysés et les modifications sont
+    transmises par la queue changes, à appliquer à la liste des requêtes chargées.
+    """
+
+    def __init__(self, folder: Path, interval: float = WATCH_INTERVAL):
+        self.folder: Path = Path(folder)
+        self.interval: float = interval
+        self.entries: dict[str, queries_catalog.CatalogEntry] = {}
+
+        self.changes: ThreadQueue = ThreadQueue()  # QueriesChanges à appliquer
+        self.lock: Lock = Lock()  # chargement complet et relevé périodique ne doivent pas se chevaucher
+        self.stop_requested: ThreadEvent = ThreadEvent()
+        self.thread: Thread = None
+
+    def load(self, folder: Path = None) -> tuple[list[Query], list[str]]:
+        """chargement complet des requêtes, les modifications pas encore appliquées sont abandonnées"""
+        with self.lock:
+            self.folder = Path(folder) if folder else self.folder
+            queries, errors, self.entries = _load_queries(self.folder)
+            while not self.changes.empty():
+                self.changes.get_nowait()
+
+        return queries, errors
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
 
-    # check if user is authorized for server
-    all_servers: servers.Servers = servers.Servers()
-    server: servers.Server = all_servers.servers_dict.get(server_id, None)
-    if not user.admin and not (server.grp_authorized == [] or set(user.grp_authorized) & set(server.grp_authorized)):
-        return filtered
-
-    # check which query user can see
-    for query in queries:
-        # ignore query if it's not for server_id
-        if server_id not in query.servers_id:
-            continue
+        self.stop_requested.clear()
+        self.thread = Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_requested.set()
+
+    def check(self) -> QueriesChanges | None:
+        """relevé du dossier, renvoie les modifications depuis le relevé précédent ou None si aucune"""
+        with self.lock:
+            known = self.entries
+            entries, parsed = _update_catalog(self.folder, known)
+            if entries.keys() == known.keys() and all(entry is known[name] for name, entry in entries.items()):
+                return None
+
+            changes = QueriesChanges()
+            changes.removed = [name for name in known if name not in entries]
+            for name, entry in entries.items():
+                previous = known.get(name)
+                if entry is previous:
+                    continue
+                same_content = previous is not None and (entry.hash, entry.error) == (previous.hash, previous.error)
+                if same_content and name not in parsed:
+                    continue  # fichier modifié sans changement de contenu
+
+                if previous is not None:
+                    changes.removed.append(name)
+                if name in parsed:
+                    changes.added.append(parsed[name])
+                elif entry.error:
+                    changes.errors.append(entry.error)
+
+            queries_catalog.QueriesCatalog().save(self.folder, list(entries.values()))
+            self.entries = entries
+            for query in changes.added:
+                query.release_content()  # relu depuis le catalogue si besoin
+
+        if not changes.added and not changes.removed and not changes.errors:
+            return None
 
-        # ignore query if user not allowed to access it
-        if (
-            not user.admin
-            and not query.grp_authorized == []
-            and not set(user.grp_authorized) & set(query.grp_authorized)
-        ):
-            continue
+        return changes
+
+    def _watch(self) -> None:
+        while not self.stop_requested.wait(self.interval):
+            try:
+                changes = self.check()
+            except Exception as e:  # dossier inaccessible (réseau...), nouvel essai au prochain relevé
+                print(f"Surveillance des requêtes : {e.__class__.__name__}, {e}")
+                continue
+
+            if changes is not None:
+                self.changes.put(changes)
+
+
+class QueriesAccess:
+    """
+    Requêtes visibles par l'utilisateur pour chaque serveur, calculées une seule fois par chargement des requêtes.
+    A recréer quand les requêtes, les serveurs ou l'utilisateur sont rechargés.
+    """
+
+    def __init__(self, queries: list[Query], user: users.CurrentUser = None):
+        self.user: users.CurrentUser = user if user is not None else users.CurrentUser()
+        self.user_groups: frozenset[str] = frozenset(self.user.grp_authorized)
+        self.by_server: dict[str, list[Query]] = {}  # id serveur : requêtes visibles, dans l'ordre de la liste
+        self.servers_ok: dict[str, bool] = {}  # id serveur : accès autorisé
+
+        for query in queries:
+            if not self.is_authorized(query.grp_authorized) or not (
+                query.hide == 0 or (self.user.admin and query.hide != 2)
+            ):
+                continue
 
-        # finally check hidden property to determine if query must be listed
-        if query.hide == 0 or (user.admin and query.hide != 2):
-            filtered.append(query)
+            for server_id in dict.fromkeys(query.servers_id):  # sans doublon, ordre conservé
+                self.by_server.setdefault(server_id, []).append(query)
 
-    return filtered
+    def is_authorized(self, grp_authorized: list[str]) -> bool:
+        return self.user.admin or not grp_authorized or not self.user_groups.isdisjoint(grp_authorized)
+
+    def visible(self, server_id: str) -> list[Query]:
+        """requêtes du serveur visibles par l'utilisateur, liste vide s'il n'a pas accès au serveur"""
+        if server_id not in self.servers_ok:
+            server: servers.Server = servers.Servers().servers_dict.get(server_id, None)
+            grp_authorized = server.grp_authorized if server is not None else None
+            self.servers_ok[server_id] = self.user.admin or (
+                grp_authorized is not None and self.is_authorized(grp_authorized)
+            )
+
+        return self.by_server.get(server_id, []) if self.servers_ok[server_id] else []
+
+
+def filter_queries(queries: list[Query], server_id: str, user: users.CurrentUser = None) -> list[Query]:
+    return list(QueriesAccess(queries, user).visible(server_id))
 
 
 def orphan_queries(folder: Path) -> list[Path]:
@@ -921,17 +1915,15 @@ def orphan_queries(folder: Path) -> list[Path]:
     all_ids = all_servers.servers_dict.keys()
 
     files = list(Path(folder).glob("*.sql"))
-    for file in files:
-        try:
-            query = Query(Path(file))
-            if not set(query.servers_id) & set(all_ids):
-                orphan_files.append(Path(file))
-                print(f"Aucun serveur existant pour : {Path(file).name}")
-        except Exception as e:
-            error = f"Erreur chrgmt '{Path(file).name}' : {e.__class__.__name__}, {e}"
-            print(error)
+    for file, query, e in _load_files(files):
+        if e is not None:
+            print(_load_error(file, e))
             continue  # si erreur, ne pas bloquer et ignorer la requête
 
+        if not set(query.servers_id) & set(all_ids):
+            orphan_files.append(Path(file))
+            print(f"Aucun serveur existant pour : {Path(file).name}")
+
     return orphan_files
 
 
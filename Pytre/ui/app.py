@@ -11,12 +11,14 @@ if not __package__:
 
 import old_files
 import sql_query
+import queries_search
 import settings
 import users
 import user_prefs
 import servers
 import utils
 import logs_central
+import result_cache
 from about import APP_NAME, APP_VERSION, APP_STATUS
 
 import ui.ui_utils as ui_utils
@@ -25,6 +27,7 @@ from ui.save_as import save_as
 from ui.MsgDialog import MsgDialog
 from ui.MsgOverlay import MsgOverlay
 from ui.app_logs import LogsWindow
+from ui.app_jobs import JobsWindow
 from ui.app_debug import DebugWindow
 from ui.app_users import UsersWindow
 from ui.app_servers import ServersWindow
@@ -51,6 +54,10 @@ class App(tk.Toplevel):
         self.central_logs: logs_central.CentralLogs = None
 
         self.queries_all: list[sql_query.Query] = []
+        self.queries_search: queries_search.QueriesSearch = queries_search.QueriesSearch()
+        self.queries_access: sql_query.QueriesAccess = sql_query.QueriesAccess([], self.user)
+        self.queries_watcher: sql_query.QueriesWatcher = sql_query.QueriesWatcher(self.app_settings.queries_folder)
+        self._queries_loading: bool = False
         self.queries: list[sql_query.Query] = []
         self.query: sql_query.Query = sql_query.Query()
         self.params_widgets: dict[str, ttk.Widget] = {}
@@ -58,6 +65,8 @@ class App(tk.Toplevel):
 
         self.process_running: bool = False
         self.query_worker: sql_query.QueryWorker = sql_query.QueryWorker()
+        self.query_jobs: sql_query.QueryJobs = sql_query.QueryJobs()
+        self._jobs_checking: bool = False
         self.start_time: datetime = None
         self._timer_after_id: str = None
 
@@ -220,9 +229,13 @@ class App(tk.Toplevel):
 
         self.menu_query = tk.Menu(menubar, tearoff=False)
         self.menu_query.add_command(label="Executer", state="disabled", command=self.execute_query)
+        self.menu_query.add_command(label="Tâche de fond", state="disabled", command=self.execute_background)
+        self.menu_query.add_command(label="Tâches...", command=self.open_jobs)
         self.menu_query.add_command(label="Dossier...", command=lambda: self.open_folder(self.prefs.extract_folder))
         self.menu_query.add_command(label="Journal...", command=lambda: self.open_logs(True))
         self.menu_query.add_command(label="Debug...", state="disabled", command=self.debug_query)
+        self.menu_query.add_cascade(label="Format d'extraction", menu=self.setup_ui_menu_format(self.menu_query))
+        self.menu_query.add_command(label="Vider le cache", command=self.clear_cache)
         self.menu_query.add_separator()
         self.menu_query.add_command(label="Recharger", command=lambda: self.refresh_queries())
         if self.user.admin:
@@ -250,11 +263,39 @@ class App(tk.Toplevel):
         menubar.add_cascade(label="?", menu=menu_about)
 
         if theme_is_on():
-            menus: list[tk.Menu] = [menubar, self.menu_query, menu_about]
+            menus: list[tk.Menu] = [menubar, self.menu_query, self.menu_format, menu_about]
             if self.user.admin:
                 menus.append(menu_admin)
             set_menus(menus)
 
+    def setup_ui_menu_format(self, parent_menu: tk.Menu) -> tk.Menu:
+        formats_label = {
+            "csv": "Csv",
+            "gzip": "Csv compressé (gzip)",
+            "zstd": "Csv compressé (zstd)",
+            "xlsx": "Excel (xlsx)",
+        }
+        pref_format = self.prefs.get(user_prefs.UserPrefsEnum.extract_format)
+
+        self.extract_format = tk.StringVar(value=pref_format if pref_format in sql_query.EXTRACT_FORMATS else "csv")
+        self.menu_format = tk.Menu(parent_menu, tearoff=False)
+        for extract_format in sql_query.EXTRACT_FORMATS:
+            self.menu_format.add_radiobutton(
+                label=formats_label.get(extract_format, extract_format),
+                value=extract_format,
+                variable=self.extract_format,
+                command=self.extract_format_change,
+            )
+
+        # fichier colonnes écrit en plus de l'extraction pour la visualiser depuis le journal
+        self.columns_file = tk.BooleanVar(value=bool(self.prefs.get(user_prefs.UserPrefsEnum.columns_file)))
+        self.menu_format.add_separator()
+        self.menu_format.add_checkbutton(
+            label="Fichier de visualisation", variable=self.columns_file, command=self.columns_file_change
+        )
+
+        return self.menu_format
+
     def setup_ui_paned_window(self):
         self.paned_window = ttk.PanedWindow(self, orient="horizontal")
         self.paned_window.grid(row=0, column=0, padx=5, pady=5, sticky="nswe")
@@ -265,6 +306,7 @@ class App(tk.Toplevel):
 
         self.servers_label = ttk.Label(self.left_frame, text="Serveur :", justify=tk.LEFT)
         self.servers_cb = ttk.Combobox(self.left_frame, width=20, state="readonly")
+        self.servers_status = ttk.Label(self.left_frame, text="", width=10)  # connexion ouverte à l'avance
 
         self.queries_filter_text = tk.StringVar()
         self.queries_label_filter = ttk.Label(self.left_frame, text="Filtre :", justify=tk.LEFT)
@@ -287,16 +329,17 @@ class App(tk.Toplevel):
         # placement des éléments dans la frame
         self.servers_label.grid(row=0, column=0, padx=2, pady=2, sticky="nswe")
         self.servers_cb.grid(row=0, column=1, padx=2, pady=2, sticky="nswe")
-        self.queries_label_filter.grid(row=0, column=2, padx=2, pady=2, sticky="nswe")
-        self.queries_entry_filter.grid(row=0, column=3, columnspan=3, padx=2, pady=2, sticky="nswe")
-        self.queries_btn_refresh.grid(row=0, column=6, columnspan=2, padx=2, pady=2, sticky="nswe")
-        self.queries_tree.grid(row=1, column=0, columnspan=8, padx=2, pady=2, sticky="nswe")
-        self.queries_tree_scrollbar_y.grid(row=1, column=7, sticky="nse")
+        self.servers_status.grid(row=0, column=2, padx=2, pady=2, sticky="nswe")
+        self.queries_label_filter.grid(row=0, column=3, padx=2, pady=2, sticky="nswe")
+        self.queries_entry_filter.grid(row=0, column=4, columnspan=3, padx=2, pady=2, sticky="nswe")
+        self.queries_btn_refresh.grid(row=0, column=7, columnspan=2, padx=2, pady=2, sticky="nswe")
+        self.queries_tree.grid(row=1, column=0, columnspan=9, padx=2, pady=2, sticky="nswe")
+        self.queries_tree_scrollbar_y.grid(row=1, column=8, sticky="nse")
 
         # paramètrage poids lignes et colonnes
         self.left_frame.rowconfigure(1, weight=1)
         self.left_frame.columnconfigure(1, weight=1)
-        self.left_frame.columnconfigure(3, weight=5)
+        self.left_frame.columnconfigure(4, weight=5)
 
     def setup_ui_right_frame(self):
         self.right_frame = ttk.Frame(self.paned_window, padding=0, borderwidth=2)
@@ -388,6 +431,9 @@ class App(tk.Toplevel):
 
         self.btn_log = ttk.Button(self.btn_frame, text="\U0001f56e", width=4, command=self.open_logs)
         self.btn_execute = ttk.Button(self.btn_frame, text="Executer", state="disable", command=self.execute_query)
+        self.btn_background = ttk.Button(
+            self.btn_frame, text="Tâche de fond", state="disable", command=self.execute_background
+        )
         self.btn_queries_folder = ttk.Button(
             self.btn_frame, text="Dossier", command=lambda: self.open_folder(self.prefs.extract_folder)
         )
@@ -395,8 +441,9 @@ class App(tk.Toplevel):
 
         self.btn_log.grid(row=0, column=0, padx=2, pady=0, sticky="nswe")
         self.btn_execute.grid(row=0, column=2, padx=2, pady=0, sticky="nswe")
-        self.btn_queries_folder.grid(row=0, column=3, padx=2, pady=0, sticky="nswe")
-        self.btn_debug.grid(row=0, column=4, padx=2, pady=0, sticky="nswe")
+        self.btn_background.grid(row=0, column=3, padx=2, pady=0, sticky="nswe")
+        self.btn_queries_folder.grid(row=0, column=4, padx=2, pady=0, sticky="nswe")
+        self.btn_debug.grid(row=0, column=5, padx=2, pady=0, sticky="nswe")
 
         # paramètrage des poids des lignes et colonnes
         self.btn_frame.rowconfigure(0, weight=1)
@@ -511,7 +558,7 @@ class App(tk.Toplevel):
     # Définition des évènements générer par les traitements
     # ------------------------------------------------------------------------------------------
     def setup_events_binds(self):
-        self.servers_cb.bind("<<ComboboxSelected>>", lambda _: self.queries_filter())
+        self.servers_cb.bind("<<ComboboxSelected>>", lambda _: self.servers_selection_change())
         self.servers_cb.bind("<FocusOut>", lambda _: self.servers_cb.selection_clear())
         self.queries_entry_filter.bind("<KeyRelease>", lambda _: self.queries_filter(self.queries_filter_text.get()))
         self.queries_tree.bind("<<TreeviewSelect>>", self.tree_selection_change)
@@ -628,6 +675,8 @@ class App(tk.Toplevel):
                     self.output_msg(msg, "end")
                 elif msg_type == "central_log" and self.instanciate_logs():
                     self.central_logs.trigger_sync(**data)
+                elif msg_type == "server_status":
+                    self.server_status_update(data)
                 elif msg_type == "done":
                     self.exec_timer(stop=True)
                     done = True
@@ -758,11 +807,12 @@ class App(tk.Toplevel):
         self.queries_filter_text.set("")
 
         self.refresh_servers(reload_servers)
+        self._queries_loading = True
 
         def worker():
             queries_all, errors = [], []
             try:
-                queries_all, errors = sql_query.get_queries(self.app_settings.queries_folder)
+                queries_all, errors = self.queries_watcher.load(self.app_settings.queries_folder)
             except Exception as err:
                 queries_all, errors = [], [str(err)]
             finally:
@@ -771,7 +821,11 @@ class App(tk.Toplevel):
 
         def refresh_end(queries_all, errors):
             self.queries_all = queries_all
+            self.queries_search = queries_search.QueriesSearch(queries_all)
+            self.queries_access = sql_query.QueriesAccess(queries_all, self.user)  # serveurs rechargés avant
+            self._queries_loading = False
             self.queries_filter()
+            self.server_warm_up()
             self.tree_autosize()
 
             if self._queries_first_load:
@@ -779,6 +833,11 @@ class App(tk.Toplevel):
                 custom_msg = self.user.msg_login
                 self.output_msg(str(custom_msg or default_msg) + "\n", "1.0", "1.0")
 
+                # surveillance du dossier des requêtes pour appliquer les modifications sans tout recharger
+                self.queries_watcher.start()
+                self.queries_check_changes()
+                self.servers_check_status()
+
             if errors:
                 self.output_msg("\n".join(errors))
 
@@ -834,6 +893,37 @@ class App(tk.Toplevel):
         else:
             self.output_msg("Impossible d'executer, tant que des paramètres ne sont pas valides :\n", "1.0", "1.0")
 
+    def execute_background(self):
+        if self.query is None:
+            messagebox.showwarning("Warning", "Aucune requête de sélectionnée !", parent=self)
+            return
+
+        self.output_msg("")
+        if not self.params_get_input():
+            self.output_msg("Impossible d'executer, tant que des paramètres ne sont pas valides :\n", "1.0", "1.0")
+            return
+
+        job = self.query_jobs.submit(self.query.name, self.server_id, self.query.serialize())
+        self.output_msg(f"Requête {job.query_name} lancée en tâche de fond (n° {job.id})")
+        self.open_jobs()
+        if not self._jobs_checking:
+            self.jobs_check()
+
+    def jobs_check(self):
+        """lecture des messages des tâches de fond, relancée tant que des tâches sont en cours"""
+        try:
+            for job, msg_type, data in self.query_jobs.poll():
+                if msg_type in ("msg_print", "msg_output"):
+                    print(f"Tâche {job.id} - {data}")
+                elif msg_type == "central_log" and self.instanciate_logs():
+                    self.central_logs.trigger_sync(**data)
+        except Exception as e:
+            print(f"Error reading jobs queues: {e}")
+
+        self._jobs_checking = self.query_jobs.is_active()
+        if self._jobs_checking:
+            self.after(250, self.jobs_check)
+
     def params_get_input(self):
         for key in self.params_widgets:
             w_entry_var = self.params_widgets[key].get("entry_var", None)
@@ -857,6 +947,17 @@ class App(tk.Toplevel):
 
         return self.query.values_ok()
 
+    def extract_format_change(self):
+        self.prefs.set(user_prefs.UserPrefsEnum.extract_format, self.extract_format.get())
+
+    def clear_cache(self):
+        msg = "Supprimer tous les résultats de requêtes conservés en cache ?"
+        if messagebox.askyesno("Cache", msg, parent=self):
+            result_cache.ResultCache().clear()
+
+    def columns_file_change(self):
+        self.prefs.set(user_prefs.UserPrefsEnum.columns_file, self.columns_file.get())
+
     def instanciate_logs(self) -> bool:
         if self.central_logs:
             return True
@@ -870,6 +971,14 @@ class App(tk.Toplevel):
         return False
 
     def app_exit(self, event: tkEvent = None):
+        if self.query_jobs.is_active():
+            msg = "Des requêtes sont en cours en tâche de fond.\nLes interrompre et quitter ?"
+            if not messagebox.askyesno("Quitter", msg, parent=self):
+                return
+            self.query_jobs.cancel_all()
+
+        self.queries_watcher.stop()
+
         if self.instanciate_logs():
             self.central_logs.stop_sync()
 
@@ -927,9 +1036,8 @@ class App(tk.Toplevel):
         self.queries_disable_filter = False
         self.queries_previous_filter = text_filter
 
-        for item in self.queries_tree.get_children():
-            self.queries_tree.delete(item)
-
+        self.queries_tree.selection_set(())  # liste mise à jour sans être recréée : sélection à retirer
+        self.queries_tree.focus("")
         self.ui_params_reset()
         self.query = None
         self.output_msg(msg_filter)
@@ -937,17 +1045,105 @@ class App(tk.Toplevel):
         servers_id = list(self.servers.servers_dict.keys())
         cb_current = self.servers_cb.current()
         self.server_id = servers_id[cb_current] if cb_current > -1 else ""
-        self.queries = sql_query.filter_queries(self.queries_all, self.server_id, self.user)
 
         self.queries_tree.tag_configure("hidden", foreground="gray")
-        for item in self.queries:
-            if (
-                text_filter == ""
-                or item.name.lower().find(text_filter.lower()) != -1
-                or item.description.lower().find(text_filter.lower()) != -1
-            ):
-                color = "none" if item.description[0:3] != "(*)" else "hidden"
-                self.queries_tree.insert("", tk.END, values=(item.name, item.description), iid=id(item), tags=color)
+        self.queries_tree_update()
+
+    def servers_selection_change(self):
+        self.queries_filter()
+        self.server_warm_up()
+
+    def server_warm_up(self):
+        """connexion au serveur sélectionné ouverte à l'avance par le sous processus, son état est affiché à côté"""
+        if not self.server_id:
+            return
+
+        self.servers_status.configure(text="\u25cf ...", foreground="gray")
+        self.query_worker.warm_up(self.server_id)
+
+    def servers_check_status(self):
+        """lecture de l'état des connexions ouvertes à l'avance, par exec_check_queue pendant une execution"""
+        if not self.process_running:
+            try:
+                while not self.query_worker.queue_result.empty():
+                    msg_type, data = self.query_worker.queue_result.get_nowait()
+                    if msg_type == "server_status":
+                        self.server_status_update(data)
+            except Exception as e:
+                print(f"Error reading queue: {e}")
+
+        self.after(250, self.servers_check_status)
+
+    def server_status_update(self, status: dict):
+        if status["server"] != self.server_id:  # serveur sélectionné entre temps
+            return
+
+        if status["ok"]:
+            self.servers_status.configure(text=f"\u25cf {status['ms']} ms", foreground="green")
+        else:
+            self.servers_status.configure(text="\u25cf injoignable", foreground="red")
+            print(f"Serveur {status['server']} injoignable : {status['error']}")
+
+    def queries_check_changes(self):
+        """application des modifications relevées dans le dossier des requêtes, hors chargement et execution"""
+        if not self._queries_loading and not self.process_running:
+            while not self.queries_watcher.changes.empty():
+                self.queries_apply_changes(self.queries_watcher.changes.get_nowait())
+
+        self.after(1000, self.queries_check_changes)
+
+    def queries_apply_changes(self, changes: sql_query.QueriesChanges):
+        removed = set(changes.removed)
+        self.queries_all = [query for query in self.queries_all if query.filename.name not in removed]
+        self.queries_all.extend(changes.added)
+        self.queries_all.sort(key=lambda k: k.name)
+        self.queries_search = queries_search.QueriesSearch(self.queries_all)
+        self.queries_access = sql_query.QueriesAccess(self.queries_all, self.user)
+
+        selected_name = self.query.name if self.query is not None and self.query.filename.name in removed else ""
+        if selected_name:  # requête sélectionnée modifiée, les paramètres saisis ne sont plus valables
+            self.ui_params_reset()
+            self.query = None
+
+        self.queries_tree_update()
+        if selected_name:
+            self.tree_selection_change(None)
+            self.output_msg(f"La requête {selected_name} a été modifiée ou supprimée.\n")
+        if changes.errors:
+            self.output_msg("\n".join(changes.errors) + "\n", "end", "end")
+
+    def queries_access_refresh(self):
+        """droits recalculés à la fermeture de la gestion des serveurs ou des utilisateurs (groupes modifiés)"""
+        self.user.reload()
+        self.queries_access = sql_query.QueriesAccess(self.queries_all, self.user)
+        self.queries_tree_update()
+
+        if self.query is not None and all(item is not self.query for item in self.queries):
+            self.ui_params_reset()
+            self.query = None
+            self.tree_selection_change(None)
+
+    def queries_tree_update(self):
+        """mise à jour de la liste affichée sans la recréer, seules les requêtes changées sont retirées/insérées"""
+        found = self.queries_search.search(getattr(self, "queries_previous_filter", ""))
+        self.queries = self.queries_access.visible(self.server_id)
+        visible = [item for item in self.queries if found is None or id(item) in found]
+
+        visible_iids = {str(id(item)) for item in visible}
+        tree_iids = set()
+        for iid in self.queries_tree.get_children():
+            if iid in visible_iids:
+                tree_iids.add(iid)
+            else:
+                self.queries_tree.delete(iid)
+
+        for index, item in enumerate(visible):
+            if str(id(item)) not in tree_iids:
+                self._tree_insert(index, item)
+
+    def _tree_insert(self, index: int | str, item: sql_query.Query):
+        color = "none" if item.description[0:3] != "(*)" else "hidden"
+        self.queries_tree.insert("", index, values=(item.name, item.description), iid=id(item), tags=color)
 
     def tree_autosize(self):
         cols_to_autosize = (0,)  # uniquement première colonne
@@ -967,20 +1163,35 @@ class App(tk.Toplevel):
 
         if selected_values == "":
             self.menu_query.entryconfig("Executer", state="disable")
+            self.menu_query.entryconfig("Tâche de fond", state="disable")
             self.menu_query.entryconfig("Debug...", state="disable")
             self.btn_execute["state"] = "disable"
+            self.btn_background["state"] = "disable"
             self.btn_debug["state"] = "disable"
             self.params_label["text"] = "Saisie des paramètres"
         else:
             self.menu_query.entryconfig("Executer", state="normal")
+            self.menu_query.entryconfig("Tâche de fond", state="normal")
             self.menu_query.entryconfig("Debug...", state="normal")
             self.btn_execute["state"] = "enable"
+            self.btn_background["state"] = "enable"
             self.btn_debug["state"] = "enable"
             self.params_label["text"] = "Saisie des paramètres pour " + selected_values[0]
             for query in self.queries:
                 if selected_iid == str(id(query)):
+                    if self.query is not None and self.query is not query:
+                        self.query.release_content()  # contenu de la requête précédente relu si besoin
                     self.query = query
-                    self.ui_params_update(self.query.params_obj)
+                    try:
+                        params = self.query.params_obj  # paramètres créés à la 1ère sélection
+                    except Exception as e:
+                        self.query = None
+                        self.btn_execute["state"] = "disable"
+                        self.btn_background["state"] = "disable"
+                        self.btn_debug["state"] = "disable"
+                        self.output_msg(f"Erreur paramètres '{query.name}' : {e.__class__.__name__}, {e}")
+                        break
+                    self.ui_params_update(params)
                     break
 
         self.params_canvas.yview_moveto(0)
@@ -1064,18 +1275,24 @@ class App(tk.Toplevel):
         else:
             LogsWindow(self)
 
+    def open_jobs(self):
+        if getattr(self, "jobs_window", None) is None or not self.jobs_window.winfo_exists():
+            self.jobs_window = JobsWindow(self.query_jobs, self)
+        else:
+            self.jobs_window.focus_set()
+
     def debug_query(self):
         if self.query is not None:
             DebugWindow(self.query, self)
 
     def manage_users(self):
         if getattr(self, "user_window", None) is None or not self.user_window.winfo_exists():
-            self.user_window = UsersWindow(self)
+            self.user_window = UsersWindow(self, self.queries_access_refresh)
         else:
             self.user_window.focus_set()
 
     def manage_servers(self):
-        ServersWindow(self)
+        ServersWindow(self, self.queries_access_refresh)
 
     def manage_settings(self):
         SettingsWindow(self, self.app_settings.reload)
@@ -0,0 +1,256 @@
+import tkinter as tk
+from tkinter import ttk, Event, messagebox
+from datetime import datetime
+from pathlib import Path
+
+if not __package__:
+    import syspath_insert  # noqa: F401  # disable unused-import warning
+
+import utils
+from sql_query import QueryJobs, QueryJob, JobStatus
+from columns_file import columns_path
+from about import APP_NAME
+
+import ui.ui_utils as ui_utils
+from ui.app_result import ResultWindow
+from ui.app_theme import set_theme
+
+REFRESH_MS: int = 500  # intervalle de rafraîchissement de la liste des tâches
+
+
+class JobsWindow(tk.Toplevel):
+    """
+    Suivi des requêtes executées en tâche de fond : statut, lignes écrites, messages et interruption.
+    Les messages des sous processus sont relus par la fenêtre principale, cette fenêtre ne fait que les afficher.
+    """
+
+    def __init__(self, jobs: QueryJobs, parent=None):
+        super().__init__()
+        self.parent = parent
+        if self.parent:
+            self.focus_set()
+        else:
+            self.master.withdraw()
+
+        self.jobs: QueryJobs = jobs
+        self.shown_values: dict[str, tuple] = {}  # iid : valeurs affichées, pour ne mettre à jour que les changements
+        self.shown_messages: tuple[int, int] = (0, 0)  # (id tâche, nb messages) affichés
+        self._refresh_after_id: str = None
+
+        set_theme(self)
+        self._setup_ui()
+        self._events_binds()
+
+        self.tree_refresh()
+
+    # ------------------------------------------------------------------------------------------
+    # Création de l'interface
+    # ------------------------------------------------------------------------------------------
+    def _setup_ui(self):
+        self.title(f"{APP_NAME} - Tâches de fond")
+        if self.parent:
+            self.geometry(f"760x500+{self.parent.winfo_x() + 100}+{self.parent.winfo_y() + 40}")
+        else:
+            self.geometry("760x500")
+            ui_utils.ui_center(self)
+
+        self.resizable(True, True)
+
+        self.top_frame = ttk.PanedWindow(self, orient=tk.VERTICAL)
+        self.ctrl_frame = ttk.Frame(self, padding=1, borderwidth=2)
+
+        self.top_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nswe")
+        self.ctrl_frame.grid(row=1, column=0, padx=0, pady=0, sticky="we")
+
+        self._setup_ui_top()
+        self._setup_ui_ctrl()
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+    def _tree_cols(self) -> dict:
+        return {
+            "num": {"text": "Num", "width": 45, "anchor": "e", "stretch": False},
+            "query": {"text": "Requête", "width": 150, "stretch": False},
+            "server": {"text": "Serveur", "width": 100, "stretch": False},
+            "status": {"text": "Statut", "width": 80, "stretch": False},
+            "nb_rows": {"text": "Lignes", "width": 90, "anchor": "e", "stretch": False},
+            "duration": {"text": "Durée", "width": 75, "anchor": "e", "stretch": False},
+            "file": {"text": "Fichier", "width": 150, "stretch": True},
+        }
+
+    def _setup_ui_top(self):
+        self.tree_frame = ttk.Frame(self.top_frame, padding=1, borderwidth=2)
+        self.msg_frame = ttk.Frame(self.top_frame, padding=1, borderwidth=2)
+
+        cols = self._tree_cols()
+        self.tree = ttk.Treeview(self.tree_frame, columns=list(cols), show="headings", selectmode="browse")
+        for col, attr in cols.items():
+            self.tree.heading(col, text=attr["text"])
+            self.tree.column(col, width=attr["width"], stretch=attr["stretch"], anchor=attr.get("anchor", "w"))
+
+        ybar = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=ybar.set)
+
+        self.tree.grid(row=0, column=0, padx=2, pady=2, sticky="nswe")
+        ybar.grid(row=0, column=1, sticky="ns")
+
+        self.tree_frame.grid_rowconfigure(0, weight=1)
+        self.tree_frame.grid_columnconfigure(0, weight=1)
+
+        self.textbox = tk.Text(self.msg_frame, height=8, wrap="none", state=tk.DISABLED)
+        y_scrollbar = ttk.Scrollbar(self.msg_frame, orient="vertical", command=self.textbox.yview)
+        self.textbox["yscrollcommand"] = y_scrollbar.set
+
+        self.textbox.grid(row=0, column=0, sticky="nswe")
+        y_scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.msg_frame.grid_rowconfigure(0, weight=1)
+        self.msg_frame.grid_columnconfigure(0, weight=1)
+
+        self.top_frame.add(self.tree_frame, weight=2)
+        self.top_frame.add(self.msg_frame, weight=1)
+
+    def _setup_ui_ctrl(self):
+        self.btn_stop = ttk.Button(self.ctrl_frame, text="Interrompre", command=self.job_cancel)
+        self.btn_clear = ttk.Button(self.ctrl_frame, text="Effacer terminées", command=self.jobs_clear)
+        self.btn_view = ttk.Button(self.ctrl_frame, text="Visualiser", command=self.show_result)
+        self.btn_open = ttk.Button(self.ctrl_frame, text="Ouvrir", command=self.show_file)
+        self.btn_folder = ttk.Button(self.ctrl_frame, text="Dossier", command=lambda: self.show_file(True))
+
+        self.btn_stop.grid(row=0, column=0, padx=2, pady=2, sticky="nswe")
+        self.btn_clear.grid(row=0, column=1, padx=2, pady=2, sticky="nswe")
+        self.btn_view.grid(row=0, column=3, padx=2, pady=2, sticky="nswe")
+        self.btn_open.grid(row=0, column=4, padx=2, pady=2, sticky="nswe")
+        self.btn_folder.grid(row=0, column=5, padx=2, pady=2, sticky="nswe")
+
+        self.ctrl_frame.grid_rowconfigure(0, weight=1)
+        self.ctrl_frame.grid_columnconfigure(2, weight=1)
+
+    # ------------------------------------------------------------------------------------------
+    # Définition des évènements générer par les traitements
+    # ------------------------------------------------------------------------------------------
+    def _events_binds(self):
+        self.tree.bind("<<TreeviewSelect>>", lambda _: self.messages_refresh())
+        self.tree.bind("<Double-1>", lambda _: self.show_file())
+
+        self.bind("<Escape>", self.app_exit)
+
+        self.protocol("WM_DELETE_WINDOW", self.app_exit)  # arrêter le programme quand fermeture de la fenêtre
+
+    # ------------------------------------------------------------------------------------------
+    # Mise à jour interface
+    # ------------------------------------------------------------------------------------------
+    def tree_refresh(self):
+        """mise à jour des lignes des tâches sans recréer la liste, puis relance périodique"""
+        jobs_iids = set()
+        for job in self.jobs.jobs:
+            iid = str(job.id)
+            jobs_iids.add(iid)
+            values = self.job_values(job)
+            if iid not in self.shown_values:
+                self.tree.insert("", tk.END, iid=iid, values=values)
+            elif self.shown_values[iid] != values:
+                self.tree.item(iid, values=values)
+            self.shown_values[iid] = values
+
+        for iid in list(self.shown_values):
+            if iid not in jobs_iids:
+                self.tree.delete(iid)
+                del self.shown_values[iid]
+
+        self.messages_refresh()
+        self._refresh_after_id = self.after(REFRESH_MS, self.tree_refresh)
+
+    def job_values(self, job: QueryJob) -> tuple[str, ...]:
+        duration = ""
+        if job.start_time is not None:
+            secs = ((job.end_time or datetime.now()) - job.start_time).total_seconds()
+            duration = f"{int(secs) // 60:02d}:{int(secs) % 60:02d}"
+
+        return (
+            str(job.id),
+            job.query_name,
+            job.server_id,
+            job.status.value,
+            format(job.rows_number, ",").replace(",", " "),
+            duration,
+            Path(job.output_file).name if job.output_file else "",
+        )
+
+    def messages_refresh(self):
+        job = self.selected_job()
+        shown = (job.id, len(job.messages)) if job is not None else (0, 0)
+        if shown == self.shown_messages:
+            return
+
+        self.shown_messages = shown
+        self.textbox["state"] = "normal"
+        self.textbox.delete("1.0", "end")
+        if job is not None:
+            self.textbox.insert("1.0", "\n".join(job.messages))
+            self.textbox.see("end")
+        self.textbox["state"] = "disabled"
+
+    def selected_job(self) -> QueryJob | None:
+        item = self.tree.selection()
+        if not item:
+            return None
+
+        return next((job for job in self.jobs.jobs if str(job.id) == item[0]), None)
+
+    # ------------------------------------------------------------------------------------------
+    # Traitements
+    # ------------------------------------------------------------------------------------------
+    def job_cancel(self):
+        job = self.selected_job()
+        if job is None or not job.is_active:
+            return
+
+        if messagebox.askyesno("Interrompre", f"Interrompre la requête {job.query_name} ?", parent=self):
+            self.jobs.cancel(job)
+
+    def jobs_clear(self):
+        self.jobs.clear_finished()
+
+    def get_extract_path(self) -> Path | None:
+        job = self.selected_job()
+        if job is None or job.status != JobStatus.done or not job.output_file:
+            return None
+
+        return Path(job.output_file)
+
+    def show_file(self, only_reveal: bool = False):
+        file: Path = self.get_extract_path()
+        if not file:
+            return
+        elif not file.exists():
+            messagebox.showerror("Erreur", "Le fichier n'existe pas", parent=self)
+        elif only_reveal:
+            utils.showfile(file)
+        else:
+            utils.startfile(file)
+
+    def show_result(self):
+        file: Path = self.get_extract_path()
+        if not file:
+            return
+
+        cols_file: Path = columns_path(file)
+        if not cols_file.exists():
+            msg = "Pas de fichier de visualisation pour cette extraction"
+            msg += "\n(à activer dans le menu des requêtes avant l'extraction)"
+            messagebox.showerror("Erreur", msg, parent=self)
+            return
+
+        try:
+            ResultWindow(cols_file, self)
+        except (OSError, ValueError) as err:
+            messagebox.showerror("Erreur", f"Lecture du fichier de visualisation impossible :\n{err}", parent=self)
+
+    def app_exit(self, _: Event = None):
+        if self._refresh_after_id is not None:
+            self.after_cancel(self._refresh_after_id)
+        self.destroy()
+        if self.parent is None:
+            self.quit()
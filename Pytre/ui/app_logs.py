@@ -10,10 +10,12 @@ if not __package__:
 
 import logs_user
 import utils
+from columns_file import columns_path
 from about import APP_NAME
 
 import ui.ui_utils as ui_utils
 from ui.save_as import save_as
+from ui.app_result import ResultWindow
 from ui.app_theme import set_theme, set_menus, theme_is_on
 
 DATE_FORMAT = "%d/%m/%Y"
@@ -77,6 +79,7 @@ class LogsWindow(tk.Toplevel):
 
         self.menu_extract = tk.Menu(self.menubar, tearoff=False)
         self.menu_extract.add_command(label="Ouvrir...", command=self.show_file)
+        self.menu_extract.add_command(label="Visualiser...", command=self.show_result)
         self.menu_extract.add_command(label="Enregistrer...", command=self.save_as)
         self.menu_extract.add_command(label="Dossier...", command=lambda: self.show_file(True))
         self.menu_extract.add_command(label="Recharger", command=self.tree_refresh)
@@ -93,14 +96,16 @@ class LogsWindow(tk.Toplevel):
 
     def _setup_ui_ctrl(self):
         self.btn_stats = ttk.Button(self.ctrl_frame, text="Stats", command=self.show_query_stats)
+        self.btn_view = ttk.Button(self.ctrl_frame, text="Visualiser", command=self.show_result)
         self.btn_open = ttk.Button(self.ctrl_frame, text="Ouvrir", command=self.show_file)
         self.btn_save_as = ttk.Button(self.ctrl_frame, text="Enregistrer", command=self.save_as)
         self.btn_folder = ttk.Button(self.ctrl_frame, text="Dossier", command=lambda: self.show_file(True))
 
         self.btn_stats.grid(row=0, column=0, padx=2, pady=2, sticky="nswe")
-        self.btn_open.grid(row=0, column=2, padx=2, pady=2, sticky="nswe")
-        self.btn_save_as.grid(row=0, column=3, padx=2, pady=2, sticky="nswe")
-        self.btn_folder.grid(row=0, column=4, padx=2, pady=2, sticky="nswe")
+        self.btn_view.grid(row=0, column=2, padx=2, pady=2, sticky="nswe")
+        self.btn_open.grid(row=0, column=3, padx=2, pady=2, sticky="nswe")
+        self.btn_save_as.grid(row=0, column=4, padx=2, pady=2, sticky="nswe")
+        self.btn_folder.grid(row=0, column=5, padx=2, pady=2, sticky="nswe")
 
         self.ctrl_frame.grid_rowconfigure(0, weight=1)
         self.ctrl_frame.grid_columnconfigure(1, weight=1)
@@ -268,6 +273,8 @@ class LogsWindow(tk.Toplevel):
                     value = datetime.strftime(value, DATE_FORMAT)
                 elif col in ("time", "last_time"):
                     value = datetime.strftime(value, TIME_FORMAT)
+                elif col == "duration" and getattr(rows, "cache_hit", 0):
+                    value = "cache"
                 elif col in ("duration", "min_run", "max_run"):
                     value = self.duration_format(value)
                 elif col == "file":
@@ -417,6 +424,9 @@ class LogsWindow(tk.Toplevel):
     # Autres traitements
     # ------------------------------------------------------------------------------------------
     def duration_format(self, secs: float) -> str:
+        if secs is None:  # que des résultats issus du cache
+            return ""
+
         min = int(secs // 60)
         sec = round(secs % 60)
         text = f"{min} min {str(sec).rjust(2, '0')}"
@@ -433,6 +443,23 @@ class LogsWindow(tk.Toplevel):
         else:
             utils.startfile(file)
 
+    def show_result(self):
+        file: Path = self.get_extract_path()
+        if not file:
+            return
+
+        cols_file: Path = columns_path(file)
+        if not cols_file.exists():
+            msg = "Pas de fichier de visualisation pour cette extraction"
+            msg += "\n(à activer dans le menu des requêtes avant l'extraction)"
+            messagebox.showerror("Erreur", msg, parent=self)
+            return
+
+        try:
+            ResultWindow(cols_file, self)
+        except (OSError, ValueError) as err:
+            messagebox.showerror("Erreur", f"Lecture du fichier de visualisation impossible :\n{err}", parent=self)
+
     def save_as(self):
         src: Path = self.get_extract_path()
         save_as(self, src)
@@ -0,0 +1,188 @@
+import tkinter as tk
+from tkinter import ttk, Event, messagebox
+from pathlib import Path
+
+if not __package__:
+    import syspath_insert  # noqa: F401  # disable unused-import warning
+
+from columns_file import ColumnsReader
+from about import APP_NAME
+
+import ui.ui_utils as ui_utils
+from ui.app_theme import set_theme
+
+PAGE_ROWS: int = 1_000  # nombre de lignes affichées par page
+COL_WIDTH: int = 100  # largeur par défaut des colonnes
+
+
+class ResultWindow(tk.Toplevel):
+    """Visualisation d'une extraction à partir de son fichier colonnes, les lignes sont lues page par page"""
+
+    def __init__(self, file: Path, parent=None):
+        reader = ColumnsReader(file)  # avant création de la fenêtre, si fichier illisible
+        super().__init__()
+        self.parent = parent
+        if self.parent:
+            self.focus_set()
+        else:
+            self.master.withdraw()
+
+        self.file: Path = Path(file)
+        self.reader: ColumnsReader = reader
+        self.page_start: int = 0
+
+        set_theme(self)
+        self._setup_ui()
+        self._events_binds()
+
+        self.show_page(0)
+        self.tree.focus_set()
+
+    # ------------------------------------------------------------------------------------------
+    # Création de l'interface
+    # ------------------------------------------------------------------------------------------
+    def _setup_ui(self):
+        self.title(f"{APP_NAME} - {self.file.name}")
+        if self.parent:
+            self.geometry(f"1000x700+{self.parent.winfo_x() + 60}+{self.parent.winfo_y() + 20}")
+        else:
+            self.geometry("1000x700")
+            ui_utils.ui_center(self)
+
+        self.resizable(True, True)
+
+        self.tree_frame = ttk.Frame(self, padding=1, borderwidth=2)
+        self.ctrl_frame = ttk.Frame(self, padding=1, borderwidth=2)
+
+        self.tree_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nswe")
+        self.ctrl_frame.grid(row=1, column=0, padx=0, pady=0, sticky="we")
+
+        self._setup_ui_tree()
+        self._setup_ui_ctrl()
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+    def _setup_ui_tree(self):
+        cols = ["num"] + [f"col_{i}" for i in range(len(self.reader.columns))]
+
+        self.tree = ttk.Treeview(self.tree_frame, columns=cols, show="headings", selectmode="browse")
+        self.tree.heading("num", text="Num")
+        self.tree.column("num", width=70, anchor="e", stretch=False)
+        for col, text in zip(cols[1:], self.reader.columns):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=COL_WIDTH, stretch=False)
+
+        xbar = ttk.Scrollbar(self.tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscroll=xbar.set)
+        ybar = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=ybar.set)
+
+        self.tree.grid(row=0, column=0, padx=2, pady=2, sticky="nswe")
+        xbar.grid(row=1, column=0, sticky="we")
+        ybar.grid(row=0, column=1, sticky="ns")
+
+        self.tree_frame.grid_rowconfigure(0, weight=1)
+        self.tree_frame.grid_columnconfigure(0, weight=1)
+
+    def _setup_ui_ctrl(self):
+        self.btn_first = ttk.Button(self.ctrl_frame, text="<<", width=4, command=lambda: self.show_page(0))
+        self.btn_prev = ttk.Button(self.ctrl_frame, text="<", width=4, command=lambda: self.move_page(-1))
+        self.btn_next = ttk.Button(self.ctrl_frame, text=">", width=4, command=lambda: self.move_page(1))
+        self.btn_last = ttk.Button(self.ctrl_frame, text=">>", width=4, command=lambda: self.show_page(-1))
+        self.lbl_page = ttk.Label(self.ctrl_frame, text="", anchor="center")
+        self.lbl_goto = ttk.Label(self.ctrl_frame, text="Ligne :")
+        self.goto_value = tk.StringVar()
+        self.entry_goto = ttk.Entry(self.ctrl_frame, width=12, textvariable=self.goto_value)
+
+        self.btn_first.grid(row=0, column=0, padx=2, pady=2, sticky="nswe")
+        self.btn_prev.grid(row=0, column=1, padx=2, pady=2, sticky="nswe")
+        self.lbl_page.grid(row=0, column=2, padx=2, pady=2, sticky="nswe")
+        self.btn_next.grid(row=0, column=3, padx=2, pady=2, sticky="nswe")
+        self.btn_last.grid(row=0, column=4, padx=2, pady=2, sticky="nswe")
+        self.lbl_goto.grid(row=0, column=5, padx=(10, 2), pady=2, sticky="nswe")
+        self.entry_goto.grid(row=0, column=6, padx=2, pady=2, sticky="nswe")
+
+        self.ctrl_frame.grid_rowconfigure(0, weight=1)
+        self.ctrl_frame.grid_columnconfigure(2, weight=1)
+
+    # ------------------------------------------------------------------------------------------
+    # Définition des évènements générer par les traitements
+    # ------------------------------------------------------------------------------------------
+    def _events_binds(self):
+        self.tree.bind("<Control-Home>", lambda _: self.show_page(0))
+        self.tree.bind("<Control-End>", lambda _: self.show_page(-1))
+        self.tree.bind("<Control-Next>", lambda _: self.move_page(1))
+        self.tree.bind("<Control-Prior>", lambda _: self.move_page(-1))
+        self.entry_goto.bind("<Return>", lambda _: self.goto_row())
+
+        self.bind("<Escape>", self.app_exit)
+
+        self.protocol("WM_DELETE_WINDOW", self.app_exit)  # arrêter le programme quand fermeture de la fenêtre
+
+    # ------------------------------------------------------------------------------------------
+    # Mise à jour interface
+    # ------------------------------------------------------------------------------------------
+    def show_page(self, start: int):
+        rows_count = self.reader.rows_count
+        if start < 0 or start >= rows_count:  # dernière page
+            start = max(rows_count - 1, 0) // PAGE_ROWS * PAGE_ROWS
+
+        self.page_start = start
+        rows = self.reader.rows_text(start, PAGE_ROWS)
+
+        self.tree.delete(*self.tree.get_children())
+        for i, row in enumerate(rows, start=start + 1):
+            self.tree.insert("", tk.END, iid=i, values=[format(i, ",").replace(",", " ")] + row)
+
+        if rows:
+            self.lbl_page["text"] = (
+                "Lignes {:,} à {:,} sur {:,}".format(start + 1, start + len(rows), rows_count).replace(",", " ")
+            )
+            self.tree_select(start + 1)
+        else:
+            self.lbl_page["text"] = "Aucune ligne"
+
+    def move_page(self, offset: int):
+        start = self.page_start + offset * PAGE_ROWS
+        if start < 0:
+            start = 0
+        elif start >= self.reader.rows_count:
+            return
+
+        self.show_page(start)
+
+    def goto_row(self):
+        value = self.goto_value.get().replace(" ", "")
+        if not value.isdigit() or not 0 < int(value) <= self.reader.rows_count:
+            error_msg = f"Le numéro de ligne doit être entre 1 et {self.reader.rows_count}"
+            messagebox.showerror("Erreur", error_msg, parent=self)
+            return
+
+        row_num = int(value)
+        self.show_page((row_num - 1) // PAGE_ROWS * PAGE_ROWS)
+        self.tree_select(row_num)
+        self.tree.focus_set()
+
+    def tree_select(self, row_num: int):
+        item = str(row_num)
+        if self.tree.exists(item):
+            self.tree.selection_set(item)
+            self.tree.focus(item)
+            self.tree.see(item)
+
+    def app_exit(self, _: Event = None):
+        self.reader.close()
+        self.destroy()
+        if self.parent is None:
+            self.quit()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        my_app = ResultWindow(Path(sys.argv[1]))
+        my_app.mainloop()
+    else:
+        print("Usage : app_result.py fichier.cols")
@@ -1,22 +1,28 @@
 import tkinter as tk
 from tkinter import ttk, Event, filedialog, messagebox, font
+from queue import Queue
+from threading import Thread
 
 if not __package__:
     import syspath_insert  # noqa: F401  # disable unused-import warning
 
 import utils
+import servers_probe
 from servers import Servers, Server, ServerType
+from logs_user import UserDb, ProbeStats, ProbeRecord
 from about import APP_NAME
 
 import ui.ui_utils as ui_utils
 from ui.app_theme import set_theme, set_menus, ThemeColors, theme_is_on
 from ui.InputDialog import InputDialog
+from ui.ui_utils_thread import tk_call_when_ready
 
 
 class ServersWindow(tk.Toplevel):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, on_close_callback=None):
         super().__init__()
         self.parent = parent
+        self.on_close_callback = on_close_callback
         if self.parent:
             self.focus_set()
             ui_utils.ui_disable_parent(self, self.parent)
@@ -32,6 +38,10 @@ class ServersWindow(tk.Toplevel):
         self.server: Server = None
         self.new_server: bool = False
 
+        self.user_db: UserDb = UserDb()
+        self.probes_stats: dict[str, ProbeStats] = {}  # id serveur : statistiques des derniers tests
+        self.probing: bool = False
+
         set_theme(self)
         self._setup_ui()
         self._events_binds()
@@ -85,6 +95,8 @@ class ServersWindow(tk.Toplevel):
         menu_servers.add_command(label="Exporter...", command=self.export_servers)
         menu_servers.add_separator()
         menu_servers.add_command(label="Recharger", command=lambda: self.reload_all(True))
+        menu_servers.add_separator()
+        menu_servers.add_command(label="Tester les serveurs", command=self.servers_probe)
         self.menubar.add_cascade(label="Serveurs", menu=menu_servers)
 
         if theme_is_on():
@@ -95,6 +107,10 @@ class ServersWindow(tk.Toplevel):
         return {
             "id": {"text": "Id", "width": 50, "stretch": False},
             "description": {"text": "Description", "width": 200, "stretch": True},
+            "status": {"text": "Etat", "width": 40, "stretch": False},
+            "connect_ms": {"text": "Connexion", "width": 75, "stretch": False, "anchor": "e"},
+            "avg_connect_ms": {"text": "Moyenne", "width": 75, "stretch": False, "anchor": "e"},
+            "failed": {"text": "Echecs", "width": 60, "stretch": False, "anchor": "e"},
         }
 
     def _setup_tree(self):
@@ -104,7 +120,10 @@ class ServersWindow(tk.Toplevel):
 
         for col, attr in cols.items():
             self.tree.heading(col, text=attr["text"])
-            self.tree.column(col, width=attr["width"], stretch=attr["stretch"])
+            self.tree.column(col, width=attr["width"], stretch=attr["stretch"], anchor=attr.get("anchor", "w"))
+        self.tree.tag_configure("probe_ko", foreground="red")
+
+        self.probe_label = ttk.Label(self.tree_frame, text="", justify=tk.LEFT, wraplength=450)
 
         xbar = ttk.Scrollbar(self.tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
         self.tree.configure(xscroll=xbar.set)
@@ -114,6 +133,7 @@ class ServersWindow(tk.Toplevel):
         self.tree.grid(row=0, column=0, columnspan=1, padx=2, pady=2, sticky="nswe")
         xbar.grid(row=1, column=0, sticky="we")
         ybar.grid(row=0, column=1, sticky="ns")
+        self.probe_label.grid(row=2, column=0, columnspan=2, padx=2, pady=2, sticky="we")
 
         self.tree_frame.rowconfigure(0, weight=1)
         self.tree_frame.columnconfigure(0, weight=1)
@@ -130,7 +150,7 @@ class ServersWindow(tk.Toplevel):
     def _setup_entries(self):
         self.entries = {}
         num_row = 1
-        for key in self.servers.cols_std + self.servers.cols_cust:
+        for key in self.servers.cols_std + self.servers.cols_cust + self.servers.cols_opt:
             if key in ("uuid", "type", "grp_authorized"):
                 continue
 
@@ -177,11 +197,13 @@ class ServersWindow(tk.Toplevel):
     def _setup_buttons(self):
         self.buttons_frame.columnconfigure(0, weight=1)
 
+        self.btn_probe = ttk.Button(self.buttons_frame, text="Tester", command=self.servers_probe)
         self.btn_new = ttk.Button(self.buttons_frame, text="Nouveau", command=self.server_new)
         self.btn_save = ttk.Button(self.buttons_frame, text="Enregistrer", command=self.server_save)
         self.btn_remove = ttk.Button(self.buttons_frame, text="Supprimer", command=self.server_remove)
         self.btn_cancel = ttk.Button(self.buttons_frame, text="Fermer", command=self.app_exit)
 
+        self.btn_probe.grid(row=0, column=0, padx=2, pady=2, sticky="nsw")
         self.btn_new.grid(row=0, column=1, padx=2, pady=2, sticky="nse")
         self.btn_save.grid(row=0, column=2, padx=2, pady=2, sticky="nse")
         self.btn_remove.grid(row=0, column=3, padx=2, pady=2, sticky="nse")
@@ -205,6 +227,7 @@ class ServersWindow(tk.Toplevel):
     # ------------------------------------------------------------------------------------------
     def reload_all(self, notify_end: bool = False):
         self.servers.get_all_servers(reload=True)
+        self.probes_stats = self.user_db.get_probes_stats(servers_probe.PROBE_HISTORY)
         self.tree_refresh(notify_end)
 
     def tree_refresh(self, notify_end: bool = False):
@@ -215,7 +238,8 @@ class ServersWindow(tk.Toplevel):
 
         item_to_select = None
         for _, server in self.servers.servers_dict.items():
-            self.tree.insert("", tk.END, values=(server.id, server.description), iid=id(server))
+            values, tags = self.server_values(server)
+            self.tree.insert("", tk.END, values=values, tags=tags, iid=id(server))
             if selected_item_uuid and server.uuid == selected_item_uuid:
                 item_to_select = (id(server),)
 
@@ -231,6 +255,39 @@ class ServersWindow(tk.Toplevel):
             msg = "Ok rechargement !"
             messagebox.showinfo(title="Mise à jour infos", message=msg, parent=self, type=messagebox.OK)
 
+    def server_values(self, server: Server) -> tuple[tuple, tuple]:
+        """valeurs de la ligne du serveur avec le résultat de ses derniers tests, et tag si le dernier a échoué"""
+        stats: ProbeStats = self.probes_stats.get(server.id)
+        if stats is None:
+            return (server.id, server.description, "", "", "", ""), ()
+
+        values = (
+            server.id,
+            server.description,
+            "OK" if stats.last_ok else "KO",
+            f"{stats.last_connect_ms} ms" if stats.last_connect_ms is not None else "",
+            f"{stats.avg_connect_ms} ms" if stats.avg_connect_ms is not None else "",
+            f"{stats.nb_failed}/{stats.nb_probes}",
+        )
+        return values, () if stats.last_ok else ("probe_ko",)
+
+    def probe_info_update(self):
+        stats: ProbeStats = self.probes_stats.get(self.server.id) if self.server else None
+        if self.probing:
+            text = "Test des serveurs en cours..."
+        elif stats is None:
+            text = "Pas de test de connexion"
+        else:
+            text = f"Dernier test le {stats.last_probe:%d/%m/%Y %H:%M:%S}, "
+            if stats.avg_query_ms is not None:
+                text += f"SELECT 1 en {stats.avg_query_ms} ms en moyenne"
+            else:
+                text += f"aucun succès sur les {stats.nb_probes} derniers"
+            if not stats.last_ok:
+                text += f"\n{stats.last_error}"
+
+        self.probe_label.configure(text=text)
+
     def tree_select_move(self, offset: int):
         curr_item = self.tree.selection()
         if not curr_item == ():
@@ -293,6 +350,7 @@ class ServersWindow(tk.Toplevel):
             self.entries[key]["var"].set(val)
 
         self.groups_set()
+        self.probe_info_update()
 
     def toggle_password(self, w_caller: tk.Widget, w_target: tk.Widget, hide_char: str = "\U000025cf"):
         if w_target["show"] == "":
@@ -426,7 +484,48 @@ class ServersWindow(tk.Toplevel):
             msg = "Quelque chose ne s'est pas bien passé lors de l'export !"
             messagebox.showerror(title="Export", message=msg, parent=self, type=messagebox.OK)
 
+    def servers_probe(self):
+        """test simultané de tous les serveurs dans un thread, historique enregistré dans la base utilisateur"""
+        if self.probing:
+            return
+
+        self.probing = True
+        self.btn_probe["state"] = "disabled"
+        self.probe_info_update()
+        servers_lst = list(self.servers.servers_dict.values())
+
+        def worker():
+            probes: list[ProbeRecord] = []
+            try:
+                probes = servers_probe.probe_servers(servers_lst)
+            finally:
+                # retour dans le thread principal pour mettre à jour l'UI
+                result_queue.put(probes)
+
+        def end(probes: list[ProbeRecord]):
+            self.probing = False
+            if not self.winfo_exists():
+                return
+
+            self.btn_probe["state"] = "normal"
+            self.probes_stats = self.user_db.get_probes_stats(servers_probe.PROBE_HISTORY)
+            for server in self.servers.servers_dict.values():
+                if self.tree.exists(id(server)):
+                    values, tags = self.server_values(server)
+                    self.tree.item(id(server), values=values, tags=tags)
+            self.probe_info_update()
+
+            for probe in probes:
+                print(servers_probe.probe_report(probe))
+
+        result_queue = Queue()
+        Thread(target=worker, daemon=True).start()
+        tk_call_when_ready(self, result_queue, end)
+
     def app_exit(self, _: Event = None):
+        if self.on_close_callback:
+            self.on_close_callback()
+
         if self.parent:
             ui_utils.ui_undisable_parent(self, self.parent)
 
@@ -19,9 +19,10 @@ from ui.MsgOverlay import MsgOverlay
 
 
 class UsersWindow(tk.Toplevel):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, on_close_callback=None):
         super().__init__()
         self.parent = parent
+        self.on_close_callback = on_close_callback
         self.focus_set() if self.parent else self.master.withdraw()
 
         self.detached_items: set[str] = set()
@@ -331,6 +332,9 @@ class UsersWindow(tk.Toplevel):
         self.tree_select_pos(pos + offset)
 
     def app_exit(self, _: Event = None):
+        if self.on_close_callback:
+            self.on_close_callback()
+
         self.destroy()
         if self.parent is None:
             self.quit()
@@ -11,6 +11,8 @@ USER_SETTING_FILE: Path = USER_FOLDER / "Pytre_Settings.json"
 class UserPrefsEnum(Enum):
     save_as_folder = "save_as_folder"
     last_server = "last_server_id"
+    extract_format = "extract_format"
+    columns_file = "columns_file"
 
 
 class UserPrefs(metaclass=Singleton):
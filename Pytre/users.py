@@ -29,8 +29,8 @@ class Users(metaclass=Singleton):
 
         self.get_all_groups()
 
-    def open_db(self, reload: bool = False) -> bool:
-        self.kee._open_db(reload)
+    def open_db(self, reload: bool = False, writable: bool = False) -> bool:
+        self.kee._open_db(reload, writable)
         if self.kee.is_ko:
             return False
         self.kee_grp = self.kee.grp_users
@@ -96,7 +96,7 @@ class Users(metaclass=Singleton):
         return attribs_set
 
     def users_add_groups(self, usernames: list[str], groups: list[str]):
-        self.open_db()
+        self.open_db(writable=True)
 
         save: bool = False
 
@@ -117,7 +117,7 @@ class Users(metaclass=Singleton):
             self.kee.save_db()
 
     def users_remove_groups(self, usernames: list[str], groups: list[str]):
-        self.open_db()
+        self.open_db(writable=True)
 
         save: bool = False
 
@@ -143,7 +143,7 @@ class Users(metaclass=Singleton):
             new_value (str, optional): None set to an empty string if the field doesn't exist.
         """
 
-        self.open_db()
+        self.open_db(writable=True)
 
         save: bool = False
 
@@ -163,7 +163,7 @@ class Users(metaclass=Singleton):
         self.attribs_cust = list(set(self.attribs_cust + fields))
 
     def remove_custom_attribs(self, fields: list[str]):
-        self.open_db()
+        self.open_db(writable=True)
 
         save: bool = False
         u_entry: Entry | None = None
@@ -182,7 +182,7 @@ class Users(metaclass=Singleton):
         if not Path(filename).exists():
             raise FileNotFoundError(f"File to import users does not exist : {filename}")
 
-        self.open_db(True)
+        self.open_db(True, writable=True)
 
         # dictionnaire des utilisateurs déjà existants
         entries_dict = {}
@@ -315,7 +315,7 @@ class Users(metaclass=Singleton):
         return None
 
     def find_user_by_uuid(self, uuid: str) -> User | None:
-        entry: Entry = self.kee.db.find_entries(uuid=UUID(uuid), first=True)
+        entry: Entry = next((entry for entry in self.kee_grp.entries if str(entry.uuid) == str(UUID(uuid))), None)
         return User(entry=entry) if entry else None
 
 
@@ -385,6 +385,12 @@ class User:
         if u_entry:
             self._load_from_entry(u_entry)
 
+    def reload(self) -> None:
+        """relecture depuis la base keepass, après modification des droits dans la gestion des utilisateurs"""
+        self.grp_authorized = ["all"]
+        self.attribs_cust = {}
+        self.load()
+
     def _load_from_entry(self, u_entry: Entry) -> bool:
         if not u_entry:
             return False
@@ -419,7 +425,7 @@ class User:
         if not self.username or self.username == "":
             raise ValueError("User must have an Id / Username")
 
-        self.users.open_db(True)
+        self.users.open_db(True, writable=True)
 
         # contrôle
         if [u for u in self.users.get_all_users() if u.username == self.username and not u.uuid == self.uuid]:
@@ -444,7 +450,8 @@ class User:
         # caractères interdits par keepass pour les tags : , et ;
         u_entry.tags = [grp.replace(",", "_").replace(";", "_") for grp in self.grp_authorized if not grp == "all"]
 
-        self.users.kee.save_db()
+        if not self.users.kee.save_db():
+            return False
         self.users.get_all_groups(reload=False)
 
         self.exists = True
@@ -453,16 +460,14 @@ class User:
         return True
 
     def delete(self) -> bool:
-        self.users.open_db()
+        self.users.open_db(writable=True)
 
         u_entry: Entry = self.users.kee.db.find_entries(uuid=UUID(self.uuid), first=True)
         if u_entry is None:
             raise LookupError("User not found")
 
         u_entry.delete()
-        self.users.kee.save_db()
-
-        return True
+        return self.users.kee.save_db()
 
 
 class CurrentUser(User, metaclass=Singleton):
@@ -0,0 +1,394 @@
+import re
+import math
+import zipfile
+from decimal import Decimal
+from datetime import datetime, date, timedelta
+from itertools import repeat
+from operator import sub, truediv
+from xml.sax.saxutils import quoteattr
+
+
+SHEET_MAX_ROWS: int = 1_048_576  # nombre de lignes max d'une feuille Excel (entête comprise)
+CELL_MAX_CHARS: int = 32_767  # nombre de caractères max d'une cellule Excel
+ZIP_LEVEL: int = 1  # niveau de compression du zip, bas car le xml des feuilles se compresse déjà très bien
+SHEET_NAME: str = "Feuil"  # nom des feuilles suivi de leur numéro
+DATE_FORMAT: str = "dd/mm/yyyy"  # format d'affichage des dates
+DATETIME_FORMAT: str = "dd/mm/yyyy hh:mm:ss"  # format d'affichage des dates avec heures
+
+_EXCEL_EPOCH_DATETIME: datetime = datetime(1899, 12, 30)
+_EXCEL_EPOCH: int = _EXCEL_EPOCH_DATETIME.toordinal()  # jour 0 des dates Excel
+_EXCEL_MIN_DAYS: int = 61  # Excel compte le 29/02/1900 qui n'existe pas, dates antérieures écrites en texte
+_ONE_DAY: timedelta = timedelta(days=1)
+_STYLE_DATE: int = 1  # index des styles de cellules définis dans styles.xml
+_STYLE_DATETIME: int = 2
+_STYLE_HEADER: int = 3
+
+# échappement xml, les caractères de contrôle interdits en xml sont supprimés
+_XML_SPECIAL: re.Pattern = re.compile("[&<>\x00-\x08\x0b\x0c\x0e-\x1f]")  # textes à échapper
+_XML_INVALID: re.Pattern = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# modèles de cellule par type, %-formatés avec la valeur (texte déjà échappé)
+_CELL_EMPTY: str = "<c/>"
+_CELL_TEXT: str = '<c t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>'
+_CELL_NUMBER: str = "<c><v>%s</v></c>"
+_CELL_FLOAT: str = "<c><v>%r</v></c>"
+_CELL_INT: str = "<c><v>%d</v></c>"
+_CELL_BOOL: str = '<c t="b"><v>%d</v></c>'
+_CELL_DATE: str = '<c s="1"><v>%d</v></c>'  # style _STYLE_DATE
+_CELL_DATETIME: str = '<c s="2"><v>%r</v></c>'  # style _STYLE_DATETIME
+
+_XML_HEADER: str = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_MAIN: str = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL: str = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL: str = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_MAIN: str = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+
+class XlsxWriter:
+    """
+    Ecriture d'un fichier xlsx en flux : les lignes sont écrites au fur et à mesure dans le xml de la feuille,
+    la mémoire utilisée ne dépend pas du nombre de lignes. Au-delà du nombre de lignes max d'une feuille,
+    les lignes suivantes sont écrites dans une nouvelle feuille avec l'entête répété.
+    Les dates et les nombres sont écrits typés, les textes en chaînes inline (pas de table de chaînes partagées).
+    """
+
+    def __init__(self, f, text_func=None):
+        self.zip_file = zipfile.ZipFile(f, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL)
+        self.text_func = text_func  # traitement optionnel des textes avant écriture (recodage...)
+
+        self.header_xml: str = ""
+        self.sheets_count: int = 0
+        self.sheet_rows: int = 0  # nombre de lignes de la feuille en cours, entête comprise
+        self.sheet_stream = None
+
+        # conversion d'une colonne entière d'un même type en (modèle de cellule, valeurs), None si impossible
+        self.columns_dict: dict = {
+            str: self._column_string,
+            Decimal: self._column_decimal,
+            float: self._column_float,
+            int: self._column_int,
+            bool: self._column_bool,
+            datetime: self._column_datetime,
+            date: self._column_date,
+            type(None): self._column_none,
+        }
+
+        # table de dispatch par type pour les cellules converties une à une, construite une seule fois
+        self.types_dict: dict = {
+            str: self._from_string,
+            Decimal: self._from_decimal,
+            float: self._from_float,
+            int: self._from_int,
+            bool: self._from_bool,
+            datetime: self._from_datetime,
+            date: self._from_date,
+            type(None): self._from_none,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:  # fichier incomplet qui sera supprimé, fermeture sans masquer l'erreur d'origine
+            try:
+                self.close()
+            except Exception:
+                pass
+
+    def set_header(self, columns: list[str]) -> None:
+        cells = "".join(self._cell_text(str(column), _STYLE_HEADER) for column in columns)
+        self.header_xml = f"<row>{cells}</row>"
+
+    def rows_xml(self, records) -> list[str]:
+        """
+        Xml des lignes d'un bloc d'enregistrements : les valeurs sont converties par colonne, le modèle de ligne
+        (cellules de chaque colonne) est construit pour le bloc, puis formaté une seule fois par ligne
+        """
+        if not records:
+            return []
+
+        cells, columns = [], []
+        for column in zip(*records):
+            cell, values = self._column_xml(column)
+            cells.append(cell)
+            if values is not None:
+                columns.append(values)
+
+        row_template = "<row>" + "".join(cells) + "</row>"
+        if not columns:
+            return [row_template] * len(records)
+
+        return [row_template % row for row in zip(*columns)]
+
+    def write(self, rows: list[str]) -> None:
+        """écriture du xml des lignes, en changeant de feuille quand la feuille en cours est pleine"""
+        while rows:
+            if self.sheet_stream is None or self.sheet_rows >= SHEET_MAX_ROWS:
+                self._new_sheet()
+
+            rows_to_write = rows[: SHEET_MAX_ROWS - self.sheet_rows]
+            self.sheet_stream.write("".join(rows_to_write).encode("utf-8"))
+            self.sheet_rows += len(rows_to_write)
+            rows = rows[len(rows_to_write) :]
+
+    def close(self) -> None:
+        if self.zip_file is None:
+            return
+
+        if self.sheet_stream is None:  # aucune ligne, classeur avec seulement l'entête
+            self._new_sheet()
+        self._close_sheet()
+        self._write_workbook()
+
+        self.zip_file.close()
+        self.zip_file = None
+
+    def transform(self, value) -> str:
+        func = self.types_dict.get(type(value))
+
+        if func:
+            return func(value)
+        else:
+            return self._from_string(str(value))
+
+    def _column_xml(self, column: tuple) -> tuple[str, list | tuple | None]:
+        """modèle de cellule et valeurs de la colonne, cellules converties une à une si types mélangés"""
+        types = set(map(type, column))
+        if len(types) == 1 and (func := self.columns_dict.get(types.pop())):
+            try:
+                if (result := func(column)) is not None:
+                    return result
+            except TypeError:  # dates avec fuseau horaire...
+                pass
+
+        return "%s", list(map(self.transform, column))
+
+    def _column_string(self, column: tuple) -> tuple[str, list] | None:
+        if self.text_func:
+            column = list(map(self.text_func, column))
+        if "" in column or " " in column:
+            cells = [_CELL_EMPTY if value in ("", " ") else _CELL_TEXT % _xml_text(value) for value in column]
+            return "%s", cells
+
+        if max(map(len, column)) > CELL_MAX_CHARS:
+            column = [value[:CELL_MAX_CHARS] for value in column]
+
+        text = "".join(column)
+        if _XML_SPECIAL.search(text) is None:
+            return _CELL_TEXT, column
+        if _XML_INVALID.search(text) is not None:
+            return _CELL_TEXT, list(map(_xml_text, column))
+
+        # échappement de toute la colonne en une fois, séparateur \x00 absent des valeurs (caractère invalide)
+        text = "\x00".join(column).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        return _CELL_TEXT, text.split("\x00")
+
+    def _column_decimal(self, column: tuple) -> tuple[str, tuple] | None:
+        if all(map(Decimal.is_finite, column)):
+            return _CELL_NUMBER, column
+
+    def _column_float(self, column: tuple) -> tuple[str, tuple] | None:
+        if all(map(math.isfinite, column)):
+            return _CELL_FLOAT, column
+
+    def _column_int(self, column: tuple) -> tuple[str, tuple]:
+        return _CELL_INT, column
+
+    def _column_bool(self, column: tuple) -> tuple[str, tuple]:
+        return _CELL_BOOL, column
+
+    def _column_datetime(self, column: tuple) -> tuple[str, list] | None:
+        days = list(map(truediv, map(sub, column, repeat(_EXCEL_EPOCH_DATETIME)), repeat(_ONE_DAY)))
+        if min(days) < _EXCEL_MIN_DAYS:
+            return None
+
+        midnights = list(map(float.is_integer, days))
+        if all(midnights):
+            return _CELL_DATE, days
+        if not any(midnights):
+            return _CELL_DATETIME, days
+        return "%s", [_CELL_DATE % day if midnight else _CELL_DATETIME % day for day, midnight in zip(days, midnights)]
+
+    def _column_date(self, column: tuple) -> tuple[str, list] | None:
+        days = list(map(sub, map(date.toordinal, column), repeat(_EXCEL_EPOCH)))
+        if min(days) < _EXCEL_MIN_DAYS:
+            return None
+        return _CELL_DATE, days
+
+    def _column_none(self, column: tuple) -> tuple[str, None]:
+        return _CELL_EMPTY, None
+
+    def _new_sheet(self) -> None:
+        self._close_sheet()
+        self.sheets_count += 1
+
+        # size inconnue à l'ouverture du flux, zip64 pour les feuilles de plus de 2 Go
+        self.sheet_stream = self.zip_file.open(f"xl/worksheets/sheet{self.sheets_count}.xml", "w", force_zip64=True)
+        self.sheet_stream.write(
+            (
+                _XML_HEADER
+                + f'<worksheet xmlns="{_NS_MAIN}"><sheetViews><sheetView workbookViewId="0">'
+                + '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                + f"</sheetView></sheetViews><sheetData>{self.header_xml}"
+            ).encode("utf-8")
+        )
+        self.sheet_rows = 1
+
+    def _close_sheet(self) -> None:
+        if self.sheet_stream is None:
+            return
+
+        self.sheet_stream.write(b"</sheetData></worksheet>")
+        self.sheet_stream.close()
+        self.sheet_stream = None
+
+    def _write_workbook(self) -> None:
+        sheets_id = range(1, self.sheets_count + 1)
+
+        sheets_ct = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_CT_MAIN}.worksheet+xml"/>'
+            for i in sheets_id
+        )
+        content_types = (
+            _XML_HEADER
+            + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            + '<Default Extension="xml" ContentType="application/xml"/>'
+            + f'<Override PartName="/xl/workbook.xml" ContentType="{_CT_MAIN}.sheet.main+xml"/>'
+            + f'<Override PartName="/xl/styles.xml" ContentType="{_CT_MAIN}.styles+xml"/>'
+            + f"{sheets_ct}</Types>"
+        )
+
+        rels = (
+            _XML_HEADER
+            + f'<Relationships xmlns="{_NS_PKG_REL}">'
+            + f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            + "</Relationships>"
+        )
+
+        sheets = "".join(f'<sheet name="{SHEET_NAME}{i}" sheetId="{i}" r:id="rId{i}"/>' for i in sheets_id)
+        workbook = (
+            _XML_HEADER
+            + f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{sheets}</sheets></workbook>'
+        )
+
+        sheets_rels = "".join(
+            f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in sheets_id
+        )
+        workbook_rels = (
+            _XML_HEADER
+            + f'<Relationships xmlns="{_NS_PKG_REL}">{sheets_rels}'
+            + f'<Relationship Id="rId{self.sheets_count + 1}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+            + "</Relationships>"
+        )
+
+        # styles : 0 standard, 1 date, 2 date et heure, 3 entête en gras
+        styles = (
+            _XML_HEADER
+            + f'<styleSheet xmlns="{_NS_MAIN}">'
+            + '<numFmts count="2">'
+            + f"<numFmt numFmtId=\"164\" formatCode={quoteattr(DATE_FORMAT)}/>"
+            + f"<numFmt numFmtId=\"165\" formatCode={quoteattr(DATETIME_FORMAT)}/>"
+            + "</numFmts>"
+            + '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+            + '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            + '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            + '<fill><patternFill patternType="gray125"/></fill></fills>'
+            + '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            + '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            + '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            + '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+            + '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+            + '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+            + '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            + "</styleSheet>"
+        )
+
+        self.zip_file.writestr("[Content_Types].xml", content_types)
+        self.zip_file.writestr("_rels/.rels", rels)
+        self.zip_file.writestr("xl/workbook.xml", workbook)
+        self.zip_file.writestr("xl/_rels/workbook.xml.rels", workbook_rels)
+        self.zip_file.writestr("xl/styles.xml", styles)
+
+    def _cell_text(self, value: str, style: int = 0) -> str:
+        style_attr = f' s="{style}"' if style else ""
+        return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{_xml_text(value)}</t></is></c>'
+
+    def _from_string(self, value: str) -> str:
+        if value == "" or value == " ":
+            return _CELL_EMPTY
+
+        if self.text_func:
+            value = self.text_func(value)
+        return _CELL_TEXT % _xml_text(value)
+
+    def _from_decimal(self, value: Decimal) -> str:
+        if not value.is_finite():
+            return self._cell_text(str(value))
+        return f"<c><v>{value}</v></c>"
+
+    def _from_float(self, value: float) -> str:
+        if not math.isfinite(value):
+            return self._cell_text(str(value))
+        return f"<c><v>{value!r}</v></c>"
+
+    def _from_int(self, value: int) -> str:
+        return f"<c><v>{value}</v></c>"
+
+    def _from_bool(self, value: bool) -> str:
+        return f'<c t="b"><v>{int(value)}</v></c>'
+
+    def _from_datetime(self, value: datetime) -> str:
+        days = value.toordinal() - _EXCEL_EPOCH
+        if days < _EXCEL_MIN_DAYS:
+            if str(value) == "1753-01-01 00:00:00":  # date nulle SQL Server
+                return "<c/>"
+            return self._cell_text(value.strftime("%d/%m/%Y %H:%M:%S"))
+
+        seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1_000_000
+        if seconds == 0:
+            return f'<c s="{_STYLE_DATE}"><v>{days}</v></c>'
+        return f'<c s="{_STYLE_DATETIME}"><v>{days + seconds / 86400!r}</v></c>'
+
+    def _from_date(self, value: date) -> str:
+        days = value.toordinal() - _EXCEL_EPOCH
+        if days < _EXCEL_MIN_DAYS:
+            return self._cell_text(value.strftime("%d/%m/%Y"))
+        return f'<c s="{_STYLE_DATE}"><v>{days}</v></c>'
+
+    def _from_none(self, _) -> str:
+        return _CELL_EMPTY
+
+
+def _xml_text(value: str) -> str:
+    """texte tronqué à la taille max d'une cellule et échappé pour le xml"""
+    if len(value) > CELL_MAX_CHARS:
+        value = value[:CELL_MAX_CHARS]
+    if _XML_SPECIAL.search(value):
+        value = _XML_INVALID.sub("", value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;"))
+    return value
+
+
+if __name__ == "__main__":
+    import time
+    from pathlib import Path
+
+    rows_count = 300_000
+    test_file = Path(__file__).parent / "xlsx_writer_test.xlsx"
+    records = [
+        (i, f"Libellé n°{i} & co", Decimal(i) / 100, datetime(2024, 1, 1 + i % 28), i % 2 == 0, None)
+        for i in range(rows_count)
+    ]
+
+    start = time.perf_counter()
+    with open(test_file, "wb") as f, XlsxWriter(f) as xlsx:
+        xlsx.set_header(["id", "libelle", "montant", "date", "flag", "vide"])
+        for i in range(0, rows_count, 10_000):
+            xlsx.write(xlsx.rows_xml(records[i : i + 10_000]))
+    duration = time.perf_counter() - start
+
+    print(f"{rows_count:,} lignes en {duration:.2f}s, soit {rows_count / duration:,.0f} lignes/s")
+    test_file.unlink()